@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Allocation - Mean-Variance, Minimum-Variance and Risk-Parity Weights
+====================================================================
+
+Target weights from a covariance estimate (risk_engine.RiskModel) instead of
+rules like min(20, current_weight * 1.5), under the rebalancer's limits: no
+stock above 12% and no sector above 15%.
+
+Everything is NumPy-only and iterative:
+
+- the feasible set (weights sum to 1, 0 <= w <= stock cap, sector sums <=
+  sector cap) is handled by an exact Euclidean projection: the budget and
+  sector shifts are read off sorted breakpoints of piecewise-linear sums,
+  with no bisection
+- minimum-variance and mean-variance portfolios are solved by accelerated
+  projected gradient (FISTA); the efficient frontier is a sweep over risk
+  aversion, each point warm-started from the previous one
+- risk parity uses cyclical coordinate descent on the log-barrier
+  formulation; when a cap binds, the barrier objective is minimized over the
+  capped set by diagonally scaled projected gradient, its scale found by
+  safeguarded Newton until the weights sum to 1, which keeps equal
+  contributions among the unpinned assets
+
+Thirty assets solve in tens of milliseconds (a 20-point frontier in about
+a tenth of a second), hundreds in under a second.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+from rebalancer import MAX_STOCK_PCT, MAX_SECTOR_PCT
+from vectorized_backtest import TRADING_DAYS
+
+METHODS = ['min_variance', 'max_sharpe', 'risk_parity']
+DEFAULT_RISK_FREE = 0.065  # annual, roughly the Indian 1-year T-bill yield
+
+
+def _thresholds(v: np.ndarray, inverse: np.ndarray, lower, upper, codes: np.ndarray,
+                target: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    Per group, the lam with sum clip(v - lam * inverse, lower, upper) = target.
+
+    Each group sum is piecewise linear and decreasing in lam, with breakpoints
+    where an asset leaves its upper bound or reaches its lower bound. All
+    breakpoints are sorted once by (group, lam); running slopes give the sum
+    at every breakpoint, and lam is interpolated inside the segment that
+    crosses the target. -inf for groups whose upper bounds already fit.
+    """
+    points = np.concatenate([(v - upper) / inverse, (v - lower) / inverse])
+    slope_change = np.concatenate([-inverse, inverse])
+    group = np.concatenate([codes, codes])
+    order = np.lexsort((points, group)) if n_groups > 1 else np.argsort(points)
+    points, slope_change, group = points[order], slope_change[order], group[order]
+
+    first = np.ones(len(group), dtype=bool)
+    np.not_equal(group[1:], group[:-1], out=first[1:])
+    # Every asset adds -inverse and later +inverse, so the running slope is back at 0 between groups
+    slope_before = np.cumsum(slope_change) - slope_change
+    width = np.zeros(len(points))
+    np.subtract(points[1:], points[:-1], out=width[1:])
+    width[first] = 0.0
+    drop = np.cumsum(slope_before * width)
+    if n_groups > 1:
+        drop -= drop[np.maximum.accumulate(np.where(first, np.arange(len(group)), 0))]
+    excess = np.bincount(codes, upper, n_groups)[group] + drop - target[group]
+
+    lam = np.full(n_groups, -np.inf)
+    # Sums only fall with lam: the first breakpoint at or below the target ends the crossing segment
+    below = excess <= 0
+    entering = below & ~first
+    entering[1:] &= ~below[:-1]
+    crossing = np.flatnonzero(entering)
+    lam[group[crossing]] = points[crossing] + excess[crossing] / -slope_before[crossing]
+    # Groups that cannot reach the target even at their lower bounds end at the last breakpoint
+    last = np.ones(len(group), dtype=bool)
+    last[:-1] = first[1:]
+    short = np.flatnonzero(last & ~below)
+    lam[group[short]] = points[short]
+    return lam
+
+
+def project_capped(v: np.ndarray, upper: np.ndarray, sectors: np.ndarray = None,
+                   sector_cap: float = 1.0, lower: float = 0.0, metric: np.ndarray = None) -> np.ndarray:
+    """
+    Closest point to v with lower <= w <= upper and sector sums <= sector_cap (no budget).
+
+    Distance is sum metric_i (w_i - v_i)^2 (default metric 1). The solution
+    is w = clip(v - lambda[sector] / metric, lower, upper), with lambda 0 for
+    sectors already within the cap and solved exactly for the others.
+    """
+    w = np.clip(v, lower, upper)
+    if sectors is None or not (sectors >= 0).any():
+        return w
+    valid = sectors >= 0
+    codes = sectors[valid]
+    n_groups = int(codes.max()) + 1
+    if (np.bincount(codes, w[valid], n_groups) > sector_cap).any():
+        shifted, cap = v[valid], upper[valid]
+        inverse = np.ones(len(shifted)) if metric is None else 1.0 / metric[valid]
+        lam = np.maximum(_thresholds(shifted, inverse, lower, cap, codes,
+                                     np.full(n_groups, sector_cap), n_groups), 0.0)
+        w[valid] = np.clip(shifted - lam[codes] * inverse, lower, cap)
+    return w
+
+
+def project_weights(v: np.ndarray, upper: np.ndarray, sectors: np.ndarray = None,
+                    sector_cap: float = 1.0) -> np.ndarray:
+    """
+    Closest weights to v with sum 1, 0 <= w <= upper and sector sums <= sector_cap.
+
+    The solution is w = clip(v - max(tau, t[sector]), 0, upper), where t is
+    the shift that brings each sector to its cap on its own (-inf for
+    sectors that cannot exceed it). Holding every asset of a sector at its
+    value at t makes the budget sum piecewise linear in tau again, so both
+    t and tau come from _thresholds() without bisection.
+    sectors: integer code per asset (-1 = no limit).
+    """
+    n = len(v)
+    shift_floor = np.full(n, -np.inf)
+    budget_upper = upper
+    if sectors is not None and (sectors >= 0).any():
+        valid = sectors >= 0
+        codes = sectors[valid]
+        n_groups = int(codes.max()) + 1
+        t = _thresholds(v[valid], np.ones(valid.sum()), 0.0, upper[valid], codes,
+                        np.full(n_groups, sector_cap), n_groups)
+        shift_floor[valid] = t[codes]
+        budget_upper = upper.copy()
+        budget_upper[valid] = np.clip(v[valid] - t[codes], 0.0, upper[valid])
+    tau = _thresholds(v, np.ones(n), 0.0, budget_upper, np.zeros(n, dtype=np.int64), np.ones(1), 1)[0]
+    return np.clip(v - np.maximum(tau, shift_floor), 0.0, upper)
+
+
+def check_feasible(n: int, upper: np.ndarray, sectors: np.ndarray = None, sector_cap: float = 1.0):
+    """Raise ValueError when the caps cannot add up to a fully invested portfolio"""
+    if upper.sum() < 1 - 1e-9:
+        raise ValueError(f"Stock caps allow only {upper.sum() * 100:.0f}% invested across {n} assets")
+    if sectors is not None:
+        capacity = np.minimum(np.bincount(sectors[sectors >= 0], upper[sectors >= 0]), sector_cap).sum() \
+            + upper[sectors < 0].sum()
+        if capacity < 1 - 1e-9:
+            raise ValueError(f"Sector caps allow only {capacity * 100:.0f}% invested")
+
+
+def _solve_qp(cov: np.ndarray, linear: np.ndarray, upper: np.ndarray, sectors, sector_cap: float,
+              start: np.ndarray = None, iterations: int = 1000, tol: float = 1e-7) -> np.ndarray:
+    """min 0.5 w'Cw - linear'w over the feasible set, by FISTA with adaptive restart"""
+    n = len(linear)
+    step = 1.0 / max(np.linalg.eigvalsh(cov)[-1], 1e-12)
+    w = project_weights(np.full(n, 1.0 / n) if start is None else start, upper, sectors, sector_cap)
+    z, t = w.copy(), 1.0
+    for _ in range(iterations):
+        w_next = project_weights(z - step * (cov @ z - linear), upper, sectors, sector_cap)
+        if (z - w_next) @ (w_next - w) > 0:
+            # Momentum is pointing uphill: restart the acceleration
+            t = 1.0
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        z = w_next + (t - 1) / t_next * (w_next - w)
+        if np.abs(w_next - w).max() < tol:
+            return w_next
+        w, t = w_next, t_next
+    return w
+
+
+def _limits(n: int, max_stock_pct: float, sectors, max_sector_pct: float) -> tuple:
+    upper = np.full(n, max_stock_pct / 100)
+    sectors = None if sectors is None else np.asarray(sectors, dtype=np.int64)
+    check_feasible(n, upper, sectors, max_sector_pct / 100)
+    return upper, sectors, max_sector_pct / 100
+
+
+def min_variance(cov: np.ndarray, sectors=None, max_stock_pct: float = MAX_STOCK_PCT,
+                 max_sector_pct: float = MAX_SECTOR_PCT) -> np.ndarray:
+    """Lowest-volatility fully invested weights within the caps"""
+    upper, sectors, cap = _limits(len(cov), max_stock_pct, sectors, max_sector_pct)
+    return _solve_qp(cov, np.zeros(len(cov)), upper, sectors, cap)
+
+
+def mean_variance(mu: np.ndarray, cov: np.ndarray, risk_aversion: float, sectors=None,
+                  max_stock_pct: float = MAX_STOCK_PCT, max_sector_pct: float = MAX_SECTOR_PCT,
+                  start: np.ndarray = None) -> np.ndarray:
+    """argmax mu'w - risk_aversion / 2 * w'Cw within the caps"""
+    upper, sectors, cap = _limits(len(cov), max_stock_pct, sectors, max_sector_pct)
+    return _solve_qp(risk_aversion * cov, mu, upper, sectors, cap, start)
+
+
+def efficient_frontier(mu: np.ndarray, cov: np.ndarray, sectors=None, n_points: int = 20,
+                       max_stock_pct: float = MAX_STOCK_PCT, max_sector_pct: float = MAX_SECTOR_PCT,
+                       risk_free: float = 0.0) -> dict:
+    """
+    Frontier portfolios from minimum variance up to maximum return
+    (annualized mu and cov in, annualized return / volatility out).
+
+    Returns:
+        Dictionary with 'frontier' (risk_aversion, return, volatility,
+        sharpe per point) and 'weights' (points x assets)
+    """
+    upper, sectors, cap = _limits(len(cov), max_stock_pct, sectors, max_sector_pct)
+    # Risk aversions spaced so the sweep spans both ends of the frontier
+    scale = np.abs(mu).max() / max(np.linalg.eigvalsh(cov)[-1], 1e-12)
+    aversions = np.geomspace(1000 * scale, 0.01 * scale, n_points)
+    weights = []
+    w = None
+    for gamma in aversions:
+        w = _solve_qp(gamma * cov, mu, upper, sectors, cap, w)
+        weights.append(w)
+    weights = np.array(weights)
+    ret = weights @ mu
+    vol = np.sqrt(np.einsum('pn,pn->p', weights @ cov, weights))
+    frontier = pd.DataFrame({
+        'risk_aversion': aversions,
+        'return': ret,
+        'volatility': vol,
+        'sharpe': (ret - risk_free) / vol,
+    })
+    return {'frontier': frontier, 'weights': weights}
+
+
+def risk_contributions(weights: np.ndarray, cov: np.ndarray) -> np.ndarray:
+    """Share of portfolio variance from each asset (sums to 1)"""
+    cov_w = cov @ weights
+    return weights * cov_w / (weights @ cov_w)
+
+
+def _barrier_solve(cov: np.ndarray, budgets: np.ndarray, scale: float, y: np.ndarray, upper: np.ndarray,
+                   sectors, sector_cap: float, iterations: int = 2000, tol: float = 1e-11) -> np.ndarray:
+    """
+    min 0.5 y'Cy - scale * sum b log y over 0 < y <= upper, sector sums <= sector_cap.
+
+    Projected gradient scaled by the Hessian diagonal C_ii + scale b_i / y_i^2
+    (the projection uses the same metric, so it stays a per-sector
+    bisection), with a backtracking step; warm-started from y.
+    """
+    floor = 1e-12
+    diag = np.diag(cov)
+
+    def objective(x):
+        return 0.5 * x @ cov @ x - scale * budgets @ np.log(x)
+
+    y = project_capped(y, upper, sectors, sector_cap, floor)
+    f, step = objective(y), 1.0
+    for _ in range(iterations):
+        grad = cov @ y - scale * budgets / y
+        metric = diag + scale * budgets / (y * y)
+        while True:
+            y_next = project_capped(y - step * grad / metric, upper, sectors, sector_cap, floor, metric)
+            f_next = objective(y_next)
+            if f_next <= f + 0.5 * grad @ (y_next - y) or step < 1e-12:
+                break
+            step /= 2
+        converged = np.abs(y_next - y).max() < tol * y.max()
+        y, f, step = y_next, f_next, min(step * 2, 1.0)
+        if converged:
+            break
+    return y
+
+
+def pinned_assets(weights: np.ndarray, upper: np.ndarray, sectors=None, sector_cap: float = 1.0,
+                  tol: float = 1e-6) -> np.ndarray:
+    """Assets held at their stock cap or inside a sector at its cap"""
+    pinned = weights >= upper - tol
+    if sectors is not None:
+        sectors = np.asarray(sectors, dtype=np.int64)
+        valid = sectors >= 0
+        totals = np.bincount(sectors[valid], weights[valid])
+        pinned[valid] |= totals[sectors[valid]] >= sector_cap - tol
+    return pinned
+
+
+def risk_parity(cov: np.ndarray, budgets: np.ndarray = None, sectors=None,
+                max_stock_pct: float = MAX_STOCK_PCT, max_sector_pct: float = MAX_SECTOR_PCT,
+                iterations: int = 500, tol: float = 1e-10, budget_tol: float = 1e-8) -> np.ndarray:
+    """
+    Weights whose risk contributions match budgets (default equal).
+
+    Unconstrained risk budgeting by cyclical coordinate descent on
+    0.5 y'Cy - sum b log y, normalized to w = y / sum(y). If that breaks a
+    cap, the same log-barrier objective (scaled by lambda) is minimized over
+    the capped set y <= stock cap, sector sums <= sector cap, with lambda
+    searched until sum(y) = 1 within budget_tol. There w_i (Cw)_i = lambda b_i for every asset
+    not pinned at a cap (see pinned_assets), so those assets keep risk
+    contributions in proportion to their budgets; pinned assets contribute less.
+    """
+    n = len(cov)
+    budgets = np.full(n, 1.0 / n) if budgets is None else np.asarray(budgets, dtype=np.float64) / np.sum(budgets)
+    upper, sectors, cap = _limits(n, max_stock_pct, sectors, max_sector_pct)
+
+    diag = np.diag(cov)
+    y = budgets / np.sqrt(diag)
+    cov_y = cov @ y
+    for _ in range(iterations):
+        previous = y.copy()
+        for i in range(n):
+            # Positive root of C_ii y_i^2 + (Cy - C_ii y_i)_i y_i - b_i = 0
+            other = cov_y[i] - diag[i] * y[i]
+            new = (-other + np.sqrt(other * other + 4 * diag[i] * budgets[i])) / (2 * diag[i])
+            cov_y += cov[:, i] * (new - y[i])
+            y[i] = new
+        if np.abs(y - previous).max() < tol * y.max():
+            break
+    w = y / y.sum()
+
+    if (w > upper + 1e-12).any() or (sectors is not None and
+                                     (np.bincount(sectors[sectors >= 0], w[sectors >= 0]) > cap + 1e-12).any()):
+        # Uncapped, sum(y) = 1 at lambda = 1 / sum(y)^2; caps only lower sum(y), so the root lies
+        # above. Newton on log(sum(y)) against log(lambda), slope from the free assets' stationarity
+        # (C + diag(lambda b / y^2)) dy = b / y dlambda, bisecting whenever a step leaves the bracket
+        lo, hi = np.log(1.0 / y.sum() ** 2), np.inf
+        x = lo
+        for _ in range(60):
+            scale = np.exp(x)
+            w = _barrier_solve(cov, budgets, scale, w, upper, sectors, cap)
+            f = np.log(w.sum())
+            if f < 0:
+                lo = x
+            else:
+                hi = x
+            # The barrier solves are accurate to about 1e-9 in sum(y), so stop at budget_tol
+            if abs(f) < budget_tol or hi - lo < 1e-12:
+                break
+            free = ~pinned_assets(w, upper, sectors, cap)
+            slope = 0.0
+            if free.any():
+                pull = scale * budgets[free] / w[free]
+                slope = np.linalg.solve(cov[np.ix_(free, free)] + np.diag(pull / w[free]), pull).sum() / w.sum()
+            x = x - f / slope if slope > 0 else np.inf
+            if not lo < x < hi:
+                x = (lo + hi) / 2 if np.isfinite(hi) else lo + np.log(4.0)
+        w = w / w.sum()
+    return w
+
+
+def allocate(model, symbols: list = None, sectors: list = None, method: str = 'risk_parity',
+             max_stock_pct: float = MAX_STOCK_PCT, max_sector_pct: float = MAX_SECTOR_PCT,
+             expected_returns: np.ndarray = None, risk_free: float = DEFAULT_RISK_FREE) -> pd.DataFrame:
+    """
+    Target weights for symbols from a risk_engine.RiskModel.
+
+    Args:
+        sectors: sector name per symbol, for the sector cap
+        method: 'min_variance', 'max_sharpe' (best Sharpe point on the
+                frontier) or 'risk_parity'
+        expected_returns: annual returns for max_sharpe (default: the
+                          model's historical means, annualized)
+
+    Returns:
+        DataFrame with Symbol, Target_Weight_Pct, Risk_Contribution_Pct and
+        Annual_Volatility_Pct
+    """
+    if method not in METHODS:
+        raise ValueError(f"method must be one of {METHODS}")
+    symbols = list(symbols or model.symbols)
+    idx = np.array([model.column[s] for s in symbols])
+    cov = model.cov[np.ix_(idx, idx)] * model.periods_per_year
+    codes = pd.factorize(pd.Series(sectors))[0] if sectors is not None else None
+
+    if method == 'min_variance':
+        w = min_variance(cov, codes, max_stock_pct, max_sector_pct)
+    elif method == 'risk_parity':
+        w = risk_parity(cov, None, codes, max_stock_pct, max_sector_pct)
+    else:
+        mu = model.mean[idx] * model.periods_per_year if expected_returns is None \
+            else np.asarray(expected_returns, dtype=np.float64)
+        result = efficient_frontier(mu, cov, codes, 25, max_stock_pct, max_sector_pct, risk_free)
+        w = result['weights'][int(result['frontier']['sharpe'].to_numpy().argmax())]
+
+    return pd.DataFrame({
+        'Symbol': symbols,
+        'Target_Weight_Pct': w * 100,
+        'Risk_Contribution_Pct': risk_contributions(w, cov) * 100,
+        'Annual_Volatility_Pct': np.sqrt(np.diag(cov)) * 100,
+    })
+
+
+def main():
+    """Allocate holdings.csv from the price cache, then time 30 and 300 simulated assets"""
+    import time
+    from portfolio_engine import analyze_portfolio
+    from risk_engine import RiskModel
+
+    print(f"Allocation - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+    positions = analyze_portfolio()['positions']
+    try:
+        model = RiskModel.from_price_cache(positions['Symbol'].tolist())
+        current = positions.set_index('Symbol')
+        symbols = [s for s in current.index if s in model.column]
+        table = current.loc[symbols, ['Sector', 'Position_Size_Pct']].reset_index()
+        for method in METHODS:
+            weights = allocate(model, symbols, table['Sector'].tolist(), method)
+            table[method] = weights['Target_Weight_Pct'].to_numpy()
+        print(f"TARGET WEIGHTS (%), stock cap {MAX_STOCK_PCT:.0f}%, sector cap {MAX_SECTOR_PCT:.0f}%:")
+        print(table.to_string(index=False, float_format='%.2f'))
+    except FileNotFoundError as e:
+        print(f"{e}. Run price_matrix.py first to build the cache.")
+
+    rng = np.random.default_rng(0)
+    for n_assets in [30, 300]:
+        factor = rng.normal(0, 0.01, (TRADING_DAYS * 3, 1))
+        returns = factor * rng.uniform(0.5, 1.5, n_assets) + rng.normal(0.0004, 0.015, (TRADING_DAYS * 3, n_assets))
+        cov = np.cov(returns, rowvar=False) * TRADING_DAYS
+        mu = returns.mean(axis=0) * TRADING_DAYS
+        sectors = rng.integers(0, 12, n_assets)
+        timings = {}
+        for name, solve in [('min_variance', lambda: min_variance(cov, sectors)),
+                            ('risk_parity', lambda: risk_parity(cov, sectors=sectors)),
+                            ('frontier_20', lambda: efficient_frontier(mu, cov, sectors))]:
+            start = time.perf_counter()
+            solve()
+            timings[name] = (time.perf_counter() - start) * 1000
+        print(f"{n_assets} assets: " + ", ".join(f"{k} {v:.0f} ms" for k, v in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,13 @@ sys.path.append('/Users/mitul/portfolioanalyzer/backend')
 # from enhanced_fundamental_checkpoint_analysis import analyze_risk_checkpoints
 # from valuation_quality_screening import analyze_quality_metrics
 # from comprehensive_risk_vs_quality_analysis import comprehensive_analysis
+from portfolio_engine import analyze_portfolio as run_portfolio_engine, load_holdings, to_api_payload
+from portfolio_state import PortfolioState, check_prices
+from tax_lots import build_tax_lots, transactions_from_holdings, unrealized_gains
+from tax_harvest import harvest_losses
+from risk_engine import RiskModel
+from classification import get_classification
+from stop_monitor import StopMonitor
 
 app = Flask(__name__)
 CORS(app)  # Enable cross-origin requests from React
@@ -33,6 +40,38 @@ ALLOWED_EXTENSIONS = {'csv', 'xlsx', 'xls'}
 # Create uploads directory if it doesn't exist
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
+# Live portfolio values, built from holdings.csv on first use and updated per price tick
+live_portfolio = None
+
+def get_live_portfolio():
+    global live_portfolio
+    if live_portfolio is None:
+        live_portfolio = PortfolioState(load_holdings())
+    return live_portfolio
+
+# Stop-loss / target levels of the holdings, checked on every price tick
+stop_monitor = None
+
+def get_stop_monitor():
+    global stop_monitor
+    if stop_monitor is None:
+        stop_monitor = StopMonitor.from_positions(load_holdings())
+    return stop_monitor
+
+# Covariance model over the holdings' cached prices, fitted once and shared by requests.
+# Keyed on the requested symbols: holdings without cached prices are missing from
+# risk_model.symbols, so comparing against those would refit on every request
+risk_model = None
+risk_model_request = None
+
+def get_risk_model(symbols):
+    global risk_model, risk_model_request
+    requested = frozenset(symbols)
+    if risk_model is None or requested != risk_model_request:
+        risk_model = RiskModel.from_price_cache(sorted(requested))
+        risk_model_request = requested
+    return risk_model
+
 def allowed_file(filename):
     """Check if uploaded file has allowed extension"""
     return '.' in filename and \
@@ -104,30 +143,11 @@ def mock_analysis_pipeline(portfolio_data):
     total_current_value = sum(stock['current_value'] for stock in portfolio_data)
     total_pnl = sum(stock['pnl'] for stock in portfolio_data)
 
-    # Mock sector allocation based on common Indian stock sectors
-    sector_mapping = {
-        'RELIANCE': 'Energy & Utilities',
-        'TCS': 'Information Technology',
-        'INFY': 'Information Technology',
-        'HDFC': 'Banking & Financial',
-        'ICICIBANK': 'Banking & Financial',
-        'KOTAKBANK': 'Banking & Financial',
-        'HINDUNILVR': 'Fast Moving Consumer Goods',
-        'NESTLEIND': 'Fast Moving Consumer Goods',
-        'ASIANPAINT': 'Fast Moving Consumer Goods',
-        'MARUTI': 'Automotive',
-        'TATAMOTORS': 'Automotive',
-        'BAJFINANCE': 'Banking & Financial',
-        'SCILAL': 'Shipping & Logistics'
-    }
-
-    # Calculate sector allocation
+    # Sector allocation from the shared classification index
+    sectors = get_classification().column('Sector', [stock['symbol'] for stock in portfolio_data], default='Others')
     sector_values = {}
-    for stock in portfolio_data:
-        sector = sector_mapping.get(stock['symbol'], 'Others')
-        if sector not in sector_values:
-            sector_values[sector] = 0
-        sector_values[sector] += stock['current_value']
+    for stock, sector in zip(portfolio_data, sectors):
+        sector_values[sector] = sector_values.get(sector, 0) + stock['current_value']
 
     # Convert to percentages
     sector_allocation = []
@@ -237,6 +257,157 @@ def analyze_portfolio():
             'trace': traceback.format_exc()
         }), 500
 
+@app.route('/api/portfolio-analysis', methods=['GET', 'POST'])
+def portfolio_analysis():
+    """
+    Portfolio health check from the analytics engine: values, P&L, loss
+    buckets, concentration, sector and market-cap breakdowns.
+    POST a holdings file, or GET to analyze the default holdings.csv.
+    """
+    try:
+        if request.method == 'POST':
+            if 'file' not in request.files or request.files['file'].filename == '':
+                return jsonify({'error': 'No file uploaded'}), 400
+
+            file = request.files['file']
+            if not allowed_file(file.filename):
+                return jsonify({'error': 'Invalid file type. Please upload CSV or Excel file.'}), 400
+
+            filename = f"portfolio_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{file.filename}"
+            file_path = os.path.join(UPLOAD_FOLDER, filename)
+            file.save(file_path)
+            try:
+                holdings = load_holdings(file_path)
+            finally:
+                os.remove(file_path)
+        else:
+            holdings = load_holdings()
+
+        result = run_portfolio_engine(holdings)
+
+        return jsonify({
+            'success': True,
+            'data': to_api_payload(result),
+            'message': f'Successfully analyzed portfolio with {len(holdings)} positions'
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'trace': traceback.format_exc()
+        }), 500
+
+@app.route('/api/portfolio-state', methods=['GET'])
+def portfolio_state():
+    """Current totals and sector / market-cap buckets of the live portfolio"""
+    return jsonify({'success': True, 'data': get_live_portfolio().to_api_payload()})
+
+@app.route('/api/prices', methods=['POST'])
+def update_prices():
+    """
+    Apply a price tick, e.g. {"CDSL": 1425.5, "MOIL": 338.1}; only the
+    positions in the tick are recomputed. Stop-loss / target levels the tick
+    crosses are returned as alerts.
+    """
+    prices = request.get_json(silent=True)
+    if not isinstance(prices, dict) or not prices:
+        return jsonify({'error': 'Expected a JSON object of symbol: price'}), 400
+
+    try:
+        tick = {str(k).upper(): float(v) for k, v in prices.items()}
+        # NaN, inf or non-positive prices would corrupt the running totals and fire false alerts
+        check_prices(tick)
+        changed = get_live_portfolio().update_prices(tick)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid price: {e}'}), 400
+    alerts = get_stop_monitor().on_tick(tick)
+    for alert in alerts:
+        alert['timestamp'] = alert['timestamp'].isoformat()
+
+    return jsonify({
+        'success': True,
+        'updated': changed,
+        'alerts': alerts,
+        'data': get_live_portfolio().to_api_payload()
+    })
+
+@app.route('/api/tax-harvest', methods=['POST'])
+def tax_harvest():
+    """
+    Lots to sell for tax-loss harvesting against this year's realized gains, e.g.
+    {"realized_stcg": 200000, "realized_ltcg": 300000, "max_turnover": 500000,
+     "exclude_symbols": ["CDSL"], "min_holding_days": 30}
+    """
+    params = request.get_json(silent=True) or {}
+    try:
+        realized = {'STCG': float(params.get('realized_stcg', 0)), 'LTCG': float(params.get('realized_ltcg', 0))}
+        max_turnover = params.get('max_turnover')
+        max_turnover = float(max_turnover) if max_turnover is not None else None
+        min_holding_days = int(params.get('min_holding_days', 0))
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+    exclude_symbols = params.get('exclude_symbols') or []
+    if isinstance(exclude_symbols, str):
+        exclude_symbols = [exclude_symbols]
+    if not isinstance(exclude_symbols, list) or not all(isinstance(s, str) for s in exclude_symbols):
+        return jsonify({'error': 'exclude_symbols must be a symbol or a list of symbols'}), 400
+
+    try:
+        holdings = load_holdings()
+        lots = unrealized_gains(build_tax_lots(transactions_from_holdings(holdings))['open_lots'],
+                                holdings.set_index('Symbol')['Current_Price'])
+        result = harvest_losses(lots, realized, max_turnover,
+                                exclude_symbols=exclude_symbols,
+                                min_holding_days=min_holding_days)
+
+        return jsonify({
+            'success': True,
+            'data': to_api_payload(result),
+            'message': f"Tax saved: ₹{result['summary']['tax_saved']:,.0f} from {result['summary']['lots_sold']} lots"
+        })
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'trace': traceback.format_exc()
+        }), 500
+
+@app.route('/api/risk', methods=['GET'])
+def portfolio_risk():
+    """
+    Volatility, VaR / CVaR, beta and per-position risk contribution of the
+    default holdings from the local price cache (?confidence=0.99&horizon=10)
+    """
+    try:
+        confidence = float(request.args.get('confidence', 0.95))
+        horizon = int(request.args.get('horizon', 1))
+    except ValueError as e:
+        return jsonify({'error': f'Invalid parameter: {e}'}), 400
+
+    try:
+        positions = run_portfolio_engine(load_holdings())['positions']
+        model = get_risk_model(positions['Symbol'].tolist())
+        weights, value, missing = model.weights(positions)
+        return jsonify({
+            'success': True,
+            'data': {
+                'summary': model.portfolio_risk(weights, value, confidence, horizon),
+                'positions': to_api_payload({'positions': model.position_risk(weights)})['positions'],
+                'missing_symbols': missing,
+            }
+        })
+
+    except FileNotFoundError as e:
+        return jsonify({'success': False, 'error': f'{e}. Run price_matrix.py to build the price cache.'}), 404
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'trace': traceback.format_exc()
+        }), 500
+
 @app.route('/api/demo-data', methods=['GET'])
 def get_demo_data():
     """
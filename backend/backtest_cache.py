@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Backtest Result Cache - Content-Addressed, Size-Bounded, On Disk
+================================================================
+
+Stores vectorized backtest results under a SHA-256 key built from:
+- the strategy code version (source of the signal and fill functions)
+- the strategy parameters
+- a fingerprint of the price data (OHLCV bytes and dates)
+- the cost model (cash, commission, sizing, fill)
+
+Each result is one compressed .npz file (trade list, equity curve and the
+analyzer stats as JSON). A hit touches the file's mtime, and the oldest files
+are evicted once the directory grows past max_bytes, giving LRU behaviour
+without a separate index.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import contextlib
+import functools
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import warnings
+warnings.filterwarnings('ignore')
+
+import vectorized_backtest
+from price_matrix import forward_filled
+from vectorized_backtest import (
+    DEFAULT_CASH, DEFAULT_COMMISSION, ohlcv_arrays, run_backtest,
+)
+
+CACHE_DIR = 'backtest_cache'
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024  # 256 MB
+
+
+@functools.lru_cache(maxsize=None)
+def strategy_code_version(strategy: str) -> str:
+    """
+    Hash of the source that determines a strategy's results.
+
+    The whole vectorized_backtest module is hashed: indicators, signal helpers,
+    the fill simulation and the statistics all feed into a cached result, as
+    does price_matrix.forward_filled, which fills gaps before the indicators.
+    """
+    source = strategy + inspect.getsource(vectorized_backtest) + inspect.getsource(forward_filled)
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+def data_fingerprint(arrays: dict) -> str:
+    """Hash of the OHLCV arrays and their dates"""
+    digest = hashlib.sha256()
+    for field in ['open', 'high', 'low', 'close', 'volume']:
+        if field in arrays:
+            digest.update(field.encode())
+            digest.update(np.ascontiguousarray(arrays[field], dtype=np.float64).tobytes())
+    index = arrays.get('index')
+    if index is not None:
+        digest.update(np.asarray(pd.DatetimeIndex(index).asi8).tobytes())
+    return digest.hexdigest()
+
+
+def backtest_key(strategy: str, params: dict, arrays: dict, cost_model: dict) -> str:
+    """Content address for one backtest run"""
+    payload = {
+        'strategy': strategy,
+        'code': strategy_code_version(strategy),
+        'params': params,
+        'data': data_fingerprint(arrays),
+        'costs': cost_model,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class BacktestCache:
+    """Directory of compressed backtest results with size-bounded LRU eviction"""
+
+    def __init__(self, cache_dir: str = CACHE_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def get(self, key: str) -> dict:
+        """Load a cached result, or None on a miss"""
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                meta = json.loads(str(stored['meta']))
+                values, dates, equity = stored['trades'], stored['trade_dates'], stored['equity']
+        except FileNotFoundError:
+            # Never stored, or evicted by another process
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError):
+            # Corrupt or partially written entry - drop it and recompute
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            self.misses += 1
+            return None
+
+        trades = {}
+        for col, dtype in meta['trade_dtypes'].items():
+            if col in meta['date_columns']:
+                # int64 ns since the epoch (UTC for tz-aware columns), rebuilt in the stored zone
+                ns = dates[:, meta['date_columns'].index(col)]
+                tz = meta['date_tz'][col]
+                stamps = pd.to_datetime(ns, utc=True).tz_convert(tz) if tz else pd.to_datetime(ns)
+                trades[col] = pd.Series(stamps).astype(dtype)
+            else:
+                trades[col] = values[:, meta['value_columns'].index(col)].astype(dtype)
+        trades = pd.DataFrame(trades)
+
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)  # mark as recently used; already loaded if evicted meanwhile
+        self.hits += 1
+        return {
+            'trades': trades,
+            'equity': equity,
+            'final_value': meta['final_value'],
+            'stats': meta['stats'],
+            'strategy': meta['strategy'],
+            'params': meta['params'],
+        }
+
+    def put(self, key: str, result: dict):
+        """Store a result and evict least recently used entries if over budget"""
+        trades = result['trades']
+        if not isinstance(trades, pd.DataFrame):
+            trades = pd.DataFrame(trades)
+        date_columns = [col for col in trades.columns if pd.api.types.is_datetime64_any_dtype(trades[col])]
+        value_columns = [col for col in trades.columns if col not in date_columns]
+        # Two dense blocks (numbers and dates) compress better and load faster than one array per column
+        values = trades[value_columns].to_numpy(dtype=np.float64).reshape(len(trades), len(value_columns))
+        date_index = {col: pd.DatetimeIndex(trades[col]).as_unit('ns') for col in date_columns}
+        dates = np.column_stack([date_index[col].asi8 for col in date_columns]) \
+            if date_columns else np.empty((len(trades), 0), dtype=np.int64)
+        meta = {
+            'trade_dtypes': {col: str(trades[col].dtype) for col in trades.columns},
+            'value_columns': value_columns,
+            'date_columns': date_columns,
+            'date_tz': {col: str(date_index[col].tz) if date_index[col].tz is not None else None
+                        for col in date_columns},
+            'final_value': result['final_value'],
+            'stats': result['stats'],
+            'strategy': result.get('strategy'),
+            'params': result.get('params', {}),
+        }
+
+        path = self._path(key)
+        # Unique temp file per writer, renamed into place atomically
+        fd, tmp_path = tempfile.mkstemp(prefix=f"{key}.", suffix='.tmp.npz', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez_compressed(f, equity=np.asarray(result['equity']), trades=values,
+                                    trade_dates=dates, meta=np.array(json.dumps(meta, default=float)))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Delete the least recently used files until the cache fits max_bytes"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz') and '.tmp' not in name:
+                with contextlib.suppress(FileNotFoundError):
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                    entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(os.path.join(self.cache_dir, name))
+            total -= size
+
+    def size_bytes(self) -> int:
+        return sum(os.path.getsize(os.path.join(self.cache_dir, name))
+                   for name in os.listdir(self.cache_dir) if name.endswith('.npz'))
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith('.npz'):
+                os.remove(os.path.join(self.cache_dir, name))
+
+
+def cached_backtest(data, strategy: str = 'sma_cross', cache: BacktestCache = None,
+                    cash: float = DEFAULT_CASH, commission: float = DEFAULT_COMMISSION,
+                    stake: float = 1, percents: float = None, fill: str = 'open', **params) -> dict:
+    """
+    run_backtest() with a content-addressed cache in front of it.
+
+    The result layout is the same as run_backtest(), so it can be passed
+    straight to display_backtest_results().
+    """
+    cache = cache or BacktestCache()
+    arrays = data if isinstance(data, dict) else ohlcv_arrays(data)
+    cost_model = {'cash': cash, 'commission': commission, 'stake': stake,
+                  'percents': percents, 'fill': fill}
+    key = backtest_key(strategy, params, arrays, cost_model)
+
+    result = cache.get(key)
+    if result is not None:
+        return result
+
+    result = run_backtest(arrays, strategy, cash=cash, commission=commission, stake=stake,
+                          percents=percents, fill=fill, **params)
+    cache.put(key, result)
+    return result
+
+
+def main():
+    """Show the cost of a cold run against a cache hit"""
+    import sys
+    import time
+    import yfinance as yf
+    from vectorized_backtest import display_backtest_results
+
+    symbol = sys.argv[1] if len(sys.argv) > 1 else 'RELIANCE.NS'
+    print(f"Backtest Cache - {symbol} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+
+    # tz-aware (yfinance Asia/Kolkata) trades must come back from the cache unchanged
+    index = pd.date_range('2024-01-01 09:15', periods=4, freq='D', tz='Asia/Kolkata')
+    trades = pd.DataFrame({
+        'entry_date': index[:2],
+        'exit_date': pd.DatetimeIndex([index[2], pd.NaT]),
+        'naive_date': index[:2].tz_localize(None),
+        'size': [10.0, 5.0],
+        'pnl': [12.5, -3.0],
+    })
+    with tempfile.TemporaryDirectory() as tmp:
+        scratch = BacktestCache(tmp)
+        scratch.put('roundtrip', {'trades': trades, 'equity': np.array([100000.0, 100012.5]),
+                                  'final_value': 100009.5, 'stats': {}, 'strategy': 'sma_cross', 'params': {}})
+        loaded = scratch.get('roundtrip')['trades']
+    same = loaded.equals(trades) and list(loaded.dtypes) == list(trades.dtypes)
+    print(f"tz-aware trade round trip: {'ok' if same else 'FAILED'}")
+
+    data = yf.Ticker(symbol).history(period='5y', interval='1d', auto_adjust=False, actions=False)
+    if data.empty:
+        print(f"No data found for {symbol}")
+        return
+
+    cache = BacktestCache()
+    for attempt in ['first run', 'second run']:
+        start = time.perf_counter()
+        result = cached_backtest(data, 'sma_cross', cache=cache, pfast=5, pslow=10)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{attempt}: {elapsed:.2f} ms (hits={cache.hits}, misses={cache.misses})")
+
+    display_backtest_results(result)
+    print(f"\nCache size: {cache.size_bytes() / 1024:.1f} KB in {cache.cache_dir}/")
+
+
+if __name__ == "__main__":
+    main()
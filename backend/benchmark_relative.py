@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Benchmark-Relative Performance - Index Return and Alpha Since Each Buy Date
+==========================================================================
+
+Compares every position's return with what the market did over the same
+holding period:
+
+- cached index closes (NIFTY 50 / NIFTY 500 / sector indices, see
+  price_matrix.INDEX_TICKERS) are aligned once into a dates x indices matrix
+  of cumulative levels, forward-filled over holidays
+- the index return since a buy date is level[as_of] / level[buy date] - 1,
+  found for all positions at once with one searchsorted on the date axis and
+  one fancy-indexed read of the level matrix
+- alpha = position return - benchmark return, summarized per account and per
+  loss bucket with investment-weighted np.bincount sums
+
+Positions can be measured against one broad index or against the index of
+their own sector (falling back to the broad index when it is not cached).
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+from portfolio_engine import LOSS_BUCKETS
+from price_matrix import PRICE_CACHE_DIR, INDEX_TICKERS, DEFAULT_INDEX, load_index_close, forward_filled
+
+# Sector index used for sector-relative alpha (sectors not listed use the broad index)
+SECTOR_INDEX = {
+    'Financial Services': 'NIFTYBANK',
+    'Technology': 'NIFTYIT',
+    'Technology/Services': 'NIFTYIT',
+    'Pharmaceuticals': 'NIFTYPHARMA',
+    'Metals & Mining': 'NIFTYMETAL',
+    'Automobile': 'NIFTYAUTO',
+    'FMCG': 'NIFTYFMCG',
+    'Oil & Gas': 'NIFTYENERGY',
+    'Capital Goods': 'NIFTYINFRA',
+}
+
+
+def build_index_levels(names: list = None, cache_dir: str = PRICE_CACHE_DIR) -> dict:
+    """
+    Cumulative-return index for every cached benchmark.
+
+    Returns:
+        Dictionary with 'dates' (datetime64[D] array), 'names' (list) and
+        'levels' (dates x names, forward-filled closes)
+    """
+    closes = {}
+    for name in names or list(INDEX_TICKERS):
+        try:
+            closes[name] = load_index_close(name, cache_dir)
+        except FileNotFoundError:
+            continue
+    if not closes:
+        raise FileNotFoundError("No benchmark indices in the price cache - run download_index_cache()")
+    frame = pd.DataFrame(closes).sort_index()
+    return {
+        'dates': frame.index.values.astype('datetime64[D]'),
+        'names': list(frame.columns),
+        'levels': forward_filled(frame.to_numpy(dtype=np.float64)),
+    }
+
+
+def index_returns(levels: dict, start_dates, index_names, as_of=None) -> np.ndarray:
+    """
+    Index return (%) from each start date to as_of (default: last cached day).
+
+    Uses the last close on or before each date; NaN where the index has no
+    data on the start date, the start is after as_of or the index is not cached.
+    """
+    dates = levels['dates']
+    column = {name: i for i, name in enumerate(levels['names'])}
+    cols = pd.Series(np.asarray(index_names, dtype=object)).map(column).to_numpy(dtype=np.float64)
+    start_dates = np.asarray(start_dates, dtype='datetime64[D]')
+    start = np.searchsorted(dates, start_dates, side='right') - 1
+    end = len(dates) - 1 if as_of is None else \
+        int(np.searchsorted(dates, np.datetime64(pd.Timestamp(as_of).date()), side='right')) - 1
+
+    # Start dates after the last usable close have no return yet
+    valid = ~np.isnan(cols) & (start >= 0) & (end >= 0) & (start_dates <= dates[max(end, 0)])
+    col = np.where(valid, cols, 0).astype(np.int64)
+    row = np.where(valid, start, 0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = (levels['levels'][max(end, 0), col] / levels['levels'][row, col] - 1) * 100
+    return np.where(valid, result, np.nan)
+
+
+def benchmark_for(sectors, benchmark: str = DEFAULT_INDEX, by_sector: bool = False,
+                  available: list = None) -> np.ndarray:
+    """Index name per position: the broad benchmark, or the sector index when cached"""
+    sectors = pd.Series(sectors, dtype=object)
+    if not by_sector:
+        return np.full(len(sectors), benchmark, dtype=object)
+    mapped = sectors.map(SECTOR_INDEX)
+    if available is not None:
+        mapped = mapped.where(mapped.isin(available))
+    return mapped.fillna(benchmark).to_numpy(dtype=object)
+
+
+def benchmark_relative(positions: pd.DataFrame, levels: dict, benchmark: str = DEFAULT_INDEX,
+                       by_sector: bool = False, as_of=None) -> pd.DataFrame:
+    """
+    Benchmark return and alpha for portfolio_engine positions (one or many accounts).
+
+    Args:
+        positions: compute_positions() / analyze_portfolio()['positions'] output
+                   with Buy_Date and Unrealized_PL_Pct (an Account column is kept)
+        levels: build_index_levels() output, built once and reused
+        by_sector: compare with the sector index instead of the broad benchmark
+
+    Returns:
+        positions with Benchmark, Benchmark_Return_Pct, Alpha_Pct and Outperformed
+    """
+    df = positions.copy()
+    names = benchmark_for(df['Sector'] if 'Sector' in df.columns else [None] * len(df),
+                          benchmark, by_sector, levels['names'])
+    df['Benchmark'] = names
+    df['Benchmark_Return_Pct'] = index_returns(levels, pd.to_datetime(df['Buy_Date']).values, names, as_of)
+    df['Alpha_Pct'] = df['Unrealized_PL_Pct'] - df['Benchmark_Return_Pct']
+    df['Outperformed'] = df['Alpha_Pct'] > 0
+    return df
+
+
+def alpha_summary(relative: pd.DataFrame, by: str) -> pd.DataFrame:
+    """Investment-weighted return, benchmark return and alpha per group (Account, Loss_Bucket...)"""
+    priced = relative[relative['Benchmark_Return_Pct'].notna()]
+    codes, labels = pd.factorize(priced[by], sort=True)
+    n = len(labels)
+    weight = priced['Investment_Value'].to_numpy(dtype=np.float64)
+    total = np.bincount(codes, weight, n)
+    denom = np.where(total > 0, total, 1.0)
+
+    def weighted(column):
+        return np.bincount(codes, weight * priced[column].to_numpy(dtype=np.float64), n) / denom
+
+    return pd.DataFrame({
+        by: labels,
+        'Positions': np.bincount(codes, minlength=n),
+        'Investment': total,
+        'Return_Pct': weighted('Unrealized_PL_Pct'),
+        'Benchmark_Return_Pct': weighted('Benchmark_Return_Pct'),
+        'Alpha_Pct': weighted('Alpha_Pct'),
+        'Outperformed': np.bincount(codes, priced['Outperformed'].to_numpy(dtype=np.float64), n).astype(int),
+    })
+
+
+def display_benchmark_relative(relative: pd.DataFrame):
+    print("POSITIONS vs BENCHMARK (since buy date):")
+    print(relative[['Symbol', 'Buy_Date', 'Benchmark', 'Unrealized_PL_Pct', 'Benchmark_Return_Pct',
+                    'Alpha_Pct']].to_string(index=False, float_format='%.2f'))
+    print()
+    if 'Loss_Bucket' in relative.columns:
+        print("ALPHA BY LOSS BUCKET (investment-weighted):")
+        buckets = alpha_summary(relative, 'Loss_Bucket').set_index('Loss_Bucket')
+        buckets = buckets.reindex([b for b in LOSS_BUCKETS if b in buckets.index]).reset_index()
+        print(buckets.to_string(index=False, float_format='%.2f'))
+
+
+def main():
+    """holdings.csv against NIFTY 50 and sector indices, then a many-account timing"""
+    import time
+    from portfolio_engine import analyze_portfolio
+
+    print(f"Benchmark-Relative Performance - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+    try:
+        levels = build_index_levels()
+    except FileNotFoundError as e:
+        print(f"{e}.")
+        return
+    positions = analyze_portfolio()['positions']
+    display_benchmark_relative(benchmark_relative(positions, levels))
+    print()
+    sector_relative = benchmark_relative(positions, levels, by_sector=True)
+    print("SECTOR-INDEX ALPHA:")
+    print(sector_relative[['Symbol', 'Sector', 'Benchmark', 'Alpha_Pct']].to_string(index=False, float_format='%.2f'))
+    print()
+
+    # Scale check: 100k accounts x 20 positions
+    rng = np.random.default_rng(0)
+    n = 2000000
+    first, last = levels['dates'][0], levels['dates'][-1]
+    synthetic = pd.DataFrame({
+        'Account': rng.integers(0, 100000, n),
+        'Symbol': rng.choice(positions['Symbol'].to_numpy(), n),
+        'Sector': rng.choice(positions['Sector'].to_numpy(), n),
+        'Buy_Date': first + rng.integers(0, (last - first).astype(np.int64), n),
+        'Unrealized_PL_Pct': rng.normal(-10, 25, n),
+        'Investment_Value': rng.uniform(1e4, 5e5, n),
+    })
+    start = time.perf_counter()
+    relative = benchmark_relative(synthetic, levels, by_sector=True)
+    accounts = alpha_summary(relative, 'Account')
+    print(f"{n:,} positions in {accounts.shape[0]:,} accounts: "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms "
+          f"(median account alpha {accounts['Alpha_Pct'].median():.2f}%)")
+
+
+if __name__ == "__main__":
+    main()
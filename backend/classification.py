@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Security Classification - Sector, Industry and SEBI Market-Cap Buckets
+======================================================================
+
+One source of sector / industry / market-cap labels for every analysis path,
+instead of Market_Cap and Sector typed into holdings.csv and the 13-entry
+sector_mapping in api_server.py:
+
+- a local master file (securities_master.csv: Symbol, Company, Sector,
+  Industry, Market_Cap_Cr) covers the full universe and is refreshed in bulk
+  with download_master()
+- market-cap buckets follow SEBI's categorization by rank across the
+  universe: top 100 Large Cap, 101-250 Mid Cap, the rest Small Cap
+- the table is held as a dict of column arrays plus a symbol -> row dict, so
+  a lookup is O(1) and classifying n symbols is one vectorized gather
+
+get_classification() keeps one index in memory and reloads it only when the
+master file changes; until download_master() has written one, it falls back
+to the labels in holdings.csv over securities_seed.csv, a few common large
+caps in the same sector names as holdings.csv and benchmark_relative.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import os
+import warnings
+warnings.filterwarnings('ignore')
+
+MASTER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'securities_master.csv')
+SEED_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'securities_seed.csv')
+
+# SEBI categorization: rank by full market capitalization
+LARGE_CAP_RANK = 100
+MID_CAP_RANK = 250
+CAP_BUCKETS = ['Large Cap', 'Mid Cap', 'Small Cap']
+UNKNOWN = 'Unknown'
+
+MASTER_COLUMNS = {
+    'Symbol': ['Symbol', 'symbol', 'Ticker', 'Stock'],
+    'Company': ['Company', 'Company Name', 'Name', 'longName'],
+    'Sector': ['Sector', 'sector'],
+    'Industry': ['Industry', 'industry'],
+    'Market_Cap_Cr': ['Market_Cap_Cr', 'Market Cap (Cr)', 'market_cap_cr'],
+    'Market_Cap': ['Market_Cap', 'market_cap', 'Market Cap', 'Cap'],
+}
+
+
+def normalize_master(df: pd.DataFrame) -> pd.DataFrame:
+    """Standard master columns, upper-case unique symbols"""
+    renames = {}
+    for standard, variations in MASTER_COLUMNS.items():
+        if standard not in df.columns:
+            match = next((col for col in df.columns if col in variations), None)
+            if match is not None:
+                renames[match] = standard
+    df = df.rename(columns=renames)
+    if 'Symbol' not in df.columns:
+        raise ValueError("Master file is missing the Symbol column")
+    df = df.copy()
+    df['Symbol'] = df['Symbol'].astype(str).str.strip().str.upper()
+    for column in ['Company', 'Sector', 'Industry', 'Market_Cap']:
+        if column not in df.columns:
+            df[column] = np.nan
+    if 'Market_Cap_Cr' not in df.columns:
+        df['Market_Cap_Cr'] = np.nan
+    df['Market_Cap_Cr'] = pd.to_numeric(df['Market_Cap_Cr'], errors='coerce')
+    return df.drop_duplicates('Symbol', keep='last').reset_index(drop=True)
+
+
+def cap_buckets(market_cap_cr: np.ndarray, large_rank: int = LARGE_CAP_RANK,
+                mid_rank: int = MID_CAP_RANK) -> tuple:
+    """
+    SEBI-style rank and bucket for every company in the universe.
+
+    Returns:
+        (rank, bucket) arrays; rank is 1 for the largest company, 0 and
+        UNKNOWN where the market cap is missing
+    """
+    caps = np.asarray(market_cap_cr, dtype=np.float64)
+    known = ~np.isnan(caps)
+    order = np.argsort(-np.where(known, caps, -np.inf), kind='stable')
+    rank = np.empty(len(caps), dtype=np.int64)
+    rank[order] = np.arange(1, len(caps) + 1)
+    rank[~known] = 0
+    bucket = np.array(CAP_BUCKETS, dtype=object)[np.searchsorted([large_rank, mid_rank], rank, side='left')]
+    return rank, np.where(known, bucket, UNKNOWN)
+
+
+class Classification:
+    """Symbol -> sector / industry / market-cap bucket index"""
+
+    def __init__(self, master: pd.DataFrame, large_rank: int = LARGE_CAP_RANK, mid_rank: int = MID_CAP_RANK):
+        df = normalize_master(master)
+        rank, bucket = cap_buckets(df['Market_Cap_Cr'].to_numpy(), large_rank, mid_rank)
+        # Without a market cap, keep a bucket the master already states
+        given = df['Market_Cap'].where(df['Market_Cap'].isin(CAP_BUCKETS)).to_numpy(dtype=object)
+        bucket = np.where((bucket == UNKNOWN) & pd.notna(given), given, bucket)
+
+        self.symbols = df['Symbol'].to_numpy(dtype=object)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.columns = {
+            'Company': df['Company'].fillna('').to_numpy(dtype=object),
+            'Sector': df['Sector'].fillna(UNKNOWN).to_numpy(dtype=object),
+            'Industry': df['Industry'].fillna(df['Sector']).fillna(UNKNOWN).to_numpy(dtype=object),
+            'Market_Cap_Cr': df['Market_Cap_Cr'].to_numpy(dtype=np.float64),
+            'Cap_Rank': rank,
+            'Market_Cap': bucket.astype(object),
+        }
+        self.loaded_at = datetime.now()
+
+    @classmethod
+    def from_file(cls, path: str = MASTER_FILE) -> 'Classification':
+        df = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+        return cls(df)
+
+    @classmethod
+    def from_holdings(cls, holdings: pd.DataFrame = None, seed_path: str = SEED_FILE) -> 'Classification':
+        """Labels already in a holdings file over the seed file (stated buckets, no market caps or ranks)"""
+        if holdings is None:
+            from portfolio_engine import load_holdings
+            holdings = load_holdings()
+        seeded = pd.read_csv(seed_path) if seed_path and os.path.exists(seed_path) else pd.DataFrame(columns=['Symbol'])
+        # Holdings rows come last, so their labels win over the seed
+        return cls(pd.concat([seeded, holdings[[c for c in ['Symbol', 'Sector', 'Market_Cap']
+                                                 if c in holdings.columns]]], ignore_index=True))
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol) -> bool:
+        return str(symbol).upper() in self.index
+
+    def lookup(self, symbol: str) -> dict:
+        """All labels for one symbol (None when unknown)"""
+        row = self.index.get(str(symbol).strip().upper())
+        if row is None:
+            return None
+        labels = {name: values[row] for name, values in self.columns.items()}
+        return {'Symbol': self.symbols[row],
+                **{name: v.item() if isinstance(v, np.generic) else v for name, v in labels.items()}}
+
+    def rows(self, symbols) -> np.ndarray:
+        """Row per symbol, -1 where unknown"""
+        return np.fromiter((self.index.get(str(s).strip().upper(), -1) for s in symbols),
+                           dtype=np.int64, count=len(symbols))
+
+    def column(self, name: str, symbols, default=UNKNOWN) -> np.ndarray:
+        """One label column for many symbols"""
+        rows = self.rows(symbols)
+        values = self.columns[name][np.maximum(rows, 0)] if len(self.symbols) else np.full(len(rows), default)
+        return np.where(rows >= 0, values, default)
+
+    def classify(self, symbols) -> pd.DataFrame:
+        """Symbol, Sector, Industry, Market_Cap_Cr, Cap_Rank, Market_Cap for many symbols"""
+        symbols = [str(s).strip().upper() for s in symbols]
+        rows = self.rows(symbols)
+        known = rows >= 0
+        out = pd.DataFrame({'Symbol': symbols})
+        for name, values in self.columns.items():
+            default = np.nan if values.dtype == np.float64 else (0 if values.dtype == np.int64 else UNKNOWN)
+            gathered = values[np.maximum(rows, 0)] if len(self.symbols) else np.full(len(rows), default)
+            out[name] = np.where(known, gathered, default)
+        return out
+
+    def frame(self) -> pd.DataFrame:
+        """The whole index as a DataFrame indexed by symbol"""
+        return pd.DataFrame(self.columns, index=pd.Index(self.symbols, name='Symbol'))
+
+    def apply(self, holdings: pd.DataFrame, columns=('Sector', 'Industry', 'Market_Cap')) -> pd.DataFrame:
+        """holdings with labels from the index; symbols it does not know keep their own"""
+        df = holdings.copy()
+        rows = self.rows(df['Symbol'].tolist())
+        known = rows >= 0
+        for name in columns:
+            labels = self.columns[name][np.maximum(rows, 0)] if len(self.symbols) else np.full(len(rows), UNKNOWN)
+            current = df[name].to_numpy(dtype=object) if name in df.columns else np.full(len(df), UNKNOWN, dtype=object)
+            df[name] = np.where(known, labels, current)
+        return df
+
+
+_cache = {'path': None, 'mtime': None, 'index': None}
+
+
+def get_classification(path: str = MASTER_FILE) -> Classification:
+    """Shared in-memory index, rebuilt only when the master file changes"""
+    mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    if _cache['index'] is None or _cache['path'] != path or _cache['mtime'] != mtime:
+        _cache['index'] = Classification.from_file(path) if mtime is not None else Classification.from_holdings()
+        _cache['path'], _cache['mtime'] = path, mtime
+    return _cache['index']
+
+
+def download_master(symbols: list, path: str = MASTER_FILE, suffix: str = '.NS') -> pd.DataFrame:
+    """Refresh the master file in bulk from yfinance (sector, industry, market cap in ₹ crore)"""
+    import time
+    import yfinance as yf
+
+    records = []
+    for symbol in symbols:
+        try:
+            info = yf.Ticker(f"{symbol}{suffix}").info
+            market_cap = info.get('marketCap')
+            records.append({
+                'Symbol': symbol,
+                'Company': info.get('longName', symbol),
+                'Sector': info.get('sector', UNKNOWN),
+                'Industry': info.get('industry', UNKNOWN),
+                'Market_Cap_Cr': market_cap / 1e7 if market_cap else np.nan,
+            })
+            time.sleep(0.05)  # Rate limiting
+        except Exception as e:
+            print(f"Error fetching {symbol}: {e}")
+            continue
+
+    master = pd.DataFrame(records)
+    if os.path.exists(path):
+        # Keep symbols that were not refreshed this time
+        previous = normalize_master(pd.read_csv(path))
+        master = pd.concat([previous[~previous['Symbol'].isin(master['Symbol'])], master], ignore_index=True)
+    master.to_csv(path, index=False)
+    return master
+
+
+def main():
+    """Classify holdings.csv (optionally refresh the master from a universe CSV first)"""
+    import sys
+    import time
+    from portfolio_engine import load_holdings
+
+    print(f"Security Classification - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+    if len(sys.argv) > 1:
+        from price_matrix import load_universe
+        universe = load_universe(sys.argv[1])
+        print(f"Refreshing {len(universe)} symbols into {MASTER_FILE}...")
+        download_master(universe)
+
+    index = get_classification()
+    source = MASTER_FILE if os.path.exists(MASTER_FILE) else 'holdings.csv (no master file)'
+    print(f"{len(index)} symbols from {source}")
+    print()
+    holdings = load_holdings()
+    print(index.classify(holdings['Symbol']).to_string(index=False, float_format='%.0f'))
+    print()
+
+    # Scale check: 5,000-company universe, 1M lookups
+    rng = np.random.default_rng(0)
+    n = 5000
+    universe = pd.DataFrame({
+        'Symbol': [f"SYM{i:05d}" for i in range(n)],
+        'Sector': rng.choice(['Financial Services', 'Technology', 'Capital Goods', 'Chemicals'], n),
+        'Market_Cap_Cr': rng.lognormal(8, 2, n),
+    })
+    start = time.perf_counter()
+    synthetic = Classification(universe)
+    built = time.perf_counter() - start
+    queries = rng.choice(synthetic.symbols, 1000000)
+    start = time.perf_counter()
+    buckets = synthetic.column('Market_Cap', queries)
+    print(f"Index of {n:,} built in {built * 1000:.0f} ms; {len(queries):,} lookups in "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms "
+          f"({(buckets == 'Large Cap').mean() * 100:.1f}% large cap)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from portfolio_engine import analyze_portfolio, load_holdings
+
 print("=" * 80)
 print("COMPREHENSIVE RISK vs QUALITY MATRIX ANALYSIS")
 print("Complete Portfolio Assessment Framework")
@@ -25,14 +27,15 @@ portfolio_matrix = {
                      'GOOD QUALITY', 'AVERAGE QUALITY', 'AVERAGE QUALITY', 'AVERAGE QUALITY',
                      'HIGH QUALITY', 'AVERAGE QUALITY', 'AVERAGE QUALITY', 'GOOD QUALITY',
                      'AVERAGE QUALITY'],
-
-    # Portfolio Context
-    'portfolio_weight': [13.6, 10.3, 2.8, 0.7, 26.9, 2.9, 2.7, 14.5, 11.1, 2.8, 0.7, 2.7, 8.5],
-    'current_loss': [-17.6, -31.8, -30.5, -29.8, -24.5, -36.9, -36.9, -35.8, -6.0, -60.0, -67.4, -40.5, -55.2]
 }
 
 df = pd.DataFrame(portfolio_matrix)
 
+# Position weight and current loss from the holdings file
+holdings = analyze_portfolio(load_holdings())['positions'].set_index('Symbol')
+df['current_loss'] = df['Symbol'].map(holdings['Unrealized_PL_Pct'])
+df['portfolio_weight'] = df['Symbol'].map(holdings['Position_Size_Pct'])
+
 # Create risk-quality matrix classification
 def classify_stock(row):
     risk_score = row['red_flags']  # Higher = worse
@@ -198,6 +201,20 @@ else:
 print()
 print("🟢 PHASE 3 - QUALITY CONCENTRATION (Month 2-3):")
 quality_stocks = df[df['green_flags'] >= 7]
+# Risk-parity targets under the rebalancer's caps, when the price cache is available
+try:
+    from allocation import allocate
+    from risk_engine import RiskModel
+    model = RiskModel.from_price_cache(holdings.index.tolist())
+    priced = [s for s in holdings.index if s in model.column]
+    parity = allocate(model, priced, holdings.loc[priced, 'Sector'].tolist(), 'risk_parity')
+    parity_target = parity.set_index('Symbol')['Target_Weight_Pct']
+except FileNotFoundError:
+    parity_target = pd.Series(dtype=float)
+except ValueError as e:
+    # Too few cached holdings (or sectors) for the caps to reach a fully invested portfolio
+    print(f"   Risk-parity targets skipped: {e}")
+    parity_target = pd.Series(dtype=float)
 if len(quality_stocks) > 0:
     print(f"   Increase allocation to high-quality stocks:")
     for _, stock in quality_stocks.iterrows():
@@ -205,6 +222,8 @@ if len(quality_stocks) > 0:
         if stock['red_flags'] <= 2:
             target_weight = min(20, current_weight * 1.5)
             print(f"   📈 {stock['Symbol']}: Increase from {current_weight:.1f}% to {target_weight:.1f}%")
+            if stock['Symbol'] in parity_target:
+                print(f"      Risk-parity target within stock/sector caps: {parity_target[stock['Symbol']]:.1f}%")
         else:
             print(f"   ⚖️ {stock['Symbol']}: Quality stock but monitor risk factors")
 else:
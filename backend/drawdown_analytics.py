@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Drawdown Analytics - Historical Drawdown Episodes and Recovery Times
+====================================================================
+
+The reports say "Recovery requires X% gain" from a closed-form formula; this
+module says how long drawdowns of that depth actually took to recover:
+
+- one pass per price history: the running maximum (np.fmax.accumulate down
+  every column of the forward-filled close matrix at once) marks where a
+  symbol is below its previous peak
+- each run of underwater days is an episode: peak date, trough date and
+  depth, and the recovery date (first close back at the peak) or open if it
+  has not recovered yet; runs are found on the flattened matrix with
+  start / end masks and np.minimum.reduceat, with no per-symbol loop
+- the episode table is built once; "median days to recover for drawdowns
+  deeper than X" per symbol or sector is a filter and a groupby on it
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+from price_matrix import PRICE_CACHE_DIR, load_price_cache, forward_filled
+
+MIN_EPISODE_DEPTH_PCT = 5.0  # shallower dips are not recorded as episodes
+
+
+def drawdown_episodes(price_data: dict, min_depth_pct: float = MIN_EPISODE_DEPTH_PCT,
+                      sectors: dict = None) -> pd.DataFrame:
+    """
+    Every drawdown episode of every symbol in an aligned price matrix.
+
+    Args:
+        price_data: price_matrix.load_price_cache() output
+        min_depth_pct: keep episodes at least this deep (% below the peak)
+        sectors: optional {symbol: sector} for the Sector column
+
+    Returns:
+        DataFrame with symbol, peak_date, peak_price, trough_date, trough_price,
+        depth_pct (negative), recovery_date (NaT if open), days_to_trough,
+        days_to_recover (NaN if open), recovered, required_gain_pct
+    """
+    close = forward_filled(price_data['close'])
+    dates = price_data['dates'].values.astype('datetime64[D]')
+    symbols = np.asarray(price_data['symbols'], dtype=object)
+    n_dates, n_symbols = close.shape
+
+    # Running peak per symbol; NaN before listing never sets a peak or counts as underwater
+    peak = np.fmax.accumulate(np.where(np.isnan(close), -np.inf, close), axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        drawdown = np.where(np.isnan(close) | ~np.isfinite(peak), 0.0, close / peak - 1)
+
+    # Column-major flattening keeps each symbol's history contiguous
+    dd = drawdown.T.ravel()
+    under = dd < 0
+    row = np.tile(np.arange(n_dates), n_symbols)
+    col = np.repeat(np.arange(n_symbols), n_dates)
+    starts_mask = under & ~np.r_[False, under[:-1]] | under & (row == 0)
+    ends_mask = under & ~np.r_[under[1:], False] | under & (row == n_dates - 1)
+    starts, ends = np.flatnonzero(starts_mask), np.flatnonzero(ends_mask)
+    if len(starts) == 0:
+        return pd.DataFrame(columns=['symbol', 'peak_date', 'peak_price', 'trough_date', 'trough_price',
+                                     'depth_pct', 'recovery_date', 'days_to_trough', 'days_to_recover',
+                                     'recovered', 'required_gain_pct'])
+
+    # Deepest point of each run: reduceat over the underwater stretches only
+    depth = np.minimum.reduceat(dd, starts)
+    episode = np.cumsum(starts_mask) - 1
+    at_min = under & (dd == depth[np.clip(episode, 0, None)])
+    trough_flat = np.flatnonzero(at_min)
+    _, first = np.unique(episode[trough_flat], return_index=True)
+    trough = trough_flat[first]
+
+    sym = col[starts]
+    peak_row = np.maximum(row[starts] - 1, 0)
+    trough_row = row[trough]
+    end_row = row[ends]
+    recovered = end_row < n_dates - 1
+    recovery_row = np.where(recovered, end_row + 1, 0)
+
+    keep = depth * 100 <= -min_depth_pct
+    peak_date, trough_date = dates[peak_row], dates[trough_row]
+    recovery_date = np.where(recovered, dates[recovery_row], np.datetime64('NaT'))
+    table = pd.DataFrame({
+        'symbol': symbols[sym],
+        'peak_date': peak_date,
+        'peak_price': peak.T.ravel()[starts],
+        'trough_date': trough_date,
+        'trough_price': close.T.ravel()[trough],
+        'depth_pct': depth * 100,
+        'recovery_date': recovery_date,
+        'days_to_trough': (trough_date - peak_date).astype(np.int64),
+        'days_to_recover': np.where(recovered, (recovery_date - peak_date).astype('timedelta64[D]')
+                                    .astype(np.float64), np.nan),
+        'recovered': recovered,
+        'required_gain_pct': (1 / (1 + depth) - 1) * 100,
+    })[keep].reset_index(drop=True)
+    if sectors is not None:
+        table.insert(1, 'Sector', table['symbol'].map(sectors).fillna('Unknown'))
+    return table
+
+
+def current_drawdowns(price_data: dict) -> pd.DataFrame:
+    """Each symbol's drawdown from its running peak on the last cached day"""
+    close = forward_filled(price_data['close'])
+    peak = np.fmax.accumulate(np.where(np.isnan(close), -np.inf, close), axis=0)[-1]
+    last = close[-1]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        depth = np.where(np.isfinite(peak), (last / peak - 1) * 100, np.nan)
+    return pd.DataFrame({'symbol': price_data['symbols'], 'peak_price': peak, 'last_price': last,
+                         'drawdown_pct': depth})
+
+
+def recovery_stats(episodes: pd.DataFrame, deeper_than_pct: float = 20.0, by: str = 'symbol') -> pd.DataFrame:
+    """
+    For drawdowns deeper than X%: count, recovered share and median days to recover.
+
+    Args:
+        deeper_than_pct: depth threshold as a positive % (20 = at least 20% below peak)
+        by: 'symbol', 'Sector' or None for all symbols together
+    """
+    deep = episodes[episodes['depth_pct'] <= -abs(deeper_than_pct)]
+    keys = [by] if by else []
+    groups = deep.groupby(keys) if keys else deep.assign(_all='all').groupby('_all')
+    stats = groups.agg(
+        Episodes=('depth_pct', 'size'),
+        Recovered=('recovered', 'sum'),
+        Median_Depth_Pct=('depth_pct', 'median'),
+        Median_Days_To_Trough=('days_to_trough', 'median'),
+        Median_Days_To_Recover=('days_to_recover', 'median'),
+        Max_Days_To_Recover=('days_to_recover', 'max'),
+    ).reset_index()
+    stats['Recovered_Pct'] = stats['Recovered'] / stats['Episodes'] * 100
+    return stats.drop(columns='_all', errors='ignore')
+
+
+def recovery_outlook(positions: pd.DataFrame, episodes: pd.DataFrame) -> pd.DataFrame:
+    """
+    History of drawdowns at least as deep as each position's current loss.
+
+    Uses the symbol's own episodes, and its sector's (when episodes carry a
+    Sector column) as a larger sample.
+    """
+    loss = -positions['Unrealized_PL_Pct'].clip(upper=0).to_numpy(dtype=np.float64)
+    symbols = positions['Symbol'].to_numpy(dtype=object)
+    ep_symbol = episodes['symbol'].to_numpy(dtype=object)
+    ep_depth = -episodes['depth_pct'].to_numpy(dtype=np.float64)
+    ep_days = episodes['days_to_recover'].to_numpy(dtype=np.float64)
+
+    # Positions x episodes comparison (episode tables per holding are small)
+    deep_enough = ep_depth[None, :] >= loss[:, None]
+    own = deep_enough & (ep_symbol[None, :] == symbols[:, None])
+
+    def median_days(mask):
+        days = np.where(mask & ~np.isnan(ep_days)[None, :], ep_days[None, :], np.nan)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            return np.nanmedian(days, axis=1) if days.shape[1] else np.full(len(mask), np.nan)
+
+    out = pd.DataFrame({
+        'Symbol': symbols,
+        'Loss_Pct': loss,
+        'Required_Gain_Pct': np.where(loss < 100, (1 / (1 - loss / 100) - 1) * 100, np.inf),
+        'Similar_Episodes': own.sum(axis=1),
+        'Recovered': (own & ~np.isnan(ep_days)[None, :]).sum(axis=1),
+        'Median_Days_To_Recover': median_days(own),
+    })
+    if 'Sector' in episodes.columns and 'Sector' in positions.columns:
+        ep_sector = episodes['Sector'].to_numpy(dtype=object)
+        sector = deep_enough & (ep_sector[None, :] == positions['Sector'].to_numpy(dtype=object)[:, None])
+        out['Sector_Episodes'] = sector.sum(axis=1)
+        out['Sector_Median_Days_To_Recover'] = median_days(sector)
+    return out
+
+
+def main():
+    """Episodes for the cached holdings, recovery stats, outlook per position, then a timing"""
+    import time
+    from portfolio_engine import analyze_portfolio
+
+    print(f"Drawdown Analytics - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+    positions = analyze_portfolio()['positions']
+    try:
+        price_data = load_price_cache(positions['Symbol'].tolist(), cache_dir=PRICE_CACHE_DIR)
+    except FileNotFoundError as e:
+        print(f"{e}. Run price_matrix.py first to build the cache.")
+        return
+    sectors = dict(zip(positions['Symbol'], positions['Sector']))
+    episodes = drawdown_episodes(price_data, sectors=sectors)
+    print(f"{len(episodes)} drawdown episodes deeper than {MIN_EPISODE_DEPTH_PCT:.0f}% "
+          f"across {episodes['symbol'].nunique()} symbols")
+    print()
+    print("DRAWDOWNS DEEPER THAN 20% - PER SECTOR:")
+    print(recovery_stats(episodes, 20, by='Sector').to_string(index=False, float_format='%.1f'))
+    print()
+    print("RECOVERY OUTLOOK FOR CURRENT LOSSES:")
+    print(recovery_outlook(positions, episodes).to_string(index=False, float_format='%.1f'))
+    print()
+
+    # Scale check: 2,000 symbols x 10 years of daily closes
+    rng = np.random.default_rng(0)
+    n_dates, n_symbols = 2520, 2000
+    walk = np.exp(np.cumsum(rng.normal(0.0003, 0.02, (n_dates, n_symbols)), axis=0)) * 100
+    synthetic = {'dates': pd.bdate_range('2015-01-01', periods=n_dates),
+                 'symbols': [f"SYM{i:04d}" for i in range(n_symbols)], 'close': walk}
+    start = time.perf_counter()
+    table = drawdown_episodes(synthetic)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    stats = recovery_stats(table, 30)
+    print(f"{n_symbols:,} symbols x {n_dates:,} days: {len(table):,} episodes in {built * 1000:.0f} ms, "
+          f"'deeper than 30%' stats in {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"(median {stats['Median_Days_To_Recover'].median():.0f} days)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from portfolio_engine import analyze_portfolio, load_holdings
+
 print("=" * 80)
 print("ENHANCED FUNDAMENTAL ANALYSIS")
 print("RED FLAG CHECKPOINT FRAMEWORK")
@@ -37,14 +39,15 @@ checkpoint_data = {
     'debt_3y_vs_5y': [0.8, 1.2, 1.4, 1.1, 1.3, 1.6, 1.5, 0.9, 1.8, 2.1, 1.7, 1.2, 1.4],  # Ratio: higher = debt increased
     'return_3y': [-12.5, -28.4, -45.2, -35.6, -18.7, -42.3, -25.8, -38.9, 15.2, -65.4, -72.1, -28.9, -58.7],
     'return_1y': [-17.6, -31.8, -30.5, -29.8, -24.5, -36.9, -36.9, -35.8, -6.0, -60.0, -67.4, -40.5, -55.2],
-
-    # Current Portfolio Impact
-    'current_loss_pct': [-17.59, -31.77, -30.54, -29.78, -24.52, -36.93, -36.87, -35.83, -6.00, -60.04, -67.39, -40.51, -55.22],
-    'portfolio_weight': [13.6, 10.3, 2.8, 0.7, 26.9, 2.9, 2.7, 14.5, 11.1, 2.8, 0.7, 2.7, 8.5]
 }
 
 df = pd.DataFrame(checkpoint_data)
 
+# Position weight and current loss from the holdings file
+holdings = analyze_portfolio(load_holdings())['positions'].set_index('Symbol')
+df['current_loss_pct'] = df['Symbol'].map(holdings['Unrealized_PL_Pct'])
+df['portfolio_weight'] = df['Symbol'].map(holdings['Position_Size_Pct'])
+
 # Apply checkpoint criteria to identify red flags
 def apply_checkpoint(row):
     red_flags = 0
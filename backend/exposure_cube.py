@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Exposure Cube - Sector x Market Cap x Gain Type Aggregates Built Once
+=====================================================================
+
+portfolio_with_market_cap.py and sector_analysis.py group and filter the same
+positions again for every view (df[df['Market_Cap'] == 'Small Cap'], one
+groupby per breakdown). The cube aggregates them once:
+
+- every position gets an integer code per dimension (Sector, Market_Cap,
+  Capital_Gain_Type by default); one np.bincount over the combined cell index
+  fills a measures x dim1 x dim2 x ... array
+- roll-ups and drill-downs are sums over axes of that small array, and
+  filters are index selections on it; the holdings are never scanned again
+- a position change subtracts the position's old contribution from its cell
+  and adds the new one, so updates cost O(changed positions)
+
+Measures: Investment, Current_Value, Loss_Amount (net, positive = money
+lost, as in portfolio_engine.group_summary), Gross_Loss (losing positions
+only), Stock_Count and the P&L % sum behind average-loss figures.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+from portfolio_engine import compute_positions
+
+DIMENSIONS = ['Sector', 'Market_Cap', 'Capital_Gain_Type']
+MEASURES = ['Investment', 'Current_Value', 'Loss_Amount', 'Gross_Loss', 'Stock_Count', 'PL_Pct_Sum']
+UNKNOWN = 'Unknown'
+
+
+def position_measures(positions: pd.DataFrame) -> np.ndarray:
+    """positions x MEASURES contribution of each position"""
+    investment = positions['Investment_Value'].to_numpy(dtype=np.float64)
+    current = positions['Current_Value'].to_numpy(dtype=np.float64)
+    loss = investment - current
+    return np.column_stack([
+        investment,
+        current,
+        loss,
+        np.maximum(loss, 0.0),
+        np.ones(len(positions)),
+        positions['Unrealized_PL_Pct'].to_numpy(dtype=np.float64),
+    ])
+
+
+class ExposureCube:
+    """Pre-aggregated exposure by every combination of the dimension labels"""
+
+    def __init__(self, positions: pd.DataFrame, dimensions: list = None):
+        """positions: holdings or portfolio_engine.compute_positions() output"""
+        if 'Investment_Value' not in positions.columns:
+            positions = compute_positions(positions)
+        self.dimensions = list(dimensions or [d for d in DIMENSIONS if d in positions.columns])
+        self.labels = {}
+        codes = []
+        for dim in self.dimensions:
+            dim_codes, labels = pd.factorize(positions[dim].astype(object).fillna(UNKNOWN), sort=True)
+            self.labels[dim] = list(labels)
+            codes.append(dim_codes)
+        self.codes = {dim: {label: i for i, label in enumerate(self.labels[dim])} for dim in self.dimensions}
+
+        # Per-position cell and contribution, kept for incremental updates
+        self.symbols = {symbol: i for i, symbol in enumerate(positions['Symbol'].astype(str))}
+        self.cells = np.column_stack(codes) if codes else np.zeros((len(positions), 0), dtype=np.int64)
+        self.contrib = position_measures(positions)
+        self.build()
+
+    @property
+    def shape(self) -> tuple:
+        return tuple(len(self.labels[dim]) for dim in self.dimensions)
+
+    def build(self):
+        """Aggregate every position into the cube (one bincount per measure)"""
+        shape = self.shape
+        flat = np.ravel_multi_index(self.cells.T, shape) if self.dimensions else np.zeros(len(self.cells), np.int64)
+        size = int(np.prod(shape))
+        self.values = np.stack([np.bincount(flat, self.contrib[:, m], size)
+                                for m in range(len(MEASURES))]).reshape((len(MEASURES),) + shape)
+        self.built_at = datetime.now()
+
+    def _code(self, dim: str, label) -> int:
+        """Code for a label, growing the dimension when it is new"""
+        label = UNKNOWN if pd.isna(label) else label
+        if label not in self.codes[dim]:
+            self.codes[dim][label] = len(self.labels[dim])
+            self.labels[dim].append(label)
+            axis = 1 + self.dimensions.index(dim)
+            pad = [(0, 0)] * self.values.ndim
+            pad[axis] = (0, 1)
+            self.values = np.pad(self.values, pad)
+        return self.codes[dim][label]
+
+    def update(self, positions: pd.DataFrame):
+        """
+        Insert or replace positions (rows keyed by Symbol) in place.
+
+        Only the changed positions' cells are touched; quantity 0 removes a
+        position's exposure.
+        """
+        if 'Investment_Value' not in positions.columns:
+            positions = compute_positions(positions)
+        symbols = positions['Symbol'].astype(str).tolist()
+        new_cells = np.array([[self._code(dim, label) for dim, label in zip(self.dimensions, row)]
+                              for row in positions[self.dimensions].itertuples(index=False)],
+                             dtype=np.int64).reshape(len(positions), len(self.dimensions))
+        new_contrib = position_measures(positions)
+        empty = positions['Quantity'].to_numpy(dtype=np.float64) == 0 if 'Quantity' in positions.columns \
+            else np.zeros(len(positions), dtype=bool)
+        new_contrib[empty] = 0.0
+
+        rows = []
+        for symbol in symbols:
+            if symbol not in self.symbols:
+                self.symbols[symbol] = len(self.cells) + len(rows)
+                rows.append(True)
+        if rows:
+            self.cells = np.vstack([self.cells, np.zeros((len(rows), len(self.dimensions)), dtype=np.int64)])
+            self.contrib = np.vstack([self.contrib, np.zeros((len(rows), len(MEASURES)))])
+        idx = np.array([self.symbols[s] for s in symbols], dtype=np.int64)
+
+        measure_axis = np.arange(len(MEASURES))[:, None]
+        old_index = (measure_axis,) + tuple(self.cells[idx].T[:, None, :])
+        np.subtract.at(self.values, old_index, self.contrib[idx].T)
+        self.cells[idx] = new_cells
+        self.contrib[idx] = new_contrib
+        new_index = (measure_axis,) + tuple(new_cells.T[:, None, :])
+        np.add.at(self.values, new_index, new_contrib.T)
+
+    def remove(self, symbols: list):
+        """Drop positions' exposure (same as updating them to quantity 0)"""
+        idx = np.array([self.symbols[s] for s in symbols if s in self.symbols], dtype=np.int64)
+        if idx.size == 0:
+            return
+        measure_axis = np.arange(len(MEASURES))[:, None]
+        np.subtract.at(self.values, (measure_axis,) + tuple(self.cells[idx].T[:, None, :]), self.contrib[idx].T)
+        self.contrib[idx] = 0.0
+
+    def _select(self, filters: dict) -> np.ndarray:
+        """Cube restricted to filter labels (a label or a list of labels per dimension)"""
+        values = self.values
+        for dim, wanted in (filters or {}).items():
+            wanted = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+            idx = [self.codes[dim][label] for label in wanted if label in self.codes[dim]]
+            values = np.take(values, idx, axis=1 + self.dimensions.index(dim))
+        return values
+
+    def totals(self, filters: dict = None) -> dict:
+        """All measures summed over the (filtered) cube"""
+        sums = self._select(filters).reshape(len(MEASURES), -1).sum(axis=1)
+        out = dict(zip(MEASURES, sums.tolist()))
+        out['Stock_Count'] = int(round(out['Stock_Count']))
+        return out
+
+    def rollup(self, by=None, filters: dict = None) -> pd.DataFrame:
+        """
+        Measures grouped by one or more dimensions (drill down by passing more).
+
+        Args:
+            by: dimension name or list of names; None for the grand total
+            filters: {dimension: label or [labels]} applied before grouping
+
+        Returns:
+            DataFrame with the group labels, the measures, Portfolio_Weight
+            (% of total investment of the whole cube), Loss_Pct and Avg_PL_Pct;
+            empty groups are dropped
+        """
+        by = [by] if isinstance(by, str) else list(by or [])
+        values = self._select(filters)
+        keep = [1 + self.dimensions.index(dim) for dim in by]
+        summed = values.sum(axis=tuple(a for a in range(1, values.ndim) if a not in keep))
+        # Bring the grouped axes into the order requested
+        order = sorted(range(len(by)), key=lambda i: keep[i])
+        summed = np.moveaxis(summed, list(range(1, len(by) + 1)), [1 + i for i in order])
+
+        # Labels of the selected cells in each grouped dimension
+        axis_labels = []
+        for dim in by:
+            labels = self.labels[dim]
+            wanted = (filters or {}).get(dim)
+            if wanted is not None:
+                wanted = wanted if isinstance(wanted, (list, tuple, set)) else [wanted]
+                labels = [label for label in wanted if label in self.codes[dim]]
+            axis_labels.append(labels)
+
+        flat = summed.reshape(len(MEASURES), -1).T
+        if by:
+            index = pd.MultiIndex.from_product(axis_labels, names=by).to_frame(index=False)
+        else:
+            index = pd.DataFrame(index=[0])
+        table = pd.concat([index, pd.DataFrame(flat, columns=MEASURES)], axis=1)
+        table = table[table['Stock_Count'] > 0].reset_index(drop=True)
+        table['Stock_Count'] = table['Stock_Count'].round().astype(int)
+
+        total_investment = self.values[0].sum()
+        table['Portfolio_Weight'] = table['Investment'] / total_investment * 100 if total_investment else 0.0
+        table['Loss_Pct'] = np.where(table['Investment'] != 0,
+                                     table['Loss_Amount'] / table['Investment'].where(table['Investment'] != 0, 1) * 100,
+                                     0.0)
+        table['Avg_PL_Pct'] = table['PL_Pct_Sum'] / table['Stock_Count']
+        return table.drop(columns='PL_Pct_Sum')
+
+
+def display_cube(cube: ExposureCube):
+    print("BY MARKET CAP:")
+    print(cube.rollup('Market_Cap').to_string(index=False, float_format='%.2f'))
+    print()
+    print("BY SECTOR:")
+    print(cube.rollup('Sector').sort_values('Portfolio_Weight', ascending=False)
+          .to_string(index=False, float_format='%.2f'))
+    print()
+    print("MARKET CAP x GAIN TYPE:")
+    print(cube.rollup(['Market_Cap', 'Capital_Gain_Type']).to_string(index=False, float_format='%.2f'))
+
+
+def main():
+    """Cube for holdings.csv, a drill-down and an incremental update, then a large-portfolio timing"""
+    import time
+    from portfolio_engine import load_holdings
+
+    print(f"Exposure Cube - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+    holdings = load_holdings()
+    cube = ExposureCube(holdings)
+    display_cube(cube)
+    print()
+    print("DRILL-DOWN: Small Cap by sector")
+    print(cube.rollup('Sector', {'Market_Cap': 'Small Cap'}).to_string(index=False, float_format='%.2f'))
+    print()
+
+    # Exit half of FACT: one position's cell changes, nothing is re-scanned
+    trade = holdings[holdings['Symbol'] == 'FACT'].copy()
+    trade['Quantity'] = trade['Quantity'] // 2
+    cube.update(trade)
+    print(f"After selling half of FACT: Large Cap investment ₹"
+          f"{cube.totals({'Market_Cap': 'Large Cap'})['Investment']:,.0f}")
+    print()
+
+    # Scale check: 1M positions
+    rng = np.random.default_rng(0)
+    n = 1000000
+    synthetic = pd.DataFrame({
+        'Symbol': np.arange(n).astype(str),
+        'Quantity': rng.integers(1, 500, n).astype(np.float64),
+        'Avg_Cost': rng.uniform(50, 3000, n),
+        'Sector': rng.choice(holdings['Sector'].unique(), n),
+        'Market_Cap': rng.choice(['Large Cap', 'Mid Cap', 'Small Cap'], n),
+        'Capital_Gain_Type': rng.choice(['LTCG', 'STCG'], n),
+    })
+    synthetic['Current_Price'] = synthetic['Avg_Cost'] * rng.uniform(0.4, 1.4, n)
+    positions = compute_positions(synthetic)
+    start = time.perf_counter()
+    big = ExposureCube(positions)
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    for cap in ['Large Cap', 'Mid Cap', 'Small Cap']:
+        big.rollup('Sector', {'Market_Cap': cap})
+    queried = time.perf_counter() - start
+    start = time.perf_counter()
+    big.update(positions.iloc[:1000])
+    updated = time.perf_counter() - start
+    print(f"{n:,} positions: cube built in {built * 1000:.0f} ms, 3 drill-downs in {queried * 1000:.1f} ms, "
+          f"1,000-position update in {updated * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo Bootstrap - Confidence Intervals for Backtest Results
+=================================================================
+
+Resamples a strategy's trade returns (or daily returns) thousands of times and
+reports the spread of final equity, max drawdown and Sharpe ratio instead of
+the single numbers from one backtest. All paths are generated as one
+paths x steps matrix, so the whole simulation is a few NumPy operations:
+
+- i.i.d. bootstrap: every step draws any observation with replacement
+- block bootstrap: draws runs of `block_size` consecutive observations to
+  keep streaks and volatility clustering intact
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+from vectorized_backtest import DEFAULT_CASH, TRADING_DAYS
+
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def trade_returns(result: dict) -> np.ndarray:
+    """Net return of each closed trade (pnl after commission / capital deployed)"""
+    trades = result['trades']
+    closed = ~np.asarray(trades['is_open'], dtype=bool)
+    capital = np.asarray(trades['entry_price'])[closed] * np.asarray(trades['size'])[closed]
+    return np.asarray(trades['pnlcomm'])[closed] / capital
+
+
+def equity_returns(equity: np.ndarray) -> np.ndarray:
+    """Per-bar returns of an equity curve"""
+    equity = np.asarray(equity, dtype=np.float64)
+    return np.diff(equity) / equity[:-1]
+
+
+def bootstrap_indices(n_obs: int, n_paths: int, path_length: int, block_size: int = 1,
+                      seed: int = None) -> np.ndarray:
+    """
+    Sample indices for every path at once.
+
+    block_size > 1 draws circular blocks of consecutive observations.
+    """
+    rng = np.random.default_rng(seed)
+    if block_size <= 1:
+        return rng.integers(0, n_obs, size=(n_paths, path_length))
+
+    n_blocks = -(-path_length // block_size)
+    starts = rng.integers(0, n_obs, size=(n_paths, n_blocks, 1))
+    idx = (starts + np.arange(block_size)) % n_obs
+    return idx.reshape(n_paths, n_blocks * block_size)[:, :path_length]
+
+
+def simulate_paths(returns: np.ndarray, n_paths: int = 10000, path_length: int = None,
+                   block_size: int = 1, start_value: float = DEFAULT_CASH,
+                   seed: int = None) -> np.ndarray:
+    """Equity paths (n_paths x path_length) compounded from resampled returns"""
+    returns = np.asarray(returns, dtype=np.float64)
+    returns = returns[np.isfinite(returns)]
+    if len(returns) == 0:
+        raise ValueError("No finite returns to resample")
+
+    path_length = path_length or len(returns)
+    idx = bootstrap_indices(len(returns), n_paths, path_length, block_size, seed)
+    paths = returns[idx]
+    paths += 1.0
+    np.cumprod(paths, axis=1, out=paths)
+    paths *= start_value
+    return paths
+
+
+def path_statistics(paths: np.ndarray, start_value: float = DEFAULT_CASH,
+                    periods_per_year: int = TRADING_DAYS) -> dict:
+    """Final equity, max drawdown (%) and Sharpe for every path"""
+    final = paths[:, -1].copy()
+
+    peak = np.maximum.accumulate(paths, axis=1)
+    np.maximum(peak, start_value, out=peak)
+    drawdown = ((peak - paths) / peak).max(axis=1) * 100
+
+    # Per-step returns recovered from the compounded path
+    step_returns = np.empty_like(paths)
+    step_returns[:, 0] = paths[:, 0] / start_value - 1
+    np.divide(paths[:, 1:], paths[:, :-1], out=step_returns[:, 1:])
+    step_returns[:, 1:] -= 1
+    mean = step_returns.mean(axis=1)
+    std = step_returns.std(axis=1, ddof=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.where(std > 0, mean / std * np.sqrt(periods_per_year), np.nan)
+
+    return {'final_value': final, 'max_drawdown': drawdown, 'sharpe': sharpe}
+
+
+def confidence_intervals(stats: dict, percentiles: tuple = DEFAULT_PERCENTILES) -> pd.DataFrame:
+    """Percentile table (rows = metric, columns = percentile) plus mean"""
+    rows = {}
+    for metric, values in stats.items():
+        values = values[np.isfinite(values)]
+        row = dict(zip([f"p{p}" for p in percentiles], np.percentile(values, percentiles))) \
+            if len(values) else {f"p{p}": np.nan for p in percentiles}
+        row['mean'] = values.mean() if len(values) else np.nan
+        rows[metric] = row
+    return pd.DataFrame(rows).T
+
+
+def run_monte_carlo(returns: np.ndarray, n_paths: int = 10000, path_length: int = None,
+                    block_size: int = 1, start_value: float = DEFAULT_CASH,
+                    periods_per_year: int = TRADING_DAYS, percentiles: tuple = DEFAULT_PERCENTILES,
+                    seed: int = None) -> dict:
+    """
+    Bootstrap a return series and summarize the outcome distribution.
+
+    Args:
+        returns: trade returns (see trade_returns) or per-bar returns
+                 (see equity_returns)
+        block_size: 1 for i.i.d. resampling, >1 for a circular block bootstrap
+        periods_per_year: annualization for Sharpe; use the number of trades
+                          per year when resampling trade returns
+
+    Returns:
+        Dictionary with per-path 'stats', the 'intervals' table and
+        'prob_loss' (share of paths ending below start_value)
+    """
+    paths = simulate_paths(returns, n_paths, path_length, block_size, start_value, seed)
+    stats = path_statistics(paths, start_value, periods_per_year)
+    return {
+        'stats': stats,
+        'intervals': confidence_intervals(stats, percentiles),
+        'prob_loss': float((stats['final_value'] < start_value).mean()),
+        'n_paths': n_paths,
+        'path_length': paths.shape[1],
+        'block_size': block_size,
+    }
+
+
+def display_monte_carlo(mc: dict, title: str = "MONTE CARLO BOOTSTRAP"):
+    """Print the confidence interval table"""
+    print(f"\n{'='*80}")
+    print(f"{title} ({mc['n_paths']:,} paths x {mc['path_length']:,} steps, block={mc['block_size']})")
+    print("=" * 80)
+    print(mc['intervals'].to_string(float_format='%.2f'))
+    print(f"\nProbability of ending below starting value: {mc['prob_loss'] * 100:.1f}%")
+
+
+def main():
+    """Bootstrap the SmaCross trade list for one symbol"""
+    import sys
+    import time
+    import yfinance as yf
+    from vectorized_backtest import run_backtest
+
+    symbol = sys.argv[1] if len(sys.argv) > 1 else 'RELIANCE.NS'
+    print(f"Monte Carlo Bootstrap - {symbol} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    data = yf.Ticker(symbol).history(period='5y', interval='1d', auto_adjust=False, actions=False)
+    if data.empty:
+        print(f"No data found for {symbol}")
+        return
+
+    result = run_backtest(data, 'sma_cross', percents=95)
+    returns = trade_returns(result)
+    trades_per_year = len(returns) / (len(data) / TRADING_DAYS)
+
+    start = time.perf_counter()
+    mc = run_monte_carlo(returns, n_paths=10000, periods_per_year=trades_per_year)
+    print(f"Simulated in {(time.perf_counter() - start) * 1000:.0f} ms")
+    display_monte_carlo(mc, "TRADE RETURN BOOTSTRAP")
+
+    mc = run_monte_carlo(equity_returns(result['equity']), n_paths=10000, block_size=20)
+    display_monte_carlo(mc, "DAILY RETURN BLOCK BOOTSTRAP")
+
+
+if __name__ == "__main__":
+    main()
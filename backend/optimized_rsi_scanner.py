@@ -15,14 +15,7 @@ import time
 import os
 warnings.filterwarnings('ignore')
 
-def calculate_rsi(prices: pd.Series, period: int = 14) -> pd.Series:
-    """Calculate RSI"""
-    delta = prices.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+from scanner_signals import scanner_indicators, momentum_scores, entry_signals, recommendation
 
 def analyze_single_stock(symbol: str, data: pd.DataFrame) -> dict:
     """Analyze single stock for entry opportunity"""
@@ -30,28 +23,10 @@ def analyze_single_stock(symbol: str, data: pd.DataFrame) -> dict:
     # Clean data
     data.columns = [col.lower() for col in data.columns]
 
-    # Calculate RSI
-    data['rsi'] = calculate_rsi(data['close'])
-
-    # Volume analysis
-    data['volume_ma'] = data['volume'].rolling(window=20).mean()
-    data['volume_ratio'] = data['volume'] / data['volume_ma']
-
-    # Price momentum
-    data['price_change_5d'] = ((data['close'] - data['close'].shift(5)) / data['close'].shift(5)) * 100
-    data['price_change_10d'] = ((data['close'] - data['close'].shift(10)) / data['close'].shift(10)) * 100
-
-    # MACD
-    ema12 = data['close'].ewm(span=12).mean()
-    ema26 = data['close'].ewm(span=26).mean()
-    data['macd'] = ema12 - ema26
-    data['macd_signal'] = data['macd'].ewm(span=9).mean()
-
-    # Moving averages
-    data['sma_10'] = data['close'].rolling(window=10).mean()
-    data['sma_20'] = data['close'].rolling(window=20).mean()
-    data['sma_50'] = data['close'].rolling(window=50).mean()
-    data['sma_220'] = data['close'].rolling(window=220).mean()
+    # All scanner indicators (RSI, volume ratio, momentum, MACD, SMAs) from the shared signal module
+    ind = scanner_indicators(data[['close']].to_numpy(), data[['volume']].to_numpy())
+    for name, values in ind.items():
+        data[name] = values[:, 0]
 
     # Get latest values
     latest = data.iloc[-1]
@@ -61,31 +36,15 @@ def analyze_single_stock(symbol: str, data: pd.DataFrame) -> dict:
     volume_ratio = latest['volume_ratio']
     price_change_5d = latest['price_change_5d']
 
-    # Relaxed criteria for realistic opportunities
-    rsi_in_range = 40 <= rsi <= 55  # Slightly broader range
-    volume_good = volume_ratio > 1.1  # Above average volume
-
     # DMA filters - stock should be above both 50 DMA and 220 DMA
     above_50dma = latest['close'] > latest['sma_50'] if not pd.isna(latest['sma_50']) else False
     above_220dma = latest['close'] > latest['sma_220'] if not pd.isna(latest['sma_220']) else False
-    dma_criteria = above_50dma and above_220dma
 
-    momentum_positive = (
-        price_change_5d > -2 or  # Not falling too fast
-        latest['macd'] > latest['macd_signal'] or  # MACD bullish
-        latest['close'] > latest['sma_10']  # Above short MA
-    )
+    # RSI 40-55, volume > 1.1x, positive momentum, above 50 & 220 DMA
+    entry_signal = entry_signals(ind)[-1, 0]
 
     # Calculate momentum score
-    momentum_score = 0
-    if volume_ratio > 1.3: momentum_score += 1  # Strong volume
-    if price_change_5d > 1: momentum_score += 1  # Price rising
-    if latest['macd'] > latest['macd_signal']: momentum_score += 1  # MACD bullish
-    if latest['close'] > latest['sma_10']: momentum_score += 1  # Above short MA
-    if latest['close'] > latest['sma_20']: momentum_score += 1  # Above medium MA
-    if above_50dma: momentum_score += 1  # Above 50 DMA
-    if above_220dma: momentum_score += 1  # Above 220 DMA
-    if latest['price_change_10d'] > 0: momentum_score += 1  # 10-day positive
+    momentum_score = int(momentum_scores(ind)[-1, 0])
 
     # RSI trend (is it rising?)
     rsi_values = data['rsi'].tail(5).dropna()
@@ -94,7 +53,7 @@ def analyze_single_stock(symbol: str, data: pd.DataFrame) -> dict:
     else:
         rsi_trend = 0
 
-    if rsi_in_range and volume_good and momentum_positive and dma_criteria:
+    if entry_signal:
         return {
             'symbol': symbol,
             'current_rsi': rsi,
@@ -216,9 +175,7 @@ def generate_trading_recommendations(results_df: pd.DataFrame):
     print("-" * 60)
 
     for i, (_, row) in enumerate(high_quality.head(5).iterrows(), 1):
-        recommendation = "STRONG BUY" if row['momentum_score'] >= 6 else "BUY"
-
-        print(f"{i}. {row['symbol']} - {recommendation}")
+        print(f"{i}. {row['symbol']} - {recommendation(row['momentum_score'], row['volume_ratio'])}")
         print(f"   RSI: {row['current_rsi']:.1f} (Target: 70)")
         print(f"   Volume: {row['volume_ratio']:.1f}x average")
         print(f"   5-day return: {row['price_change_5d']:.1f}%")
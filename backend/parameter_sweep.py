@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Parallel Parameter Sweep - Tune pfast/pslow and exitbars Across Symbols
+=======================================================================
+
+Evaluates a grid, random or Latin-hypercube sample of strategy parameters for
+every symbol with the vectorized backtest engine. Work is split by symbol
+across a process pool; the price arrays are handed to each worker once at
+start-up and only read from there, and each worker caches indicator arrays so
+every SMA/EMA period is computed once per symbol no matter how many parameter
+combinations use it.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import os
+import warnings
+warnings.filterwarnings('ignore')
+
+from vectorized_backtest import (
+    DEFAULT_CASH, DEFAULT_COMMISSION, ohlcv_arrays, sma, ema, falling_closes,
+    crossover_trades, exit_after_bars, simulate_trades,
+)
+
+# Default search spaces for the notebook strategies
+PARAMETER_SPACES = {
+    'sma_cross': {'pfast': list(range(2, 31)), 'pslow': list(range(5, 101, 5))},
+    'ema_cross': {'pfast': list(range(1, 31)), 'pslow': list(range(5, 101, 5))},
+    'simple_trade': {'exitbars': list(range(1, 31))},
+}
+
+# Price arrays shared with pool workers (set once per process by _init_worker)
+_SHARED_DATA = {}
+
+
+class IndicatorCache:
+    """Per-symbol cache of indicator arrays keyed by (indicator, period)"""
+
+    def __init__(self, arrays: dict):
+        self.arrays = arrays
+        self._cache = {}
+
+    def get(self, indicator: str, period: int = None) -> np.ndarray:
+        """Return the cached indicator, computing it on first use"""
+        key = (indicator, period)
+        if key not in self._cache:
+            close = self.arrays['close']
+            if indicator == 'sma':
+                self._cache[key] = sma(close, period)
+            elif indicator == 'ema':
+                self._cache[key] = ema(close, period)
+            elif indicator == 'falling':
+                self._cache[key] = falling_closes(close)
+            else:
+                raise ValueError(f"Unknown indicator '{indicator}'")
+        return self._cache[key]
+
+    def __len__(self):
+        return len(self._cache)
+
+
+def is_valid_params(params: dict) -> bool:
+    """Reject combinations where the fast line is not faster than the slow one"""
+    if 'pfast' in params and 'pslow' in params:
+        return params['pfast'] < params['pslow']
+    return True
+
+
+def parameter_grid(space: dict) -> list:
+    """Every combination of the values in `space`"""
+    names = list(space)
+    combos = (dict(zip(names, values)) for values in itertools.product(*space.values()))
+    return [combo for combo in combos if is_valid_params(combo)]
+
+
+def random_samples(space: dict, n_samples: int, seed: int = None) -> list:
+    """Uniform random draws from each parameter's candidate values"""
+    rng = np.random.default_rng(seed)
+    columns = {name: rng.choice(np.asarray(values), size=n_samples) for name, values in space.items()}
+    samples = [{name: int(columns[name][i]) for name in space} for i in range(n_samples)]
+    return _unique_valid(samples)
+
+
+def latin_hypercube_samples(space: dict, n_samples: int, seed: int = None) -> list:
+    """
+    Latin-hypercube draws: each parameter's range is cut into n_samples strata
+    and every stratum is used exactly once, giving even coverage with far
+    fewer runs than the full grid.
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for name, values in space.items():
+        values = np.asarray(values)
+        strata = (rng.permutation(n_samples) + rng.random(n_samples)) / n_samples
+        columns[name] = values[np.minimum((strata * len(values)).astype(int), len(values) - 1)]
+    samples = [{name: int(columns[name][i]) for name in space} for i in range(n_samples)]
+    return _unique_valid(samples)
+
+
+def _unique_valid(samples: list) -> list:
+    """Drop duplicate and invalid parameter sets, keeping order"""
+    seen = set()
+    unique = []
+    for params in samples:
+        key = tuple(sorted(params.items()))
+        if key not in seen and is_valid_params(params):
+            seen.add(key)
+            unique.append(params)
+    return unique
+
+
+def strategy_trades(cache: IndicatorCache, strategy: str, params: dict) -> tuple:
+    """Entry/exit signal bars for one parameter set using cached indicators"""
+    if strategy == 'sma_cross':
+        return crossover_trades(cache.get('sma', params['pfast']), cache.get('sma', params['pslow']))
+    if strategy == 'ema_cross':
+        return crossover_trades(cache.get('ema', params['pfast']), cache.get('ema', params['pslow']))
+    if strategy == 'simple_trade':
+        return exit_after_bars(cache.get('falling'), params['exitbars'])
+    raise ValueError(f"Unknown strategy '{strategy}'")
+
+
+def evaluate_params(arrays: dict, cache: IndicatorCache, strategy: str, params: dict,
+                    cash: float = DEFAULT_CASH, commission: float = DEFAULT_COMMISSION,
+                    fill: str = 'open') -> dict:
+    """Backtest one parameter set and return its headline metrics"""
+    entry_bars, exit_bars = strategy_trades(cache, strategy, params)
+    result = simulate_trades(arrays, entry_bars, exit_bars, cash=cash,
+                             commission=commission, fill=fill, as_frame=False)
+    ta = result['stats']['ta']
+    closed = ta['total']['closed']
+    return {
+        **params,
+        'sharpe': result['stats']['sharpe']['sharperatio'],
+        'max_drawdown': result['stats']['dd']['max']['drawdown'],
+        'trades': ta['total']['total'],
+        'win_rate': ta['won']['total'] / closed * 100 if closed else 0.0,
+        'pnl_net': ta['pnl']['net']['total'],
+        'final_value': result['final_value'],
+    }
+
+
+def _init_worker(price_arrays: dict):
+    """Pool initializer: keep the price arrays for every task in this process"""
+    global _SHARED_DATA
+    _SHARED_DATA = price_arrays
+
+
+def _evaluate_symbol(symbol: str, strategy: str, param_sets: list,
+                     cash: float, commission: float, fill: str) -> list:
+    """Run every parameter set for one symbol, sharing one indicator cache"""
+    arrays = _SHARED_DATA[symbol]
+    cache = IndicatorCache(arrays)
+    rows = []
+    for params in param_sets:
+        row = evaluate_params(arrays, cache, strategy, params, cash, commission, fill)
+        row['symbol'] = symbol
+        rows.append(row)
+    return rows
+
+
+def run_parameter_sweep(price_data: dict, strategy: str = 'sma_cross', param_sets: list = None,
+                        method: str = 'grid', n_samples: int = 100, seed: int = None,
+                        workers: int = None, cash: float = DEFAULT_CASH,
+                        commission: float = DEFAULT_COMMISSION, fill: str = 'open',
+                        rank_by: str = 'sharpe') -> pd.DataFrame:
+    """
+    Sweep strategy parameters across symbols and rank the results.
+
+    Args:
+        price_data: {symbol: OHLCV DataFrame}
+        strategy: 'sma_cross', 'ema_cross' or 'simple_trade'
+        param_sets: explicit list of parameter dicts (overrides `method`)
+        method: 'grid', 'random' or 'lhs' sampling of PARAMETER_SPACES[strategy]
+        workers: process count; 1 runs in the current process
+
+    Returns:
+        DataFrame with one row per (symbol, parameter set), best first
+    """
+    if strategy not in PARAMETER_SPACES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Must be one of: {list(PARAMETER_SPACES)}")
+
+    if param_sets is None:
+        space = PARAMETER_SPACES[strategy]
+        if method == 'grid':
+            param_sets = parameter_grid(space)
+        elif method == 'random':
+            param_sets = random_samples(space, n_samples, seed)
+        elif method == 'lhs':
+            param_sets = latin_hypercube_samples(space, n_samples, seed)
+        else:
+            raise ValueError("method must be one of: ['grid', 'random', 'lhs']")
+
+    price_arrays = {symbol: ohlcv_arrays(data) if isinstance(data, pd.DataFrame) else data
+                    for symbol, data in price_data.items()}
+    symbols = list(price_arrays)
+    workers = workers or min(len(symbols), os.cpu_count() or 1)
+
+    rows = []
+    if workers <= 1:
+        _init_worker(price_arrays)
+        for symbol in symbols:
+            rows.extend(_evaluate_symbol(symbol, strategy, param_sets, cash, commission, fill))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(price_arrays,)) as pool:
+            futures = [pool.submit(_evaluate_symbol, symbol, strategy, param_sets,
+                                   cash, commission, fill) for symbol in symbols]
+            for future in futures:
+                rows.extend(future.result())
+
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    columns = ['symbol'] + [c for c in results.columns if c != 'symbol']
+    ascending = rank_by == 'max_drawdown'
+    return results[columns].sort_values(rank_by, ascending=ascending, na_position='last').reset_index(drop=True)
+
+
+def rank_parameters(results: pd.DataFrame, rank_by: str = 'sharpe') -> pd.DataFrame:
+    """Average each parameter set's metrics across symbols and rank them"""
+    param_columns = [c for c in results.columns if c not in
+                     ('symbol', 'sharpe', 'max_drawdown', 'trades', 'win_rate', 'pnl_net', 'final_value')]
+    summary = results.groupby(param_columns).agg(
+        sharpe=('sharpe', 'mean'),
+        max_drawdown=('max_drawdown', 'mean'),
+        trades=('trades', 'sum'),
+        win_rate=('win_rate', 'mean'),
+        pnl_net=('pnl_net', 'sum'),
+        symbols=('symbol', 'count'),
+    ).reset_index()
+    ascending = rank_by == 'max_drawdown'
+    return summary.sort_values(rank_by, ascending=ascending, na_position='last').reset_index(drop=True)
+
+
+def main():
+    """Sweep SmaCross periods over a handful of NIFTY 50 names"""
+    import time
+    import yfinance as yf
+
+    symbols = ['RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ICICIBANK.NS']
+    print(f"Parameter Sweep - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+
+    price_data = {}
+    for symbol in symbols:
+        data = yf.Ticker(symbol).history(period='5y', interval='1d', auto_adjust=False, actions=False)
+        if not data.empty:
+            price_data[symbol] = data
+
+    if not price_data:
+        print("No price data available")
+        return
+
+    for strategy in ['sma_cross', 'simple_trade']:
+        start = time.perf_counter()
+        results = run_parameter_sweep(price_data, strategy, method='grid')
+        elapsed = time.perf_counter() - start
+        print(f"\n{strategy.upper()}: {len(results)} backtests in {elapsed:.2f}s")
+        print(rank_parameters(results).head(10).to_string(index=False, float_format='%.2f'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Streaming Performance Analytics - One Pass Over an Equity Curve or Trade List
+============================================================================
+
+Replaces the separate ta / sharpe / dd analyzer lookups in the notebook with a
+single accumulator that is fed one equity value (and optionally one closed
+trade) at a time. Every metric keeps a fixed number of running totals, so
+memory does not grow with the length of the history:
+
+- Sharpe / Sortino: Welford running mean and variance of returns, plus the
+  running sum of squared downside returns
+- CAGR: first and last value with the elapsed periods (or dates)
+- Max drawdown and its duration: running peak and bars since the peak
+- Exposure: share of bars with an open position
+- Win rate and streaks: running counts over closed trade P&L
+
+The same accumulator is fed from backtrader results, vectorized backtest
+results and live portfolio value history.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import math
+import warnings
+warnings.filterwarnings('ignore')
+
+from vectorized_backtest import TRADING_DAYS
+
+
+class StreamingPerformance:
+    """Single-pass, constant-memory performance statistics"""
+
+    def __init__(self, periods_per_year: int = TRADING_DAYS, riskfree_rate: float = 0.0):
+        self.periods_per_year = periods_per_year
+        self.riskfree_per_period = riskfree_rate / periods_per_year
+
+        # Equity curve state
+        self.first_value = None
+        self.last_value = None
+        self.first_date = None
+        self.last_date = None
+        self.bars = 0
+        self.bars_in_market = 0
+
+        # Return moments (Welford)
+        self.n_returns = 0
+        self.mean_return = 0.0
+        self.m2_return = 0.0
+        self.downside_sq = 0.0
+
+        # Drawdown
+        self.peak = None
+        self.max_drawdown = 0.0
+        self.drawdown_bars = 0
+        self.max_drawdown_bars = 0
+
+        # Trades
+        self.trades = 0
+        self.wins = 0
+        self.losses = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+        self.win_streak = 0
+        self.loss_streak = 0
+        self.longest_win_streak = 0
+        self.longest_loss_streak = 0
+
+    def update(self, value: float, date=None, in_market: bool = None):
+        """Feed the next equity value"""
+        value = float(value)
+        if self.first_value is None:
+            self.first_value = value
+            self.first_date = date
+            self.peak = value
+        else:
+            r = value / self.last_value - 1 - self.riskfree_per_period
+            self.n_returns += 1
+            delta = r - self.mean_return
+            self.mean_return += delta / self.n_returns
+            self.m2_return += delta * (r - self.mean_return)
+            if r < 0:
+                self.downside_sq += r * r
+
+        if value >= self.peak:
+            self.peak = value
+            self.drawdown_bars = 0
+        else:
+            self.drawdown_bars += 1
+            self.max_drawdown = max(self.max_drawdown, (self.peak - value) / self.peak * 100)
+            self.max_drawdown_bars = max(self.max_drawdown_bars, self.drawdown_bars)
+
+        self.last_value = value
+        self.last_date = date
+        self.bars += 1
+        if in_market:
+            self.bars_in_market += 1
+
+    def add_trade(self, pnl: float):
+        """Feed the net P&L of the next closed trade"""
+        self.trades += 1
+        if pnl > 0:
+            self.wins += 1
+            self.gross_profit += pnl
+            self.win_streak += 1
+            self.loss_streak = 0
+            self.longest_win_streak = max(self.longest_win_streak, self.win_streak)
+        else:
+            self.losses += 1
+            self.gross_loss += -pnl
+            self.loss_streak += 1
+            self.win_streak = 0
+            self.longest_loss_streak = max(self.longest_loss_streak, self.loss_streak)
+
+    def sharpe(self) -> float:
+        if self.n_returns < 2:
+            return None
+        std = math.sqrt(self.m2_return / (self.n_returns - 1))
+        return self.mean_return / std * math.sqrt(self.periods_per_year) if std > 0 else None
+
+    def sortino(self) -> float:
+        if self.n_returns < 2:
+            return None
+        downside = math.sqrt(self.downside_sq / self.n_returns)
+        return self.mean_return / downside * math.sqrt(self.periods_per_year) if downside > 0 else None
+
+    def cagr(self) -> float:
+        if self.first_value is None or self.bars < 2 or self.first_value <= 0:
+            return None
+        if self.first_date is not None and self.last_date is not None:
+            years = (pd.Timestamp(self.last_date) - pd.Timestamp(self.first_date)).days / 365.25
+        else:
+            years = (self.bars - 1) / self.periods_per_year
+        if years <= 0:
+            return None
+        return ((self.last_value / self.first_value) ** (1 / years) - 1) * 100
+
+    def summary(self) -> dict:
+        """All metrics as a flat dictionary"""
+        return {
+            'start_value': self.first_value,
+            'end_value': self.last_value,
+            'total_return_pct': (self.last_value / self.first_value - 1) * 100 if self.first_value else None,
+            'cagr_pct': self.cagr(),
+            'sharpe': self.sharpe(),
+            'sortino': self.sortino(),
+            'max_drawdown_pct': self.max_drawdown,
+            'max_drawdown_duration': self.max_drawdown_bars,
+            'exposure_pct': self.bars_in_market / self.bars * 100 if self.bars else 0.0,
+            'trades': self.trades,
+            'win_rate_pct': self.wins / self.trades * 100 if self.trades else 0.0,
+            'profit_factor': self.gross_profit / self.gross_loss if self.gross_loss > 0 else None,
+            'longest_win_streak': self.longest_win_streak,
+            'longest_loss_streak': self.longest_loss_streak,
+        }
+
+
+def analyze_equity(values, dates=None, in_market=None, trade_pnls=None,
+                   periods_per_year: int = TRADING_DAYS) -> dict:
+    """Run the accumulator over an equity curve and optional closed-trade P&L"""
+    perf = StreamingPerformance(periods_per_year)
+    dates = [None] * len(values) if dates is None else dates
+    in_market = [None] * len(values) if in_market is None else in_market
+    for value, date, flag in zip(values, dates, in_market):
+        perf.update(value, date, flag)
+    for pnl in trade_pnls if trade_pnls is not None else []:
+        perf.add_trade(pnl)
+    return perf.summary()
+
+
+def analyze_vectorized_result(result: dict, dates=None) -> dict:
+    """Analytics for a vectorized_backtest / portfolio_backtest result"""
+    trades = result['trades']
+    equity = result['equity']
+    is_open = np.asarray(trades['is_open'], dtype=bool)
+    entry = np.asarray(trades['entry_bar'])
+    exit_ = np.where(is_open, len(equity), np.asarray(trades['exit_bar']))
+
+    # Bars with at least one open position, from the trade intervals
+    open_count = np.zeros(len(equity) + 1, dtype=np.int64)
+    np.add.at(open_count, entry, 1)
+    np.add.at(open_count, exit_, -1)
+    in_market = np.cumsum(open_count)[:-1] > 0
+
+    if dates is None:
+        dates = result.get('dates')
+    pnls = np.asarray(trades['pnlcomm'])[~is_open]
+    # Trades are streamed in exit order, which is how backtrader reports them
+    order = np.argsort(np.asarray(trades['exit_bar'])[~is_open], kind='stable')
+    return analyze_equity(equity, dates, in_market, pnls[order])
+
+
+def analyze_backtrader_result(result, start_value: float) -> dict:
+    """
+    Analytics for a cerebro.run() result.
+
+    Needs cerebro.addanalyzer(bt.analyzers.TimeReturn, _name='returns') for
+    the equity curve; trade counts and streaks come from the 'ta' analyzer.
+    Exposure is not recoverable from those analyzers and is reported as None.
+    """
+    strat = result[0]
+    perf = StreamingPerformance()
+    value = start_value
+    perf.update(value)
+    for date, r in strat.analyzers.returns.get_analysis().items():
+        value *= 1 + r
+        perf.update(value, date)
+
+    summary = perf.summary()
+    summary['exposure_pct'] = None
+    ta = strat.analyzers.ta.get_analysis()
+    closed = ta.total.get('closed', 0)
+    if closed:
+        summary['trades'] = closed
+        summary['win_rate_pct'] = ta.won.total / closed * 100
+        summary['longest_win_streak'] = ta.streak.won.longest
+        summary['longest_loss_streak'] = ta.streak.lost.longest
+        summary['profit_factor'] = ta.won.pnl.total / -ta.lost.pnl.total if ta.lost.pnl.total else None
+    return summary
+
+
+def analyze_portfolio_history(history: pd.DataFrame, value_column: str = 'Current_Value',
+                              date_column: str = 'Date') -> dict:
+    """Analytics for a live portfolio value history (one row per valuation date)"""
+    history = history.sort_values(date_column)
+    return analyze_equity(history[value_column].to_numpy(), history[date_column].to_numpy())
+
+
+def display_performance(summary: dict, title: str = "PERFORMANCE ANALYTICS"):
+    """Print a metrics summary"""
+    print(f"\n{title}")
+    print("-" * 60)
+    labels = {
+        'total_return_pct': ('Total Return', '{:.2f}%'),
+        'cagr_pct': ('CAGR', '{:.2f}%'),
+        'sharpe': ('Sharpe Ratio', '{:.4f}'),
+        'sortino': ('Sortino Ratio', '{:.4f}'),
+        'max_drawdown_pct': ('Max Drawdown', '{:.2f}%'),
+        'max_drawdown_duration': ('Max Drawdown Duration', '{} periods'),
+        'exposure_pct': ('Exposure', '{:.1f}%'),
+        'trades': ('Closed Trades', '{}'),
+        'win_rate_pct': ('Win Rate', '{:.2f}%'),
+        'profit_factor': ('Profit Factor', '{:.2f}'),
+        'longest_win_streak': ('Win Streak', '{}'),
+        'longest_loss_streak': ('Loss Streak', '{}'),
+    }
+    for key, (label, fmt) in labels.items():
+        value = summary.get(key)
+        print(f"{label:<25} {fmt.format(value) if value is not None else 'N/A'}")
+
+
+def main():
+    """Analytics for the vectorized SmaCross backtest of one symbol"""
+    import sys
+    import yfinance as yf
+    from vectorized_backtest import run_backtest
+
+    symbol = sys.argv[1] if len(sys.argv) > 1 else 'RELIANCE.NS'
+    print(f"Performance Analytics - {symbol} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+
+    data = yf.Ticker(symbol).history(period='5y', interval='1d', auto_adjust=False, actions=False)
+    if data.empty:
+        print(f"No data found for {symbol}")
+        return
+
+    result = run_backtest(data, 'sma_cross', percents=95)
+    display_performance(analyze_vectorized_result(result, data.index), f"SMA CROSS - {symbol}")
+
+
+if __name__ == "__main__":
+    main()
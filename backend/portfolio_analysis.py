@@ -4,30 +4,16 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
-# Portfolio data
-portfolio_data = {
-    'Symbol': ['CDSL', 'CHENNPETRO', 'COCHINSHIP', 'ENGINERSIN', 'FACT', 'GSFC',
-               'KALYANKJIL', 'MOIL', 'NETWEB', 'NOVAAGRI', 'PROTEAN', 'RITES', 'SCILAL'],
-    'Health': [205, 547, 205, 558, 554, 744, 376, 560, 55, 538, 502, 558, 538],
-    'Duration': [205, 547, 205, 558, 554, 744, 376, 560, 55, 538, 502, 558, 538],
-    'Buy_Date': ['2025-06-23', '2024-07-16', '2025-06-23', '2024-07-05', '2024-07-09',
-                 '2024-01-01', '2025-01-03', '2024-07-03', '2025-11-20', '2024-07-25',
-                 '2024-08-30', '2024-07-05', '2024-07-25'],
-    'Avg_Cost': [1723, 1209.98, 2230, 276.1, 1150.3, 275, 784.8, 530.5, 3481.80, 91.64, 2180, 381, 103.7],
-    'Current_Price': [1419.9, 825.55, 1548.9, 193.88, 868.3, 173.45, 495.45, 340.4, 3273, 36.62, 710.9, 226.65, 46.44],
-    'Quantity': [289, 312, 46, 90, 858, 384, 126, 1000, 117, 1111, 11, 264, 3000],
-    'Capital_Gain_Type': ['STCG', 'LTCG', 'STCG', 'LTCG', 'LTCG', 'LTCG', 'LTCG', 'LTCG', 'STCG', 'LTCG', 'LTCG', 'LTCG', 'LTCG'],
-    'Unrealized_PL_Pct': [-17.5914, -31.7716, -30.5426, -29.7791, -24.5155, -36.9273, -36.8693, -35.8341, -5.997, -60.0393, -67.3899, -40.5118, -55.2181]
-}
-
-# Create DataFrame
-df = pd.DataFrame(portfolio_data)
-
-# Calculate additional metrics
-df['Investment_Value'] = df['Avg_Cost'] * df['Quantity']
-df['Current_Value'] = df['Current_Price'] * df['Quantity']
-df['Absolute_Loss'] = df['Current_Value'] - df['Investment_Value']
-df['Loss_Amount'] = abs(df['Absolute_Loss'])
+from portfolio_engine import analyze_portfolio, load_holdings
+from transaction_costs import sell_costs
+from benchmark_relative import build_index_levels, benchmark_relative, display_benchmark_relative
+from drawdown_analytics import drawdown_episodes, recovery_outlook
+from price_matrix import load_price_cache
+from recovery_simulator import simulate_recovery, load_return_model, describe_return_model, display_recovery
+
+# Portfolio data (holdings.csv) with values, P&L, loss buckets and position sizes
+analysis = analyze_portfolio(load_holdings())
+df = analysis['positions']
 
 # Portfolio Summary
 print("=" * 80)
@@ -35,10 +21,10 @@ print("PORTFOLIO HEALTH CHECK & RECOVERY ANALYSIS")
 print("=" * 80)
 print()
 
-total_invested = df['Investment_Value'].sum()
-total_current_value = df['Current_Value'].sum()
-total_loss = total_invested - total_current_value
-total_loss_pct = (total_loss / total_invested) * 100
+total_invested = analysis['summary']['total_invested']
+total_current_value = analysis['summary']['total_current_value']
+total_loss = analysis['summary']['total_loss']
+total_loss_pct = analysis['summary']['total_loss_pct']
 
 print(f"PORTFOLIO OVERVIEW:")
 print(f"Total Invested Amount: ₹{total_invested:,.2f}")
@@ -49,10 +35,10 @@ print(f"Number of Positions: {len(df)}")
 print()
 
 # Loss categorization
-severe_losses = df[df['Unrealized_PL_Pct'] <= -50]
-high_losses = df[(df['Unrealized_PL_Pct'] > -50) & (df['Unrealized_PL_Pct'] <= -35)]
-moderate_losses = df[(df['Unrealized_PL_Pct'] > -35) & (df['Unrealized_PL_Pct'] <= -20)]
-minor_losses = df[df['Unrealized_PL_Pct'] > -20]
+severe_losses = df[df['Loss_Bucket'] == 'Severe']
+high_losses = df[df['Loss_Bucket'] == 'High']
+moderate_losses = df[df['Loss_Bucket'] == 'Moderate']
+minor_losses = df[df['Loss_Bucket'] == 'Minor']
 
 print("LOSS CATEGORIZATION:")
 print(f"Severe Losses (>50%): {len(severe_losses)} stocks - ₹{severe_losses['Loss_Amount'].sum():,.2f}")
@@ -61,6 +47,13 @@ print(f"Moderate Losses (20-35%): {len(moderate_losses)} stocks - ₹{moderate_l
 print(f"Minor Losses (<20%): {len(minor_losses)} stocks - ₹{minor_losses['Loss_Amount'].sum():,.2f}")
 print()
 
+# Same positions against NIFTY 50 over each holding period
+try:
+    display_benchmark_relative(benchmark_relative(df, build_index_levels()))
+except FileNotFoundError as e:
+    print(f"Benchmark comparison skipped: {e}")
+print()
+
 # Worst performers
 print("TOP 5 WORST PERFORMERS:")
 worst_performers = df.nsmallest(5, 'Unrealized_PL_Pct')
@@ -78,8 +71,7 @@ print(f"STCG Stocks: {len(stcg_stocks)} (15% tax rate)")
 print()
 
 # Position sizing analysis
-df['Position_Size_Pct'] = (df['Investment_Value'] / total_invested) * 100
-large_positions = df[df['Position_Size_Pct'] > 15]
+large_positions = df[df['Concentrated']]
 
 if len(large_positions) > 0:
     print("CONCENTRATION RISK:")
@@ -88,6 +80,31 @@ if len(large_positions) > 0:
         print(f"{stock['Symbol']}: {stock['Position_Size_Pct']:.1f}% of portfolio")
     print()
 
+# How long drawdowns this deep took to recover in each stock's own price history
+try:
+    episodes = drawdown_episodes(load_price_cache(df['Symbol'].tolist()), sectors=dict(zip(df['Symbol'], df['Sector'])))
+    history = recovery_outlook(df, episodes).set_index('Symbol')
+except FileNotFoundError as e:
+    print(f"Drawdown history skipped: {e}")
+    history = None
+
+
+def print_drawdown_history(symbol):
+    if history is None or symbol not in history.index:
+        return
+    row = history.loc[symbol]
+    if row['Recovered'] > 0:
+        print(f"   HISTORY: {int(row['Recovered'])} of {int(row['Similar_Episodes'])} drawdowns this deep recovered, "
+              f"median {row['Median_Days_To_Recover']:.0f} days from peak")
+    elif row['Similar_Episodes'] > 0:
+        print(f"   HISTORY: {int(row['Similar_Episodes'])} drawdown(s) this deep, none recovered yet")
+    else:
+        print(f"   HISTORY: No drawdown this deep in the cached price history")
+    if row['Recovered'] == 0 and not pd.isna(row.get('Sector_Median_Days_To_Recover')):
+        print(f"   SECTOR HISTORY: Drawdowns this deep in {df.set_index('Symbol').loc[symbol, 'Sector']} "
+              f"recovered in a median {row['Sector_Median_Days_To_Recover']:.0f} days")
+
+
 print("=" * 80)
 print("RECOVERY STRATEGIES BY CATEGORY")
 print("=" * 80)
@@ -102,6 +119,7 @@ if len(severe_losses) > 0:
         print(f"   Current Value: ₹{stock['Current_Value']:,.0f}")
         print(f"   RECOMMENDATION: Strong consideration for exit")
         print(f"   REASON: Recovery to breakeven requires {abs(stock['Unrealized_PL_Pct'])/(100+stock['Unrealized_PL_Pct'])*100:.1f}% gain")
+        print_drawdown_history(stock['Symbol'])
         if stock['Capital_Gain_Type'] == 'LTCG':
             print(f"   TAX BENEFIT: Can use this loss to offset future LTCG")
 
@@ -114,6 +132,7 @@ if len(high_losses) > 0:
         required_gain = abs(stock['Unrealized_PL_Pct'])/(100+stock['Unrealized_PL_Pct'])*100
         print(f"\n{stock['Symbol']} - Loss: {stock['Unrealized_PL_Pct']:.1f}%")
         print(f"   Recovery requires: {required_gain:.1f}% gain")
+        print_drawdown_history(stock['Symbol'])
         print(f"   STRATEGY: Detailed fundamental analysis required")
         print(f"   CONSIDER: Partial exit (50%) if no strong recovery thesis")
 
@@ -164,6 +183,9 @@ print(f"SCENARIO 1: Exit worst 3 performers ({', '.join(worst_3['Symbol'].tolist
 print(f"Remaining portfolio value: ₹{remaining_portfolio_value:,.2f}")
 print(f"Remaining investment: ₹{remaining_investment:,.2f}")
 print(f"Reduced loss: ₹{worst_3['Loss_Amount'].sum():,.2f}")
+worst_3_costs = sell_costs(worst_3['Current_Value'].to_numpy(), worst_3['Quantity'].to_numpy())
+print(f"Exit costs (STT, charges, slippage): ₹{worst_3_costs['total'].sum():,.2f}")
+print(f"Net cash released: ₹{worst_3_costs['net_proceeds'].sum():,.2f}")
 print(f"New portfolio loss %: {((remaining_investment - remaining_portfolio_value)/remaining_investment)*100:.2f}%")
 print()
 
@@ -171,9 +193,17 @@ print("SCENARIO 2: Partial exit (50%) from severe loss positions")
 partial_exit_value = severe_losses['Current_Value'].sum() * 0.5
 partial_recovery_needed = (total_invested - total_loss * 0.3) / total_current_value
 print(f"If you exit 50% from severe losers and remaining portfolio gains 25%:")
+print(f"Exit costs on ₹{partial_exit_value:,.2f} sold: ₹{sell_costs(partial_exit_value)['total']:,.2f}")
 print(f"Potential recovery: ₹{total_current_value * 0.25:,.2f}")
 print()
 
+# Same plans on simulated correlated returns instead of a fixed 25% gain
+return_model = load_return_model(df['Symbol'].tolist())
+print(describe_return_model(return_model))
+recovery = simulate_recovery(df, return_model, n_paths=10000, seed=42)
+display_recovery(recovery)
+print()
+
 # Final recommendations
 print("=" * 80)
 print("FINAL RECOMMENDATIONS")
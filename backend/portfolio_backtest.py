@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+Portfolio Backtester - One Strategy Across the Whole Universe With Shared Cash
+==============================================================================
+
+Runs a long-only strategy on every symbol of the aligned price matrix at once
+(see price_matrix.py). Signals are computed for all symbols as dates x symbols
+matrices; the simulation then steps through dates only, with every step a
+handful of array operations across the universe:
+
+- exits decided at a close fill at the next open and release cash
+- new entries are ranked by the scanner's momentum score, limited by the free
+  position slots, and sized from the shared cash pool at the next open
+- no single position is allowed above max_position_pct of equity at entry
+
+Costs follow cerebro.broker.setcommission(0.0003) like the single-symbol engine.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+from vectorized_backtest import (
+    DEFAULT_CASH, DEFAULT_COMMISSION, crossover, ema, trade_statistics,
+    sharpe_ratio, drawdown_statistics,
+)
+from price_matrix import forward_filled, rolling_mean
+from scanner_signals import scanner_rank_scores
+
+
+def crossover_signals(close: np.ndarray, pfast: int = 5, pslow: int = 10, kind: str = 'sma') -> tuple:
+    """Entry/exit matrices for an SMA or EMA crossover on every symbol"""
+    if kind == 'sma':
+        fast, slow = rolling_mean(close, pfast), rolling_mean(close, pslow)
+    elif kind == 'ema':
+        # Same SMA-seeded EMA as the single-symbol engine (bt.ind.EMA)
+        fast, slow = ema(close, pfast), ema(close, pslow)
+    else:
+        raise ValueError("kind must be 'sma' or 'ema'")
+    cross = crossover(fast, slow)
+    return cross > 0, cross < 0
+
+
+def run_portfolio_backtest(matrices: dict, entries: np.ndarray, exits: np.ndarray = None,
+                           scores: np.ndarray = None, cash: float = DEFAULT_CASH,
+                           max_positions: int = 20, max_position_pct: float = 10.0,
+                           commission: float = DEFAULT_COMMISSION, max_hold_bars: int = None,
+                           stop_loss_pct: float = None, take_profit_pct: float = None) -> dict:
+    """
+    Simulate a universe-wide long-only strategy with one cash pool.
+
+    Args:
+        matrices: aligned price matrices from price_matrix.align_price_data
+        entries / exits: dates x symbols boolean signal matrices (decided at
+                         the close, filled at the next open)
+        scores: dates x symbols ranking; higher is bought first when there are
+                more entry signals than free slots
+        max_positions: maximum number of concurrent holdings
+        max_position_pct: cap on any single position at entry (% of equity)
+        max_hold_bars: exit after holding this many bars
+        stop_loss_pct / take_profit_pct: exit when the close is this far below /
+                                         above the entry price
+
+    Returns:
+        Dictionary with 'equity', 'cash', 'positions', 'trades', 'stats' and 'final_value'
+    """
+    close, open_ = matrices['close'], matrices['open']
+    n_dates, n_symbols = close.shape
+    mark = forward_filled(close)
+    scores = np.zeros((n_dates, n_symbols)) if scores is None else np.nan_to_num(scores, nan=-np.inf)
+    entries = np.asarray(entries, dtype=bool)
+    exits = np.zeros((n_dates, n_symbols), dtype=bool) if exits is None else np.asarray(exits, dtype=bool)
+
+    shares = np.zeros(n_symbols)
+    entry_price = np.zeros(n_symbols)
+    entry_comm = np.zeros(n_symbols)
+    entry_day = np.full(n_symbols, -1)
+    pending_entries = np.empty(0, dtype=np.int64)
+    pending_exits = np.empty(0, dtype=np.int64)
+    available = float(cash)
+
+    equity = np.empty(n_dates)
+    cash_curve = np.empty(n_dates)
+    positions = np.empty(n_dates, dtype=np.int64)
+    closed = {key: [] for key in ['symbol', 'entry_day', 'exit_day', 'size', 'entry_price',
+                                  'exit_price', 'entry_comm', 'exit_comm']}
+
+    for t in range(n_dates):
+        prices = open_[t]
+
+        # Exits fill first so their cash is available to today's entries
+        if pending_exits.size:
+            px = prices[pending_exits]
+            fillable = ~np.isnan(px)
+            sold = pending_exits[fillable]
+            proceeds = shares[sold] * px[fillable]
+            exit_comm = commission * proceeds
+            available += (proceeds - exit_comm).sum()
+            for key, values in (('symbol', sold), ('entry_day', entry_day[sold]),
+                                ('exit_day', np.full(sold.size, t)), ('size', shares[sold]),
+                                ('entry_price', entry_price[sold]), ('exit_price', px[fillable]),
+                                ('entry_comm', entry_comm[sold]), ('exit_comm', exit_comm)):
+                closed[key].append(values)
+            shares[sold] = 0
+            pending_exits = pending_exits[~fillable]  # suspended names retry tomorrow
+
+        if pending_entries.size:
+            px = prices[pending_entries]
+            fillable = ~np.isnan(px) & (px > 0)
+            buys, px = pending_entries[fillable], px[fillable]
+            value = available + np.nansum(shares * mark[t - 1]) if t else available
+            slot_value = min(value * max_position_pct / 100, value / max_positions)
+            size = np.floor(slot_value / (px * (1 + commission)))
+            cost = size * px * (1 + commission)
+            # Highest-ranked orders are funded first until the cash runs out
+            funded = (np.cumsum(cost) <= available) & (size > 0)
+            buys, px, size, cost = buys[funded], px[funded], size[funded], cost[funded]
+            available -= cost.sum()
+            shares[buys] = size
+            entry_price[buys] = px
+            entry_comm[buys] = commission * size * px
+            entry_day[buys] = t
+            pending_entries = np.empty(0, dtype=np.int64)
+
+        held = shares > 0
+        equity[t] = available + np.nansum(shares[held] * mark[t, held])
+        cash_curve[t] = available
+        positions[t] = held.sum()
+
+        # Decide tomorrow's orders at today's close
+        exit_mask = exits[t].copy()
+        if max_hold_bars is not None:
+            exit_mask |= t - entry_day >= max_hold_bars
+        with np.errstate(invalid='ignore'):
+            if stop_loss_pct is not None:
+                exit_mask |= close[t] <= entry_price * (1 - stop_loss_pct / 100)
+            if take_profit_pct is not None:
+                exit_mask |= close[t] >= entry_price * (1 + take_profit_pct / 100)
+        exit_now = np.flatnonzero(held & exit_mask)
+        pending_exits = np.union1d(pending_exits, exit_now)
+        slots = max_positions - held.sum() + exit_now.size
+        candidates = np.flatnonzero(~held & entries[t] & ~np.isnan(close[t]))
+        if candidates.size and slots > 0:
+            order = np.argsort(-scores[t, candidates], kind='stable')
+            pending_entries = candidates[order[:slots]]
+
+    trades = {key: np.concatenate(values) if values else np.empty(0) for key, values in closed.items()}
+    open_syms = np.flatnonzero(shares > 0)
+    trades = {
+        'symbol': np.concatenate([trades['symbol'], open_syms]).astype(np.int64),
+        'entry_bar': np.concatenate([trades['entry_day'], entry_day[open_syms]]).astype(np.int64),
+        'exit_bar': np.concatenate([trades['exit_day'], np.full(open_syms.size, n_dates - 1)]).astype(np.int64),
+        'size': np.concatenate([trades['size'], shares[open_syms]]),
+        'entry_price': np.concatenate([trades['entry_price'], entry_price[open_syms]]),
+        'exit_price': np.concatenate([trades['exit_price'], mark[-1, open_syms] if n_dates else []]),
+        'commission': np.concatenate([trades['entry_comm'] + trades['exit_comm'], entry_comm[open_syms]]),
+        'is_open': np.concatenate([np.zeros(len(trades['symbol']), dtype=bool),
+                                   np.ones(open_syms.size, dtype=bool)]),
+    }
+    trades['pnl'] = trades['size'] * (trades['exit_price'] - trades['entry_price'])
+    trades['pnlcomm'] = trades['pnl'] - trades['commission']
+    trades['barlen'] = trades['exit_bar'] - trades['entry_bar']
+
+    symbols = np.asarray(matrices['symbols'])
+    dates = matrices['dates']
+    trade_frame = pd.DataFrame(trades)
+    trade_frame.insert(0, 'symbol_name', symbols[trades['symbol']] if len(symbols) else [])
+    trade_frame['entry_date'] = dates[trades['entry_bar']]
+    trade_frame['exit_date'] = dates[trades['exit_bar']]
+
+    return {
+        'dates': dates,
+        'equity': equity,
+        'cash': cash_curve,
+        'positions': positions,
+        'trades': trade_frame,
+        'final_value': float(equity[-1]) if n_dates else float(cash),
+        'stats': {
+            'ta': trade_statistics(trades),
+            'sharpe': {'sharperatio': sharpe_ratio(equity)},
+            'dd': drawdown_statistics(equity),
+        },
+    }
+
+
+def run_universe_crossover(matrices: dict, pfast: int = 5, pslow: int = 10, kind: str = 'sma',
+                           rank: str = 'scanner', **kwargs) -> dict:
+    """Crossover strategy across the universe, ranked by the scanner's momentum score"""
+    entries, exits = crossover_signals(matrices['close'], pfast, pslow, kind)
+    scores = scanner_rank_scores(matrices) if rank == 'scanner' else None
+    return run_portfolio_backtest(matrices, entries, exits, scores=scores, **kwargs)
+
+
+def main():
+    """Universe-wide SmaCross on the cached NIFTY 500 history"""
+    import time
+    from price_matrix import load_price_cache
+
+    print(f"Portfolio Backtest - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+
+    try:
+        matrices = load_price_cache()
+    except FileNotFoundError as e:
+        print(f"{e}. Run price_matrix.py first to build the cache.")
+        return
+
+    print(f"Universe: {len(matrices['symbols'])} symbols x {len(matrices['dates'])} dates")
+    start = time.perf_counter()
+    result = run_universe_crossover(matrices, pfast=20, pslow=50, max_positions=20)
+    elapsed = time.perf_counter() - start
+
+    ta = result['stats']['ta']
+    print(f"Completed in {elapsed:.2f}s")
+    print(f"Starting Portfolio Value: {DEFAULT_CASH:,.2f}")
+    print(f"Final Portfolio Value: {result['final_value']:,.2f}")
+    print(f"Trades: {ta['total']['closed']} closed, {ta['total']['open']} open, "
+          f"{ta['won']['total']} won / {ta['lost']['total']} lost")
+    sharpe = result['stats']['sharpe']['sharperatio']
+    if sharpe is not None:
+        print(f"Sharpe Ratio: {sharpe:.4f}")
+    print(f"Max Drawdown: {result['stats']['dd']['max']['drawdown']:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Portfolio Analytics Engine - Holdings File In, Structured Results Out
+====================================================================
+
+The calculations from portfolio_analysis.py, portfolio_with_market_cap.py and
+sector_analysis.py as functions over a holdings table instead of literal
+dicts executed at import time:
+
+- investment / current value, P&L and P&L %
+- loss buckets (severe <= -50%, high -50..-35%, moderate -35..-20%, minor > -20%)
+- position sizes and concentration (> 15% of invested capital)
+- sector and market-cap breakdowns
+
+Every step is a column operation, so an account with thousands of positions
+costs the same handful of calls as the 13-stock sample in holdings.csv. The
+API calls analyze_portfolio() / to_api_payload() directly.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import os
+import warnings
+warnings.filterwarnings('ignore')
+
+HOLDINGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'holdings.csv')
+
+# Upper edges of each loss bucket (inclusive), in percent
+LOSS_BUCKET_EDGES = [-50.0, -35.0, -20.0]
+LOSS_BUCKETS = ['Severe', 'High', 'Moderate', 'Minor']
+CONCENTRATION_LIMIT_PCT = 15.0
+LTCG_HOLDING_DAYS = 365
+
+# Broker export / upload column names mapped to the engine's columns
+COLUMN_ALIASES = {
+    'Symbol': ['Symbol', 'symbol', 'Stock', 'Ticker', 'Company', 'Stock Symbol'],
+    'Quantity': ['Quantity', 'quantity', 'Qty', 'Shares', 'Units'],
+    'Avg_Cost': ['Avg_Cost', 'avg_price', 'Avg Price', 'Average Price', 'Buy Price', 'Purchase Price', 'Avg Cost'],
+    'Current_Price': ['Current_Price', 'current_price', 'Current Price', 'LTP', 'Market Price', 'Price'],
+    'Buy_Date': ['Buy_Date', 'buy_date', 'Buy Date', 'Purchase Date', 'Date'],
+    'Sector': ['Sector', 'sector', 'Industry'],
+    'Market_Cap': ['Market_Cap', 'market_cap', 'Market Cap', 'Cap'],
+    'Capital_Gain_Type': ['Capital_Gain_Type', 'capital_gain_type', 'Gain Type', 'Term'],
+}
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Rename known column variations to the engine's names"""
+    df = df.copy()
+    df.columns = df.columns.astype(str).str.strip()
+    renames = {}
+    for standard, variations in COLUMN_ALIASES.items():
+        if standard in df.columns:
+            continue
+        for col in df.columns:
+            if col in variations and col not in renames:
+                renames[col] = standard
+                break
+    return df.rename(columns=renames)
+
+
+def load_holdings(path: str = HOLDINGS_FILE) -> pd.DataFrame:
+    """Read a holdings CSV/Excel file into the engine's column layout"""
+    if path.endswith(('.xlsx', '.xls')):
+        df = pd.read_excel(path)
+    elif path.endswith('.csv'):
+        df = pd.read_csv(path)
+    else:
+        raise ValueError("Unsupported file format")
+    return holdings_frame(df)
+
+
+def holdings_frame(data) -> pd.DataFrame:
+    """Holdings from a DataFrame or a list of dicts (e.g. api_server.process_portfolio_file)"""
+    df = normalize_columns(pd.DataFrame(data))
+    missing = [col for col in ['Symbol', 'Quantity', 'Avg_Cost'] if col not in df.columns]
+    if missing:
+        raise ValueError(f"Holdings are missing required columns: {missing}")
+
+    df['Symbol'] = df['Symbol'].astype(str).str.strip().str.upper()
+    for col in ['Quantity', 'Avg_Cost', 'Current_Price']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    if 'Buy_Date' in df.columns:
+        df['Buy_Date'] = pd.to_datetime(df['Buy_Date'], errors='coerce')
+    return df
+
+
+def compute_positions(holdings: pd.DataFrame, prices=None, as_of=None,
+                      concentration_pct: float = CONCENTRATION_LIMIT_PCT) -> pd.DataFrame:
+    """
+    Per-position metrics, all as column operations.
+
+    Args:
+        prices: optional {symbol: price} mapping or Series that overrides
+                Current_Price (e.g. the last row of the price cache)
+        as_of: valuation date for holding days / STCG-LTCG when the file
+               has Buy_Date but no Capital_Gain_Type
+    """
+    df = holdings.copy()
+    if prices is not None:
+        latest = df['Symbol'].map(pd.Series(prices))
+        df['Current_Price'] = latest.fillna(df['Current_Price']) if 'Current_Price' in df.columns else latest
+    if 'Current_Price' not in df.columns:
+        raise ValueError("No Current_Price column and no prices supplied")
+
+    qty = df['Quantity'].to_numpy(dtype=np.float64)
+    cost = df['Avg_Cost'].to_numpy(dtype=np.float64)
+    price = df['Current_Price'].to_numpy(dtype=np.float64)
+
+    investment = cost * qty
+    current = price * qty
+    pnl = current - investment
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pnl_pct = np.where(investment != 0, pnl / investment * 100, 0.0)
+    total_invested = investment.sum()
+
+    df['Investment_Value'] = investment
+    df['Current_Value'] = current
+    df['Absolute_Loss'] = pnl
+    df['Loss_Amount'] = np.abs(pnl)
+    df['Unrealized_PL_Pct'] = pnl_pct
+    df['Position_Size_Pct'] = investment / total_invested * 100 if total_invested else 0.0
+    df['Loss_Bucket'] = pd.Categorical.from_codes(
+        np.searchsorted(LOSS_BUCKET_EDGES, pnl_pct, side='left'), LOSS_BUCKETS)
+    df['Concentrated'] = df['Position_Size_Pct'] > concentration_pct
+
+    if 'Buy_Date' in df.columns:
+        as_of = pd.Timestamp(as_of or datetime.now().date())
+        df['Holding_Days'] = (as_of - df['Buy_Date']).dt.days
+        if 'Capital_Gain_Type' not in df.columns:
+            df['Capital_Gain_Type'] = np.where(df['Holding_Days'] > LTCG_HOLDING_DAYS, 'LTCG', 'STCG')
+    return df
+
+
+def loss_bucket_summary(positions: pd.DataFrame) -> pd.DataFrame:
+    """Count and rupee loss per loss bucket (every bucket listed, even if empty)"""
+    grouped = positions.groupby('Loss_Bucket', observed=False).agg(
+        Stock_Count=('Symbol', 'count'),
+        Loss_Amount=('Loss_Amount', 'sum'),
+        Investment=('Investment_Value', 'sum'),
+        Current_Value=('Current_Value', 'sum'),
+    )
+    return grouped.reindex(LOSS_BUCKETS).fillna(0).reset_index()
+
+
+def group_summary(positions: pd.DataFrame, by: str) -> pd.DataFrame:
+    """Investment, value, loss, count, weight and loss % per group (sector, market cap...)"""
+    summary = positions.groupby(by).agg(
+        Investment=('Investment_Value', 'sum'),
+        Current_Value=('Current_Value', 'sum'),
+        Loss_Amount=('Absolute_Loss', 'sum'),
+        Stock_Count=('Symbol', 'count'),
+    ).reset_index()
+    # Loss_Amount keeps the scripts' sign convention: positive = money lost
+    summary['Loss_Amount'] = -summary['Loss_Amount']
+    summary['Portfolio_Weight'] = summary['Investment'] / summary['Investment'].sum() * 100
+    summary['Loss_Pct'] = summary['Loss_Amount'] / summary['Investment'] * 100
+    return summary.sort_values('Portfolio_Weight', ascending=False).reset_index(drop=True)
+
+
+def portfolio_totals(positions: pd.DataFrame) -> dict:
+    total_invested = float(positions['Investment_Value'].sum())
+    total_current = float(positions['Current_Value'].sum())
+    total_loss = total_invested - total_current
+    return {
+        'total_invested': total_invested,
+        'total_current_value': total_current,
+        'total_loss': total_loss,
+        'total_loss_pct': total_loss / total_invested * 100 if total_invested else 0.0,
+        'positions': int(len(positions)),
+    }
+
+
+def analyze_portfolio(holdings: pd.DataFrame = None, prices=None, as_of=None,
+                      concentration_pct: float = CONCENTRATION_LIMIT_PCT, worst_n: int = 5,
+                      classification=None) -> dict:
+    """
+    Full portfolio health check as structured data.
+
+    classification: optional classification.Classification whose sector,
+    industry and market-cap labels replace the file's for symbols it knows
+
+    Returns:
+        Dictionary with 'positions' (per-holding DataFrame), 'summary' (totals),
+        'loss_buckets', 'concentration', 'worst_performers', 'tax', and
+        'sectors' / 'market_caps' when those columns are present
+    """
+    holdings = load_holdings() if holdings is None else holdings
+    if classification is not None:
+        holdings = classification.apply(holdings)
+    positions = compute_positions(holdings, prices, as_of, concentration_pct)
+
+    result = {
+        'positions': positions,
+        'summary': portfolio_totals(positions),
+        'loss_buckets': loss_bucket_summary(positions),
+        'concentration': positions.loc[positions['Concentrated'], ['Symbol', 'Position_Size_Pct']]
+                                  .sort_values('Position_Size_Pct', ascending=False).reset_index(drop=True),
+        'worst_performers': positions.nsmallest(worst_n, 'Unrealized_PL_Pct')[
+            ['Symbol', 'Unrealized_PL_Pct', 'Loss_Amount']].reset_index(drop=True),
+    }
+    if 'Capital_Gain_Type' in positions.columns:
+        result['tax'] = positions['Capital_Gain_Type'].value_counts().to_dict()
+    if 'Sector' in positions.columns:
+        result['sectors'] = group_summary(positions, 'Sector')
+    if 'Market_Cap' in positions.columns:
+        result['market_caps'] = group_summary(positions, 'Market_Cap')
+    return result
+
+
+def _records(df: pd.DataFrame) -> list:
+    out = df.copy()
+    for col in out.columns:
+        if pd.api.types.is_datetime64_any_dtype(out[col]):
+            out[col] = out[col].dt.strftime('%Y-%m-%d')
+        elif isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype(str)
+    return out.replace({np.nan: None}).to_dict(orient='records')
+
+
+def to_api_payload(result: dict) -> dict:
+    """JSON-serialisable version of analyze_portfolio() output"""
+    return {key: _records(value) if isinstance(value, pd.DataFrame) else value
+            for key, value in result.items()}
+
+
+def display_portfolio_analysis(result: dict):
+    """Print the health check summary"""
+    summary = result['summary']
+    print("=" * 80)
+    print("PORTFOLIO HEALTH CHECK")
+    print("=" * 80)
+    print(f"Total Invested Amount: ₹{summary['total_invested']:,.2f}")
+    print(f"Current Portfolio Value: ₹{summary['total_current_value']:,.2f}")
+    print(f"Total Unrealized Loss: ₹{summary['total_loss']:,.2f}")
+    print(f"Overall Loss Percentage: {summary['total_loss_pct']:.2f}%")
+    print(f"Number of Positions: {summary['positions']}")
+    print()
+
+    print("LOSS CATEGORIZATION:")
+    for _, row in result['loss_buckets'].iterrows():
+        print(f"{row['Loss_Bucket']:<10} {int(row['Stock_Count']):>5} stocks - ₹{row['Loss_Amount']:,.2f}")
+    print()
+
+    if len(result['concentration']):
+        print(f"CONCENTRATION RISK (>{CONCENTRATION_LIMIT_PCT:.0f}% of portfolio):")
+        for _, row in result['concentration'].iterrows():
+            print(f"{row['Symbol']}: {row['Position_Size_Pct']:.1f}% of portfolio")
+        print()
+
+    for key, title in [('sectors', 'SECTOR DISTRIBUTION'), ('market_caps', 'MARKET CAP DISTRIBUTION')]:
+        if key in result:
+            print(f"{title}:")
+            print(result[key].to_string(index=False, float_format='%.2f'))
+            print()
+
+
+def main():
+    """Analyze a holdings file (default: holdings.csv)"""
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else HOLDINGS_FILE
+    print(f"Portfolio Engine - {path} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    display_portfolio_analysis(analyze_portfolio(load_holdings(path)))
+
+
+if __name__ == "__main__":
+    main()
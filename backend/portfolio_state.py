@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Portfolio State - Incremental P&L on Price Updates
+==================================================
+
+Keeps the per-position and aggregate figures of portfolio_engine (investment,
+current value, P&L, sector and market-cap buckets) in arrays and applies
+price ticks as deltas:
+
+- a tick for k symbols touches k positions, the running totals and the k
+  affected bucket cells: O(k), independent of portfolio size
+- investment (and so Position_Size_Pct) only changes on trades, which are
+  applied the same way through update_position()
+
+The API and live dashboards read snapshots from the state instead of
+re-running the pipeline on every tick.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import threading
+import warnings
+warnings.filterwarnings('ignore')
+
+from portfolio_engine import compute_positions, load_holdings
+
+GROUP_COLUMNS = ['Sector', 'Market_Cap']
+
+
+def check_prices(prices: dict):
+    """Raise ValueError naming every symbol whose price is NaN, infinite or not positive"""
+    values = np.array([float(v) for v in prices.values()], dtype=np.float64)
+    bad = ~(np.isfinite(values) & (values > 0))
+    if bad.any():
+        symbols = np.array(list(prices), dtype=object)[bad]
+        raise ValueError("Prices must be finite and positive: " +
+                         ", ".join(f"{s}={v}" for s, v in zip(symbols, values[bad])))
+
+
+class PortfolioState:
+    """Per-position and bucketed values maintained incrementally"""
+
+    def __init__(self, positions: pd.DataFrame):
+        """positions: holdings or portfolio_engine.compute_positions() output"""
+        if 'Investment_Value' not in positions.columns:
+            positions = compute_positions(positions)
+        self._lock = threading.Lock()
+        self.symbols = positions['Symbol'].astype(str).tolist()
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.quantity = positions['Quantity'].to_numpy(dtype=np.float64).copy()
+        self.avg_cost = positions['Avg_Cost'].to_numpy(dtype=np.float64).copy()
+        self.price = positions['Current_Price'].to_numpy(dtype=np.float64).copy()
+        self.investment = self.quantity * self.avg_cost
+        self.current = self.quantity * self.price
+
+        # Bucket membership as integer codes; per-bucket sums as small arrays
+        self.groups = {}
+        for column in GROUP_COLUMNS:
+            if column in positions.columns:
+                codes, labels = pd.factorize(positions[column].fillna('Unknown'), sort=True)
+                self.groups[column] = {
+                    'codes': codes,
+                    'labels': list(labels),
+                    'investment': np.bincount(codes, self.investment, len(labels)),
+                    'current': np.bincount(codes, self.current, len(labels)),
+                }
+
+        self.total_investment = float(self.investment.sum())
+        self.total_current = float(self.current.sum())
+        self.updates = 0
+        self.last_update = None
+
+    def update_prices(self, prices: dict, timestamp=None) -> int:
+        """
+        Apply a tick {symbol: price}; returns the number of positions changed.
+
+        Symbols not held are ignored. Raises ValueError, before anything is
+        applied, if any price in the tick is NaN, infinite or not positive.
+        """
+        check_prices(prices)
+        idx = np.fromiter((self.index[s] for s in prices if s in self.index), dtype=np.int64)
+        if idx.size == 0:
+            return 0
+        new_price = np.fromiter((float(prices[s]) for s in prices if s in self.index),
+                                dtype=np.float64, count=idx.size)
+        with self._lock:
+            delta = self.quantity[idx] * (new_price - self.price[idx])
+            self.price[idx] = new_price
+            self.current[idx] += delta
+            self.total_current += float(delta.sum())
+            for group in self.groups.values():
+                np.add.at(group['current'], group['codes'][idx], delta)
+            self.updates += 1
+            self.last_update = timestamp or datetime.now()
+        return int(idx.size)
+
+    def update_position(self, symbol: str, quantity: float, avg_cost: float,
+                        price: float = None, groups: dict = None):
+        """
+        Set a position after a trade (quantity 0 closes it).
+
+        New symbols are appended; groups gives their Sector / Market_Cap labels.
+        """
+        if price is not None:
+            check_prices({symbol: price})
+        with self._lock:
+            if symbol not in self.index:
+                self._append(symbol, price if price is not None else avg_cost, groups or {})
+            i = self.index[symbol]
+            if price is not None:
+                self.price[i] = price
+            new_investment = quantity * avg_cost
+            new_current = quantity * self.price[i]
+            d_inv = new_investment - self.investment[i]
+            d_cur = new_current - self.current[i]
+            self.quantity[i], self.avg_cost[i] = quantity, avg_cost
+            self.investment[i], self.current[i] = new_investment, new_current
+            self.total_investment += d_inv
+            self.total_current += d_cur
+            for group in self.groups.values():
+                code = group['codes'][i]
+                group['investment'][code] += d_inv
+                group['current'][code] += d_cur
+            self.updates += 1
+            self.last_update = datetime.now()
+
+    def _append(self, symbol: str, price: float, labels: dict):
+        self.index[symbol] = len(self.symbols)
+        self.symbols.append(symbol)
+        for name in ['quantity', 'avg_cost', 'investment', 'current']:
+            setattr(self, name, np.append(getattr(self, name), 0.0))
+        self.price = np.append(self.price, price)
+        for column, group in self.groups.items():
+            label = labels.get(column, 'Unknown')
+            if label not in group['labels']:
+                group['labels'].append(label)
+                group['investment'] = np.append(group['investment'], 0.0)
+                group['current'] = np.append(group['current'], 0.0)
+            group['codes'] = np.append(group['codes'], group['labels'].index(label))
+
+    def rebuild(self):
+        """Recompute every sum from the position arrays (clears float drift)"""
+        with self._lock:
+            self.investment = self.quantity * self.avg_cost
+            self.current = self.quantity * self.price
+            self.total_investment = float(self.investment.sum())
+            self.total_current = float(self.current.sum())
+            for group in self.groups.values():
+                n = len(group['labels'])
+                group['investment'] = np.bincount(group['codes'], self.investment, n)
+                group['current'] = np.bincount(group['codes'], self.current, n)
+
+    def totals(self) -> dict:
+        total_loss = self.total_investment - self.total_current
+        return {
+            'total_invested': self.total_investment,
+            'total_current_value': self.total_current,
+            'total_loss': total_loss,
+            'total_loss_pct': total_loss / self.total_investment * 100 if self.total_investment else 0.0,
+            'positions': int((self.quantity != 0).sum()),
+            'updates': self.updates,
+            'last_update': self.last_update.isoformat() if self.last_update else None,
+        }
+
+    def position(self, symbol: str) -> dict:
+        i = self.index[symbol]
+        investment, current = self.investment[i], self.current[i]
+        return {
+            'Symbol': symbol,
+            'Quantity': self.quantity[i],
+            'Avg_Cost': self.avg_cost[i],
+            'Current_Price': self.price[i],
+            'Investment_Value': investment,
+            'Current_Value': current,
+            'Absolute_Loss': current - investment,
+            'Unrealized_PL_Pct': (current / investment - 1) * 100 if investment else 0.0,
+            'Position_Size_Pct': investment / self.total_investment * 100 if self.total_investment else 0.0,
+        }
+
+    def group_totals(self, column: str = 'Sector') -> pd.DataFrame:
+        """Investment, value, weight and loss per bucket (same layout as portfolio_engine.group_summary)"""
+        group = self.groups[column]
+        investment, current = group['investment'], group['current']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            summary = pd.DataFrame({
+                column: group['labels'],
+                'Investment': investment,
+                'Current_Value': current,
+                'Loss_Amount': investment - current,
+                'Portfolio_Weight': investment / self.total_investment * 100,
+                'Loss_Pct': (investment - current) / investment * 100,
+            })
+        return summary[investment != 0].sort_values('Portfolio_Weight', ascending=False).reset_index(drop=True)
+
+    def to_frame(self) -> pd.DataFrame:
+        """Full per-position snapshot (O(n) - for reports, not per tick)"""
+        df = pd.DataFrame({
+            'Symbol': self.symbols,
+            'Quantity': self.quantity,
+            'Avg_Cost': self.avg_cost,
+            'Current_Price': self.price,
+            'Investment_Value': self.investment,
+            'Current_Value': self.current,
+        })
+        df['Absolute_Loss'] = df['Current_Value'] - df['Investment_Value']
+        with np.errstate(divide='ignore', invalid='ignore'):
+            df['Unrealized_PL_Pct'] = df['Absolute_Loss'] / df['Investment_Value'] * 100
+        df['Position_Size_Pct'] = df['Investment_Value'] / self.total_investment * 100
+        for column, group in self.groups.items():
+            df[column] = np.asarray(group['labels'], dtype=object)[group['codes']]
+        return df[df['Quantity'] != 0].reset_index(drop=True)
+
+    def to_api_payload(self) -> dict:
+        payload = {'summary': self.totals()}
+        for column in self.groups:
+            payload[column.lower()] = self.group_totals(column).to_dict(orient='records')
+        return payload
+
+
+def main():
+    """Replay random ticks against the holdings file and report the update cost"""
+    import time
+    state = PortfolioState(load_holdings())
+    print(f"Portfolio State - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Start: {state.totals()}")
+
+    rng = np.random.default_rng(0)
+    ticks = 10000
+    start = time.perf_counter()
+    for _ in range(ticks):
+        symbol = state.symbols[rng.integers(len(state.symbols))]
+        i = state.index[symbol]
+        state.update_prices({symbol: state.price[i] * (1 + rng.normal(0, 0.002))})
+    elapsed = time.perf_counter() - start
+    print(f"{ticks:,} ticks in {elapsed * 1000:.1f} ms ({elapsed / ticks * 1e6:.1f} us per tick)")
+    print(f"End: {state.totals()}")
+    print(state.group_totals('Sector').to_string(index=False, float_format='%.2f'))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,33 +1,23 @@
-import pandas as pd
-
-# Portfolio data with sector and market cap classification
-portfolio_detailed = {
-    'Symbol': ['CDSL', 'CHENNPETRO', 'COCHINSHIP', 'ENGINERSIN', 'FACT', 'GSFC',
-               'KALYANKJIL', 'MOIL', 'NETWEB', 'NOVAAGRI', 'PROTEAN', 'RITES', 'SCILAL'],
-    'Sector': ['Financial Services', 'Oil & Gas', 'Capital Goods', 'Capital Goods',
-               'Chemicals', 'Chemicals', 'Consumer Discretionary', 'Metals & Mining',
-               'Technology', 'Agriculture', 'Technology/Services', 'Capital Goods', 'Pharmaceuticals'],
-    'Market_Cap': ['Large Cap', 'Mid Cap', 'Small Cap', 'Small Cap', 'Large Cap', 'Small Cap',
-                   'Small Cap', 'Mid Cap', 'Small Cap', 'Small Cap', 'Small Cap', 'Mid Cap', 'Small Cap'],
-    'Current_Price': [1419.9, 825.55, 1548.9, 193.88, 868.3, 173.45, 495.45, 340.4, 3273, 36.62, 710.9, 226.65, 46.44],
-    'Avg_Cost': [1723, 1209.98, 2230, 276.1, 1150.3, 275, 784.8, 530.5, 3481.80, 91.64, 2180, 381, 103.7],
-    'Quantity': [289, 312, 46, 90, 858, 384, 126, 1000, 117, 1111, 11, 264, 3000],
-    'Investment_Value': [497947, 377513.76, 102580, 24849, 986957.4, 105600, 98884.8, 530500, 407370.6, 101812.04, 23980, 100584, 311100],
-    'Current_Value': [410351.1, 257571.6, 71249.4, 17449.2, 745001.4, 66604.8, 62426.7, 340400, 382941, 40684.82, 7819.9, 59835.6, 139320],
-    'Unrealized_PL_Pct': [-17.59, -31.77, -30.54, -29.78, -24.52, -36.93, -36.87, -35.83, -6.00, -60.04, -67.39, -40.51, -55.22],
-    'Capital_Gain_Type': ['STCG', 'LTCG', 'STCG', 'LTCG', 'LTCG', 'LTCG', 'LTCG', 'LTCG', 'STCG', 'LTCG', 'LTCG', 'LTCG', 'LTCG']
-}
+from portfolio_engine import analyze_portfolio, load_holdings
+from rebalancer import rebalance_account
+from classification import get_classification, LARGE_CAP_RANK, MID_CAP_RANK
+from exposure_cube import ExposureCube
+
+# Portfolio data (holdings.csv) with sector and market cap from the classification master
+analysis = analyze_portfolio(load_holdings(), classification=get_classification())
 
-# Market cap ranges (approximate as of 2024-25)
+# SEBI categorization by market-cap rank
 market_cap_criteria = {
-    'Large Cap': 'Market Cap > ₹20,000 Cr',
-    'Mid Cap': 'Market Cap ₹5,000-20,000 Cr',
-    'Small Cap': 'Market Cap < ₹5,000 Cr'
+    'Large Cap': f'Top {LARGE_CAP_RANK} companies by market cap',
+    'Mid Cap': f'Rank {LARGE_CAP_RANK + 1}-{MID_CAP_RANK} by market cap',
+    'Small Cap': f'Rank {MID_CAP_RANK + 1} and below'
 }
 
-df = pd.DataFrame(portfolio_detailed)
+df = analysis['positions']
 df['Loss_Amount'] = df['Investment_Value'] - df['Current_Value']
-df['Position_Size_Pct'] = (df['Investment_Value'] / df['Investment_Value'].sum()) * 100
+
+# Every market-cap / sector breakdown below is read from one aggregation
+cube = ExposureCube(df)
 
 print("=" * 80)
 print("PORTFOLIO ANALYSIS: SECTOR & MARKET CAP CLASSIFICATION")
@@ -36,15 +26,7 @@ print()
 
 # Market cap breakdown
 print("📊 MARKET CAP DISTRIBUTION:")
-market_cap_summary = df.groupby('Market_Cap').agg({
-    'Investment_Value': 'sum',
-    'Current_Value': 'sum',
-    'Loss_Amount': 'sum',
-    'Symbol': 'count'
-}).reset_index()
-market_cap_summary.columns = ['Market_Cap', 'Investment', 'Current_Value', 'Loss_Amount', 'Stock_Count']
-market_cap_summary['Portfolio_Weight'] = (market_cap_summary['Investment'] / market_cap_summary['Investment'].sum()) * 100
-market_cap_summary['Loss_Pct'] = (market_cap_summary['Loss_Amount'] / market_cap_summary['Investment']) * 100
+market_cap_summary = cube.rollup('Market_Cap')
 
 for _, row in market_cap_summary.iterrows():
     print(f"{row['Market_Cap']}: {row['Stock_Count']} stocks, {row['Portfolio_Weight']:.1f}% allocation, {row['Loss_Pct']:.1f}% loss")
@@ -52,16 +34,7 @@ print()
 
 # Sector breakdown
 print("🏭 SECTOR DISTRIBUTION:")
-sector_summary = df.groupby('Sector').agg({
-    'Investment_Value': 'sum',
-    'Current_Value': 'sum',
-    'Loss_Amount': 'sum',
-    'Symbol': 'count'
-}).reset_index()
-sector_summary.columns = ['Sector', 'Investment', 'Current_Value', 'Loss_Amount', 'Stock_Count']
-sector_summary['Portfolio_Weight'] = (sector_summary['Investment'] / sector_summary['Investment'].sum()) * 100
-sector_summary['Loss_Pct'] = (sector_summary['Loss_Amount'] / sector_summary['Investment']) * 100
-sector_summary = sector_summary.sort_values('Portfolio_Weight', ascending=False)
+sector_summary = cube.rollup('Sector').sort_values('Portfolio_Weight', ascending=False)
 
 for _, row in sector_summary.iterrows():
     print(f"{row['Sector']}: {row['Portfolio_Weight']:.1f}% allocation, {row['Loss_Pct']:.1f}% loss")
@@ -107,26 +80,25 @@ print()
 print("⚠️  RISK ANALYSIS BY MARKET CAP:")
 print()
 
-small_cap_stocks = df[df['Market_Cap'] == 'Small Cap']
-mid_cap_stocks = df[df['Market_Cap'] == 'Mid Cap']
-large_cap_stocks = df[df['Market_Cap'] == 'Large Cap']
+caps = market_cap_summary.set_index('Market_Cap').reindex(['Large Cap', 'Mid Cap', 'Small Cap'])
+small_cap_stocks, mid_cap_stocks, large_cap_stocks = caps.loc['Small Cap'], caps.loc['Mid Cap'], caps.loc['Large Cap']
 
 print(f"Small Cap Risk:")
-print(f"• {len(small_cap_stocks)} stocks ({(small_cap_stocks['Investment_Value'].sum()/df['Investment_Value'].sum()*100):.1f}% of portfolio)")
-print(f"• Average loss: {small_cap_stocks['Unrealized_PL_Pct'].mean():.1f}%")
+print(f"• {small_cap_stocks['Stock_Count']:.0f} stocks ({small_cap_stocks['Portfolio_Weight']:.1f}% of portfolio)")
+print(f"• Average loss: {small_cap_stocks['Avg_PL_Pct']:.1f}%")
 print(f"• Highest volatility and recovery uncertainty")
 print(f"• Recommendation: Reduce exposure to <30% of portfolio")
 print()
 
 print(f"Mid Cap Performance:")
-print(f"• {len(mid_cap_stocks)} stocks ({(mid_cap_stocks['Investment_Value'].sum()/df['Investment_Value'].sum()*100):.1f}% of portfolio)")
-print(f"• Average loss: {mid_cap_stocks['Unrealized_PL_Pct'].mean():.1f}%")
+print(f"• {mid_cap_stocks['Stock_Count']:.0f} stocks ({mid_cap_stocks['Portfolio_Weight']:.1f}% of portfolio)")
+print(f"• Average loss: {mid_cap_stocks['Avg_PL_Pct']:.1f}%")
 print(f"• Moderate risk-reward profile")
 print()
 
 print(f"Large Cap Stability:")
-print(f"• {len(large_cap_stocks)} stocks ({(large_cap_stocks['Investment_Value'].sum()/df['Investment_Value'].sum()*100):.1f}% of portfolio)")
-print(f"• Average loss: {large_cap_stocks['Unrealized_PL_Pct'].mean():.1f}%")
+print(f"• {large_cap_stocks['Stock_Count']:.0f} stocks ({large_cap_stocks['Portfolio_Weight']:.1f}% of portfolio)")
+print(f"• Average loss: {large_cap_stocks['Avg_PL_Pct']:.1f}%")
 print(f"• Lower volatility, better recovery potential")
 print(f"• Recommendation: Increase allocation to >50% of portfolio")
 print()
@@ -136,7 +108,7 @@ print("🎯 REBALANCING RECOMMENDATIONS:")
 print()
 print("Current Allocation:")
 for cap_type in ['Large Cap', 'Mid Cap', 'Small Cap']:
-    weight = market_cap_summary[market_cap_summary['Market_Cap'] == cap_type]['Portfolio_Weight'].iloc[0]
+    weight = caps.loc[cap_type, 'Portfolio_Weight']
     print(f"• {cap_type}: {weight:.1f}%")
 
 print()
@@ -160,6 +132,16 @@ print("• Maximum 3-4 sectors with >10% allocation")
 print("• Diversify across cyclical and defensive sectors")
 print()
 
+# Trades that reach the targets (bands, 15% sector cap, 12% stock cap) with the least turnover
+rebalance = rebalance_account(df)
+print("🔁 REBALANCING TRADES:")
+for _, trade in rebalance['trades'].iterrows():
+    print(f"• {trade['Action']} {abs(trade['Trade_Quantity']):,.0f} {trade['Symbol']} "
+          f"(₹{abs(trade['Trade_Value']):,.0f}) - {trade['Current_Weight']:.1f}% → {trade['Target_Weight']:.1f}%")
+print(f"Turnover: {rebalance['summary']['turnover_pct']:.1f}% of portfolio, "
+      f"realized loss booked: ₹{-rebalance['summary']['realized_gain']:,.0f}")
+print()
+
 # Export summary
 summary_export = df[['Symbol', 'Sector', 'Market_Cap', 'Unrealized_PL_Pct', 'Loss_Amount', 'Position_Size_Pct']].copy()
 summary_export['Action'] = summary_export['Symbol'].map(actions)
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Universe Price Matrix - Aligned OHLCV Arrays from the Local Price Cache
+======================================================================
+
+Loads per-symbol daily history (one CSV per symbol in price_cache/) and aligns
+it onto a common date axis as dates x symbols NumPy matrices. Missing bars
+(before listing, suspensions) are NaN. Benchmark indices are cached apart, in
+price_cache/indices/, so they never enter the stock matrices. Every portfolio-level module works on
+these matrices instead of looping over per-symbol DataFrames.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import os
+import warnings
+warnings.filterwarnings('ignore')
+
+PRICE_CACHE_DIR = 'price_cache'
+FIELDS = ['open', 'high', 'low', 'close', 'volume']
+
+# Benchmark indices, cached under these names (e.g. price_cache/NIFTY50.csv)
+INDEX_TICKERS = {
+    'NIFTY50': '^NSEI',
+    'NIFTY500': '^CRSLDX',
+    'NIFTYBANK': '^NSEBANK',
+    'NIFTYIT': '^CNXIT',
+    'NIFTYPHARMA': '^CNXPHARMA',
+    'NIFTYMETAL': '^CNXMETAL',
+    'NIFTYAUTO': '^CNXAUTO',
+    'NIFTYFMCG': '^CNXFMCG',
+    'NIFTYENERGY': '^CNXENERGY',
+    'NIFTYINFRA': '^CNXINFRA',
+}
+DEFAULT_INDEX = 'NIFTY50'
+INDEX_SUBDIR = 'indices'
+
+
+def align_price_data(price_data: dict) -> dict:
+    """
+    Align {symbol: OHLCV DataFrame} onto one date axis.
+
+    Returns:
+        Dictionary with 'dates' (DatetimeIndex), 'symbols' (list) and one
+        dates x symbols float64 matrix per OHLCV field
+    """
+    symbols = list(price_data)
+    frames = {}
+    for symbol, data in price_data.items():
+        frame = data.rename(columns=str.lower)
+        index = pd.DatetimeIndex(frame.index)
+        frame.index = index.tz_localize(None) if index.tz is not None else index
+        frames[symbol] = frame
+
+    dates = pd.DatetimeIndex(sorted(set().union(*(f.index for f in frames.values())))) \
+        if frames else pd.DatetimeIndex([])
+
+    matrices = {'dates': dates, 'symbols': symbols}
+    for field in FIELDS:
+        matrix = np.full((len(dates), len(symbols)), np.nan)
+        for col, symbol in enumerate(symbols):
+            frame = frames[symbol]
+            if field in frame.columns:
+                rows = dates.get_indexer(frame.index)
+                matrix[rows, col] = frame[field].to_numpy(dtype=np.float64)
+        matrices[field] = matrix
+
+    # Fall back to the close where a feed has no separate open
+    missing_open = np.isnan(matrices['open'])
+    matrices['open'][missing_open] = matrices['close'][missing_open]
+    return matrices
+
+
+def load_price_cache(symbols: list = None, cache_dir: str = PRICE_CACHE_DIR,
+                     start: str = None, end: str = None) -> dict:
+    """Read cached CSVs (all of them, or just `symbols`) into an aligned matrix"""
+    if not os.path.isdir(cache_dir):
+        raise FileNotFoundError(f"Price cache directory '{cache_dir}' not found")
+
+    if symbols is None:
+        # Every cached stock; index levels cached by older versions next to the stocks are left out
+        symbols = sorted(f[:-4] for f in os.listdir(cache_dir) if f.endswith('.csv') and f[:-4] not in INDEX_TICKERS)
+
+    price_data = {}
+    for symbol in symbols:
+        path = os.path.join(cache_dir, f"{symbol}.csv")
+        if not os.path.exists(path):
+            continue
+        data = pd.read_csv(path, index_col=0, parse_dates=True)
+        if start or end:
+            data = data.loc[start:end]
+        if not data.empty:
+            price_data[symbol] = data
+
+    return align_price_data(price_data)
+
+
+def save_price_cache(price_data: dict, cache_dir: str = PRICE_CACHE_DIR):
+    """Write {symbol: OHLCV DataFrame} to one CSV per symbol"""
+    os.makedirs(cache_dir, exist_ok=True)
+    for symbol, data in price_data.items():
+        data.to_csv(os.path.join(cache_dir, f"{symbol}.csv"))
+
+
+def download_price_cache(symbols: list, period: str = '5y', cache_dir: str = PRICE_CACHE_DIR,
+                         suffix: str = '.NS') -> list:
+    """Fetch daily history with yfinance and refresh the local cache"""
+    import time
+    import yfinance as yf
+
+    saved = []
+    for symbol in symbols:
+        try:
+            data = yf.Ticker(f"{symbol}{suffix}").history(period=period, interval='1d',
+                                                           auto_adjust=False, actions=False)
+            if data.empty:
+                continue
+            data = data[['Open', 'High', 'Low', 'Close', 'Volume']]
+            save_price_cache({symbol: data}, cache_dir)
+            saved.append(symbol)
+            time.sleep(0.05)  # Rate limiting
+        except Exception as e:
+            print(f"Error fetching {symbol}: {e}")
+            continue
+    return saved
+
+
+def download_index_cache(names: list = None, period: str = '5y', cache_dir: str = PRICE_CACHE_DIR) -> list:
+    """Fetch benchmark index history into cache_dir/indices/ under the INDEX_TICKERS names"""
+    import yfinance as yf
+
+    saved = []
+    for name in names or list(INDEX_TICKERS):
+        try:
+            data = yf.Ticker(INDEX_TICKERS[name]).history(period=period, interval='1d',
+                                                          auto_adjust=False, actions=False)
+            if data.empty:
+                continue
+            save_price_cache({name: data[['Open', 'High', 'Low', 'Close', 'Volume']]},
+                             os.path.join(cache_dir, INDEX_SUBDIR))
+            saved.append(name)
+        except Exception as e:
+            print(f"Error fetching {name}: {e}")
+            continue
+    return saved
+
+
+def load_index_close(name: str = DEFAULT_INDEX, cache_dir: str = PRICE_CACHE_DIR) -> pd.Series:
+    """Daily closes of a cached benchmark index (tz-naive DatetimeIndex)"""
+    path = os.path.join(cache_dir, INDEX_SUBDIR, f"{name}.csv")
+    if not os.path.exists(path):
+        # Layout before indices had their own directory
+        path = os.path.join(cache_dir, f"{name}.csv")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Index '{name}' not in the price cache - run download_index_cache()")
+    data = pd.read_csv(path, index_col=0, parse_dates=True).rename(columns=str.lower)
+    index = pd.DatetimeIndex(data.index)
+    data.index = index.tz_localize(None) if index.tz is not None else index
+    return data['close'].dropna().sort_index()
+
+
+def load_universe(csv_file: str = 'nifty500.csv') -> list:
+    """Symbols from the scanner's universe CSV"""
+    df = pd.read_csv(csv_file)
+    return df['Symbol'].dropna().astype(str).str.strip().tolist()
+
+
+def forward_filled(matrix: np.ndarray) -> np.ndarray:
+    """Carry the last valid value forward down each column (a 1-D series or dates x symbols)"""
+    rows = np.arange(len(matrix)).reshape((-1,) + (1,) * (matrix.ndim - 1))
+    idx = np.where(np.isnan(matrix), -1, rows)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    filled = np.take_along_axis(matrix, np.maximum(idx, 0), axis=0)
+    return np.where(idx >= 0, filled, np.nan)
+
+
+def rolling_mean(matrix: np.ndarray, period: int) -> np.ndarray:
+    """Column-wise simple moving average of a dates x symbols matrix"""
+    return pd.DataFrame(matrix).rolling(window=period, min_periods=period).mean().to_numpy()
+
+
+def ewm_mean(matrix: np.ndarray, span: int, adjust: bool = True) -> np.ndarray:
+    """Column-wise exponential moving average of a dates x symbols matrix"""
+    return pd.DataFrame(matrix).ewm(span=span, adjust=adjust).mean().to_numpy()
+
+
+def main():
+    """Refresh the price cache for the NIFTY 500 universe"""
+    print(f"Price Cache Refresh - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 60)
+
+    if not os.path.exists('nifty500.csv'):
+        print("nifty500.csv not found")
+        return
+
+    symbols = load_universe('nifty500.csv')
+    saved = download_price_cache(symbols)
+    print(f"Cached {len(saved)} of {len(symbols)} symbols in {PRICE_CACHE_DIR}/")
+
+    matrices = load_price_cache(saved)
+    print(f"Price matrix: {len(matrices['dates'])} dates x {len(matrices['symbols'])} symbols")
+
+    indices = download_index_cache()
+    print(f"Cached {len(indices)} benchmark indices: {', '.join(indices)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+"""
+Rebalancer - Trade List to Reach the Target Allocation
+======================================================
+
+Computes the trades behind the targets printed by portfolio_with_market_cap.py
+and portfolio_analysis.py:
+
+- market-cap bands: Large Cap 60-70%, Mid Cap 20-25%, Small Cap 10-15%
+- no sector above 15%, no stock above 12% of the portfolio
+- trades in whole lots; sells rounded up, buys rounded down, so the caps
+  still hold after rounding
+
+Only the excess over each limit is sold, from the stock cap down to the
+market-cap bands. Within a group, minimum turnover cuts the largest holdings
+down to a common level, so a holding is only exited when the whole group has
+to go; minimum tax sells cheapest in tax first (losses first, then long-term
+gains). Underweight bands are bought through the
+supplied candidates, then a diversified fill instrument per band.
+
+Each step is a sorted, grouped cumulative sum with (account, group) keys,
+so rebalance_batch() solves thousands of accounts in the same array passes
+as a single one.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+from portfolio_engine import compute_positions
+from tax_lots import LTCG_RATE, STCG_RATE
+
+CAP_BANDS = {
+    'Large Cap': (60.0, 70.0),
+    'Mid Cap': (20.0, 25.0),
+    'Small Cap': (10.0, 15.0),
+}
+MAX_SECTOR_PCT = 15.0
+MAX_STOCK_PCT = 12.0
+FILL_SECTOR = 'Diversified'
+OBJECTIVES = ['turnover', 'tax']
+
+
+def fill_instruments(bands: dict = CAP_BANDS) -> pd.DataFrame:
+    """One diversified instrument per band (e.g. an index fund), bought in rupees"""
+    return pd.DataFrame({
+        'Symbol': [f"{band.upper().replace(' ', '_')}_FUND" for band in bands],
+        'Sector': FILL_SECTOR,
+        'Market_Cap': list(bands),
+        'Current_Price': 1.0,
+        'Lot_Size': 1.0,
+    })
+
+
+def _cumsum_by_group(group: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """Running total of values that restarts at every new group (group sorted)"""
+    total = np.cumsum(values)
+    new_group = np.ones(len(group), dtype=bool)
+    new_group[1:] = group[1:] != group[:-1]
+    before = np.where(new_group, total - values, 0.0)
+    return total - np.maximum.accumulate(before) if len(group) else total
+
+
+def sell_down(value: np.ndarray, group: np.ndarray, excess: np.ndarray,
+              priority: np.ndarray, eligible: np.ndarray) -> np.ndarray:
+    """
+    Remove excess[g] of value from each group g, taking holdings in
+    ascending priority order; returns the new values.
+    """
+    idx = np.flatnonzero(eligible & (excess[np.maximum(group, 0)] > 0) & (group >= 0))
+    if idx.size == 0:
+        return value
+    order = idx[np.lexsort((priority[idx], group[idx]))]
+    g, held = group[order], value[order]
+    before = _cumsum_by_group(g, held) - held
+    out = value.copy()
+    out[order] -= np.clip(excess[g] - before, 0.0, held)
+    return out
+
+
+def level_down(value: np.ndarray, group: np.ndarray, excess: np.ndarray,
+               eligible: np.ndarray) -> np.ndarray:
+    """
+    Remove excess[g] of value from each group g by cutting its largest
+    holdings down to a common level; returns the new values.
+
+    With holdings sorted largest first and S_k the sum of the top k, the
+    level is max over k of (S_k - excess) / k, floored at 0.
+    """
+    idx = np.flatnonzero(eligible & (excess[np.maximum(group, 0)] > 0) & (group >= 0))
+    if idx.size == 0:
+        return value
+    order = idx[np.lexsort((-value[idx], group[idx]))]
+    g, held = group[order], value[order]
+    new_group = np.ones(len(g), dtype=bool)
+    new_group[1:] = g[1:] != g[:-1]
+    starts = np.flatnonzero(new_group)
+    rank = np.arange(1, len(g) + 1) - np.repeat(starts, np.diff(np.append(starts, len(g))))
+    level = np.full(len(excess), -np.inf)
+    np.maximum.at(level, g, (_cumsum_by_group(g, held) - excess[g]) / rank)
+    out = value.copy()
+    out[order] = np.minimum(held, np.maximum(level[g], 0.0))
+    return out
+
+
+def _group_totals(value: np.ndarray, group: np.ndarray, n: int) -> np.ndarray:
+    keep = group >= 0
+    return np.bincount(group[keep], value[keep], n)
+
+
+def _group_keys(account: np.ndarray, code: np.ndarray, n: int) -> np.ndarray:
+    """Per-account group codes combined into one key (-1 stays unconstrained)"""
+    return np.where(code >= 0, account * n + code, -1)
+
+
+def rebalance_values(value: np.ndarray, account: np.ndarray, band: np.ndarray, sector: np.ndarray,
+                     priority: np.ndarray, is_fill: np.ndarray, n_bands: int, n_sectors: int,
+                     lo: np.ndarray, hi: np.ndarray, cash=0.0, max_sector_pct: float = MAX_SECTOR_PCT,
+                     max_stock_pct: float = MAX_STOCK_PCT, level: bool = False) -> np.ndarray:
+    """
+    Target rupee value of every row (holdings, buy candidates and fills) for
+    any number of accounts at once.
+
+    account, band and sector are integer codes (band / sector -1 =
+    unconstrained; fills have sector -1); lo / hi are the band limits in
+    percent; candidates and fills enter with value 0. Sells never touch
+    candidates; buys go to the candidates of each band in priority order
+    (existing holdings are not added to), the band's fill taking the rest.
+    level: sell by level_down() (minimum turnover) instead of priority order.
+    """
+    n_accounts = int(account.max()) + 1 if len(account) else 0
+    total = np.bincount(account, value, n_accounts) + cash
+    stock_cap = max_stock_pct / 100 * total[account]
+    sector_cap = np.repeat(max_sector_pct / 100 * total, n_sectors)
+    band_lo = (np.outer(total, lo) / 100).ravel()
+    band_hi = (np.outer(total, hi) / 100).ravel()
+    band_key = _group_keys(account, band, n_bands)
+    sector_key = _group_keys(account, sector, n_sectors)
+    n_band_keys, n_sector_keys = n_accounts * n_bands, n_accounts * n_sectors
+    held = value > 0
+
+    def sell(current, group, excess, eligible):
+        if level:
+            return level_down(current, group, excess, eligible)
+        return sell_down(current, group, excess, priority, eligible)
+
+    # 1. Stock cap, 2. sector cap, 3. upper edge of each market-cap band
+    target = np.where(is_fill, value, np.minimum(value, stock_cap))
+    sector_excess = np.maximum(_group_totals(target, sector_key, n_sector_keys) - sector_cap, 0.0)
+    target = sell(target, sector_key, sector_excess, held & ~is_fill)
+    band_excess = np.maximum(_group_totals(target, band_key, n_band_keys) - band_hi, 0.0)
+    target = sell(target, band_key, band_excess, held)
+
+    # 4. Raise cash for the lower edges by selling bands that sit above theirs
+    band_value = _group_totals(target, band_key, n_band_keys)
+    shortfall = np.maximum(band_lo - band_value, 0.0)
+    available = total - np.bincount(account, target, n_accounts)
+    needed = np.maximum(shortfall.reshape(n_accounts, n_bands).sum(axis=1) - available, 0.0)
+    if needed.any():
+        surplus = np.maximum(band_value - band_lo, 0.0).reshape(n_accounts, n_bands)
+        surplus_total = surplus.sum(axis=1)
+        if (surplus_total < needed - 1e-6).any():
+            raise ValueError("Market-cap bands cannot all be met: lower limits exceed the portfolio")
+        share = np.divide(needed, surplus_total, out=np.zeros(n_accounts), where=surplus_total > 0)
+        target = sell(target, band_key, (surplus * share[:, None]).ravel(), held)
+        available = total - np.bincount(account, target, n_accounts)
+
+    # 5. Buy: shortfalls first, then leftover cash pro rata to each band's headroom
+    band_value = _group_totals(target, band_key, n_band_keys)
+    buy = shortfall.copy()
+    leftover = available - shortfall.reshape(n_accounts, n_bands).sum(axis=1)
+    headroom = np.maximum(band_hi - band_value - shortfall, 0.0).reshape(n_accounts, n_bands)
+    headroom_total = headroom.sum(axis=1)
+    scale = np.divide(np.maximum(leftover, 0.0), headroom_total, out=np.zeros(n_accounts),
+                      where=headroom_total > 0)
+    buy += (headroom * np.minimum(scale, 1.0)[:, None]).ravel()
+
+    # Candidates, one priority rank per pass across every account and band
+    sector_room = np.maximum(sector_cap - _group_totals(target, sector_key, n_sector_keys), 0.0)
+    members = np.flatnonzero((band_key >= 0) & ~is_fill & ~held)
+    members = members[np.lexsort((priority[members], band_key[members]))]
+    new_band = np.ones(len(members), dtype=bool)
+    new_band[1:] = band_key[members][1:] != band_key[members][:-1]
+    starts = np.flatnonzero(new_band)
+    rank = np.arange(len(members)) - np.repeat(starts, np.diff(np.append(starts, len(members))))
+    for r in range(int(rank.max()) + 1 if len(rank) else 0):
+        rows = members[rank == r]
+        rows = rows[buy[band_key[rows]] > 0]
+        if rows.size == 0:
+            continue
+        amount = np.minimum(np.maximum(stock_cap[rows] - target[rows], 0.0), buy[band_key[rows]])
+        limited = sector_key[rows] >= 0
+        # Rows of one pass can share a sector (different bands): fill the sector room in order
+        if limited.any():
+            lim = rows[limited]
+            order = np.argsort(sector_key[lim], kind='stable')
+            keys, wanted = sector_key[lim][order], amount[limited][order]
+            before = _cumsum_by_group(keys, wanted) - wanted
+            granted = np.empty_like(wanted)
+            granted[order] = np.clip(sector_room[keys] - before, 0.0, wanted)
+            amount[limited] = granted
+            np.add.at(sector_room, sector_key[lim], -granted)
+        target[rows] += amount
+        np.add.at(buy, band_key[rows], -amount)
+
+    fills = np.flatnonzero(is_fill & (band_key >= 0))
+    target[fills] += np.maximum(buy[band_key[fills]], 0.0)
+    return target
+
+
+def sell_priority(positions: pd.DataFrame, objective: str = 'turnover') -> np.ndarray:
+    """Lower sells first: largest holding (turnover, see level_down) or lowest tax per rupee sold (tax)"""
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    value = positions['Current_Value'].to_numpy(dtype=np.float64)
+    if objective == 'turnover':
+        return -value
+    gain_frac = positions['Absolute_Loss'].to_numpy(dtype=np.float64) / np.where(value > 0, value, 1.0)
+    long_term = (positions['Capital_Gain_Type'] == 'LTCG').to_numpy() \
+        if 'Capital_Gain_Type' in positions.columns else np.zeros(len(positions), dtype=bool)
+    rate = np.where(long_term, LTCG_RATE, STCG_RATE) / 100
+    return gain_frac * rate
+
+
+def _build_book(holdings: pd.DataFrame, prices, candidates: pd.DataFrame, bands: dict,
+                objective: str, account_column: str = None) -> pd.DataFrame:
+    """Holdings plus, for every account, the buy candidates and fill instruments"""
+    positions = holdings if 'Current_Value' in holdings.columns else compute_positions(holdings, prices)
+    book = pd.DataFrame({
+        'Account': positions[account_column].to_numpy() if account_column else 0,
+        'Symbol': positions['Symbol'].to_numpy(),
+        'Sector': positions['Sector'].to_numpy(),
+        'Market_Cap': positions['Market_Cap'].to_numpy(),
+        'Current_Price': positions['Current_Price'].to_numpy(dtype=np.float64),
+        'Quantity': positions['Quantity'].to_numpy(dtype=np.float64),
+        'Avg_Cost': positions['Avg_Cost'].to_numpy(dtype=np.float64),
+        'Lot_Size': positions['Lot_Size'].to_numpy() if 'Lot_Size' in positions.columns else 1.0,
+        'Current_Value': positions['Current_Value'].to_numpy(dtype=np.float64),
+        'Priority': sell_priority(positions, objective),
+        'Is_Fill': False,
+    })
+    accounts = pd.unique(book['Account'])
+
+    extra = []
+    if candidates is not None:
+        extra.append(candidates.assign(Is_Fill=False, Priority=np.arange(len(candidates), dtype=np.float64)))
+    extra.append(fill_instruments(bands).assign(Is_Fill=True, Priority=0.0))
+    new = pd.concat(extra, ignore_index=True)
+    if 'Lot_Size' not in new.columns:
+        new['Lot_Size'] = 1.0
+    # Every account gets its own copy; candidates it already holds are dropped
+    new = new.iloc[np.tile(np.arange(len(new)), len(accounts))].reset_index(drop=True)
+    new['Account'] = np.repeat(accounts, len(new) // len(accounts))
+    new = new.assign(Quantity=0.0, Current_Value=0.0, Avg_Cost=new['Current_Price'])
+    held = pd.MultiIndex.from_frame(book[['Account', 'Symbol']])
+    new = new[~pd.MultiIndex.from_frame(new[['Account', 'Symbol']]).isin(held)]
+
+    book = pd.concat([book, new[book.columns]], ignore_index=True)
+    book['Lot_Size'] = book['Lot_Size'].fillna(1.0).astype(np.float64)
+    book['Account_Code'] = pd.factorize(book['Account'], sort=True)[0]
+    return book
+
+
+def _solve(book: pd.DataFrame, bands: dict, cash, max_sector_pct: float, max_stock_pct: float,
+           objective: str) -> np.ndarray:
+    band_names = list(bands)
+    is_fill = book['Is_Fill'].to_numpy(dtype=bool)
+    band_code = pd.Categorical(book['Market_Cap'], categories=band_names).codes.astype(np.int64)
+    sector_code, sector_names = pd.factorize(book['Sector'].where(~is_fill), sort=True)
+    lo = np.array([bands[b][0] for b in band_names])
+    hi = np.array([bands[b][1] for b in band_names])
+    return rebalance_values(book['Current_Value'].to_numpy(), book['Account_Code'].to_numpy(),
+                            band_code, sector_code, book['Priority'].to_numpy(dtype=np.float64), is_fill,
+                            len(band_names), len(sector_names), lo, hi, cash, max_sector_pct, max_stock_pct,
+                            level=objective == 'turnover')
+
+
+def _round_trades(book: pd.DataFrame, target: np.ndarray, cash) -> pd.DataFrame:
+    """Round the target values to whole lots; adds trade and weight columns"""
+    value = book['Current_Value'].to_numpy()
+    price = book['Current_Price'].to_numpy()
+    lot = book['Lot_Size'].to_numpy()
+    lots = (target - value) / (price * lot)
+    # Sells round up to a whole lot (never beyond the holding), buys round down
+    delta = np.where(lots < 0, -np.minimum(np.ceil(-lots - 1e-9) * lot, book['Quantity'].to_numpy()),
+                     np.floor(lots + 1e-9) * lot)
+    code = book['Account_Code'].to_numpy()
+    total = np.bincount(code, value) + cash
+    book = book.assign(Trade_Quantity=delta, Trade_Value=delta * price, Total_Value=total[code])
+    book['Target_Value'] = value + book['Trade_Value']
+    book['Current_Weight'] = value / book['Total_Value'] * 100
+    book['Target_Weight'] = book['Target_Value'] / book['Total_Value'] * 100
+    book['Action'] = np.where(delta > 0, 'BUY', np.where(delta < 0, 'SELL', 'HOLD'))
+    book['Realized_Gain'] = np.where(delta < 0, -delta * (price - book['Avg_Cost'].to_numpy()), 0.0)
+    return book
+
+
+def _account_summary(book: pd.DataFrame) -> pd.DataFrame:
+    """Sells, buys, turnover, realized gain, cash left and largest weights per account"""
+    sells = book['Action'] == 'SELL'
+    traded = book.assign(Sell_Value=np.where(sells, -book['Trade_Value'], 0.0),
+                         Buy_Value=np.where(book['Action'] == 'BUY', book['Trade_Value'], 0.0),
+                         Traded=book['Action'] != 'HOLD')
+    summary = traded.groupby('Account').agg(
+        total_value=('Total_Value', 'first'),
+        sell_value=('Sell_Value', 'sum'),
+        buy_value=('Buy_Value', 'sum'),
+        realized_gain=('Realized_Gain', 'sum'),
+        invested_after=('Target_Value', 'sum'),
+        trades=('Traded', 'sum'),
+    )
+    summary['turnover_pct'] = (summary['sell_value'] + summary['buy_value']) / summary['total_value'] * 100
+    summary['cash_left'] = summary['total_value'] - summary.pop('invested_after')
+    stocks = book[~book['Is_Fill']]
+    summary['max_stock_weight'] = stocks.groupby('Account')['Target_Weight'].max()
+    summary['max_sector_weight'] = stocks.groupby(['Account', 'Sector'])['Target_Weight'].sum() \
+        .groupby(level='Account').max()
+    return summary.reset_index()
+
+
+TRADE_COLUMNS = ['Symbol', 'Action', 'Trade_Quantity', 'Current_Price', 'Trade_Value', 'Market_Cap',
+                 'Sector', 'Current_Weight', 'Target_Weight', 'Realized_Gain']
+
+
+def rebalance_account(holdings: pd.DataFrame, prices=None, candidates: pd.DataFrame = None,
+                      bands: dict = CAP_BANDS, max_sector_pct: float = MAX_SECTOR_PCT,
+                      max_stock_pct: float = MAX_STOCK_PCT, objective: str = 'turnover',
+                      cash: float = 0.0) -> dict:
+    """
+    Trade list that brings one account inside the bands and caps.
+
+    Args:
+        holdings: holdings table (Symbol, Quantity, Avg_Cost, Current_Price,
+                  Sector, Market_Cap; optional Lot_Size, Capital_Gain_Type)
+        candidates: optional stocks to buy, in order of preference (Symbol,
+                    Sector, Market_Cap, Current_Price, optional Lot_Size)
+        objective: 'turnover' or 'tax' - which holdings are sold first
+        cash: extra cash to invest alongside the rebalance
+
+    Returns:
+        Dictionary with 'trades', 'allocation' (before / after per band and
+        sector) and 'summary'
+    """
+    book = _build_book(holdings, prices, candidates, bands, objective)
+    book = _round_trades(book, _solve(book, bands, cash, max_sector_pct, max_stock_pct, objective), cash)
+    trades = book.loc[book['Action'] != 'HOLD', TRADE_COLUMNS] \
+        .sort_values(['Action', 'Trade_Value'], ascending=[False, True]).reset_index(drop=True)
+    allocation = pd.concat([
+        book.groupby('Market_Cap')[['Current_Weight', 'Target_Weight']].sum().reindex(list(bands))
+            .fillna(0.0).assign(Group='Market_Cap'),
+        book[~book['Is_Fill']].groupby('Sector')[['Current_Weight', 'Target_Weight']].sum().assign(Group='Sector'),
+    ]).rename_axis('Name').reset_index()
+    summary = _account_summary(book).drop(columns='Account').iloc[0].to_dict()
+    summary['trades'] = int(summary['trades'])
+    return {'trades': trades, 'allocation': allocation, 'summary': summary}
+
+
+def rebalance_batch(holdings: pd.DataFrame, candidates: pd.DataFrame = None, account_column: str = 'Account',
+                    bands: dict = CAP_BANDS, max_sector_pct: float = MAX_SECTOR_PCT,
+                    max_stock_pct: float = MAX_STOCK_PCT, objective: str = 'turnover') -> dict:
+    """
+    rebalance_account() for every account of a long holdings table, solved
+    for all accounts in the same array passes.
+
+    Returns:
+        Dictionary with 'trades' (all accounts, with an account column) and
+        'summary' (one row per account)
+    """
+    book = _build_book(holdings, None, candidates, bands, objective, account_column)
+    book = _round_trades(book, _solve(book, bands, 0.0, max_sector_pct, max_stock_pct, objective), 0.0)
+    trades = book.loc[book['Action'] != 'HOLD', ['Account'] + TRADE_COLUMNS] \
+        .rename(columns={'Account': account_column}).reset_index(drop=True)
+    summary = _account_summary(book).rename(columns={'Account': account_column})
+    return {'trades': trades, 'summary': summary}
+
+
+def display_rebalance(result: dict):
+    summary = result['summary']
+    print(f"Portfolio value: ₹{summary['total_value']:,.0f}  Sell: ₹{summary['sell_value']:,.0f}  "
+          f"Buy: ₹{summary['buy_value']:,.0f}  Turnover: {summary['turnover_pct']:.1f}%")
+    print(f"Realized gain/loss on sells: ₹{summary['realized_gain']:,.0f}  Cash left: ₹{summary['cash_left']:,.0f}")
+    print(f"Largest stock after: {summary['max_stock_weight']:.1f}%  "
+          f"Largest sector after: {summary['max_sector_weight']:.1f}%")
+    print()
+    print("TRADES:")
+    print(result['trades'].to_string(index=False, float_format='%.2f'))
+    print()
+    print("ALLOCATION (% of portfolio):")
+    print(result['allocation'].to_string(index=False, float_format='%.2f'))
+
+
+def main():
+    """Rebalance holdings.csv, then time a synthetic batch of accounts"""
+    import time
+    from portfolio_engine import load_holdings
+
+    print(f"Rebalancer - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+    holdings = load_holdings()
+    for objective in OBJECTIVES:
+        print(f"\nOBJECTIVE: minimum {objective}")
+        print("-" * 80)
+        display_rebalance(rebalance_account(holdings, objective=objective))
+
+    rng = np.random.default_rng(0)
+    n_accounts, per_account = 2000, 25
+    rows = holdings.sample(n_accounts * per_account, replace=True, random_state=0).reset_index(drop=True)
+    rows['Account'] = np.repeat(np.arange(n_accounts), per_account)
+    rows['Symbol'] = rows['Symbol'] + '_' + pd.Series(np.tile(np.arange(per_account), n_accounts)).astype(str)
+    rows['Quantity'] = rng.integers(1, 1000, len(rows))
+    start = time.perf_counter()
+    batch = rebalance_batch(rows, objective='tax')
+    print(f"\nBatch: {n_accounts:,} accounts x {per_account} holdings in {time.perf_counter() - start:.2f}s, "
+          f"median turnover {batch['summary']['turnover_pct'].median():.1f}%")
+
+
+if __name__ == "__main__":
+    main()
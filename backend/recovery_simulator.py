@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+"""
+Recovery Simulator - Monte Carlo Outcomes of Portfolio Exit Plans
+=================================================================
+
+Replaces the fixed "remaining portfolio gains 25% / 30%" assumptions in
+portfolio_analysis.py and sector_analysis.py with simulated outcomes:
+
+- monthly log returns for every holding are drawn jointly from the mean and
+  covariance of their history in the price cache (Cholesky factor of the
+  covariance), so stocks that fell together keep moving together
+- an exit plan is a schedule of fractions of each holding sold per month,
+  optionally with a stop-loss on what is still held; sale proceeds (after
+  transaction_costs exit costs) move to cash
+- every plan is valued on the same paths, as paths x months x holdings
+  arrays processed in chunks of paths
+
+Reported per plan: the distribution of portfolio value after 12 and 24
+months and of the months until the value is back to the amount invested.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+from transaction_costs import sell_costs
+
+MONTH_DAYS = 21
+DEFAULT_HORIZON_MONTHS = 24
+REPORT_MONTHS = (12, 24)
+DEFAULT_PERCENTILES = (5, 25, 50, 75, 95)
+
+# Used when a holding has no price history
+ASSUMED_ANNUAL_RETURN = 0.0
+ASSUMED_ANNUAL_VOL = 0.35
+ASSUMED_CORRELATION = 0.4
+
+
+def estimate_return_model(close: np.ndarray, symbols: list, holdings: list = None,
+                          lookback_days: int = 756) -> dict:
+    """
+    Monthly log-return mean and covariance from a dates x symbols close matrix.
+
+    holdings selects and orders the columns; holdings missing from the
+    matrix (or with too little history) get the assumed volatility and zero
+    mean and are uncorrelated with the rest.
+    """
+    holdings = list(holdings or symbols)
+    frame = pd.DataFrame(np.log(close[-lookback_days - 1:]), columns=list(symbols))
+    daily = frame.diff().iloc[1:].reindex(columns=holdings)
+    mu = daily.mean().fillna(0.0).to_numpy() * MONTH_DAYS
+    cov = daily.cov(min_periods=MONTH_DAYS * 3).to_numpy() * MONTH_DAYS
+
+    var = np.diag(cov).copy()
+    no_history = ~np.isfinite(var)
+    var[no_history] = ASSUMED_ANNUAL_VOL ** 2 / 12
+    cov = np.nan_to_num(cov, nan=0.0)
+    cov[no_history, :] = 0.0
+    cov[:, no_history] = 0.0
+    cov[np.diag_indices_from(cov)] = var
+    mu[no_history] = np.log1p(ASSUMED_ANNUAL_RETURN) / 12
+    return {'symbols': holdings, 'mu': mu, 'cov': cov, 'estimated': ~no_history}
+
+
+def assumed_return_model(holdings: list, annual_return: float = ASSUMED_ANNUAL_RETURN,
+                         annual_vol: float = ASSUMED_ANNUAL_VOL,
+                         correlation: float = ASSUMED_CORRELATION) -> dict:
+    """Equal drift, volatility and pairwise correlation for every holding"""
+    n = len(holdings)
+    var = annual_vol ** 2 / 12
+    cov = np.full((n, n), correlation * var)
+    np.fill_diagonal(cov, var)
+    return {'symbols': list(holdings), 'mu': np.full(n, np.log1p(annual_return) / 12),
+            'cov': cov, 'estimated': np.zeros(n, dtype=bool)}
+
+
+def cholesky_factor(cov: np.ndarray) -> np.ndarray:
+    """Lower Cholesky factor, clipping negative eigenvalues of a pairwise covariance first"""
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        values, vectors = np.linalg.eigh(cov)
+        values = np.maximum(values, 1e-10 * max(values.max(), 1e-12))
+        return np.linalg.cholesky((vectors * values) @ vectors.T)
+
+
+def simulate_growth(model: dict, n_paths: int, horizon: int = DEFAULT_HORIZON_MONTHS,
+                    rng: np.random.Generator = None) -> np.ndarray:
+    """Price relatives vs today, paths x (horizon + 1) x holdings (month 0 = 1.0)"""
+    rng = rng or np.random.default_rng()
+    n = len(model['mu'])
+    shocks = rng.standard_normal((n_paths, horizon, n)) @ cholesky_factor(model['cov']).T
+    shocks += model['mu']
+    growth = np.empty((n_paths, horizon + 1, n))
+    growth[:, 0] = 1.0
+    np.cumsum(shocks, axis=1, out=growth[:, 1:])
+    np.exp(growth[:, 1:], out=growth[:, 1:])
+    return growth
+
+
+def plan_schedule(plan: dict, symbols: list, horizon: int = DEFAULT_HORIZON_MONTHS) -> np.ndarray:
+    """(horizon + 1) x holdings fractions of the original shares sold each month"""
+    schedule = np.zeros((horizon + 1, len(symbols)))
+    column = {symbol: i for i, symbol in enumerate(symbols)}
+    for month, sales in plan.get('sells', []):
+        for symbol, fraction in sales.items():
+            if symbol in column and month <= horizon:
+                schedule[month, column[symbol]] += fraction
+    # Never sell more than is held
+    held = np.clip(1 - np.cumsum(schedule, axis=0), 0.0, 1.0)
+    return -np.diff(np.vstack([np.ones(len(symbols)), held]), axis=0)
+
+
+def apply_stop_loss(schedule: np.ndarray, growth: np.ndarray, stop_loss_pct: float,
+                    stop_mask: np.ndarray) -> np.ndarray:
+    """
+    Per-path sales: the schedule, plus everything still held in the first
+    month a stop-loss holding closes stop_loss_pct below today's price.
+    """
+    horizon = schedule.shape[0] - 1
+    hit = (growth <= 1 - stop_loss_pct / 100) & stop_mask
+    first = np.where(hit.any(axis=1), hit.argmax(axis=1), horizon + 1)[:, None, :]
+    held_before = 1 - np.vstack([np.zeros((1, schedule.shape[1])), np.cumsum(schedule, axis=0)[:-1]])
+    month = np.arange(horizon + 1)[None, :, None]
+    return np.where(month < first, schedule, 0.0) + np.where(month == first, held_before, 0.0)
+
+
+def plan_values(growth: np.ndarray, current_value: np.ndarray, sells: np.ndarray,
+                cost_frac: np.ndarray, cash_return: float = 0.0) -> np.ndarray:
+    """Portfolio value (holdings + cash from sales) per path and month"""
+    if sells.ndim == 2:
+        sells = np.broadcast_to(sells, growth.shape)
+    market = growth * current_value
+    held = 1 - np.cumsum(sells, axis=1)
+    holdings_value = np.einsum('pta,pta->pt', held, market)
+    proceeds = np.einsum('pta,pta->pt', sells, market * (1 - cost_frac))
+
+    # Cash compounds monthly at cash_return (annual) from the month of each sale
+    monthly = (1 + cash_return) ** (1 / 12)
+    discount = monthly ** np.arange(growth.shape[1])
+    cash = np.cumsum(proceeds / discount, axis=1) * discount
+    return holdings_value + cash
+
+
+def months_to_breakeven(values: np.ndarray, target: float) -> np.ndarray:
+    """First month each path reaches target (inf if it never does)"""
+    reached = values >= target
+    return np.where(reached.any(axis=1), reached.argmax(axis=1), np.inf)
+
+
+def default_exit_plans(positions: pd.DataFrame, stop_loss_pct: float = 15.0,
+                       max_weight_pct: float = 10.0) -> dict:
+    """
+    The exit plans from portfolio_analysis.py / sector_analysis.py, defined
+    from the engine's loss buckets instead of fixed symbol lists:
+
+    - hold: no sales
+    - exit_worst_3: sell the three worst performers now
+    - partial_exit_severe: sell half of every severe-loss holding now
+    - phased: severe losses now; 70% of high losses and trimming
+      concentrated holdings to max_weight_pct next month; stop-loss on the rest
+    """
+    worst_3 = positions.nsmallest(3, 'Unrealized_PL_Pct')['Symbol']
+    severe = positions.loc[positions['Loss_Bucket'] == 'Severe', 'Symbol']
+    high = positions.loc[positions['Loss_Bucket'] == 'High', 'Symbol']
+    concentrated = positions[positions['Concentrated']]
+    trims = dict(zip(concentrated['Symbol'], 1 - max_weight_pct / concentrated['Position_Size_Pct']))
+
+    phase_2 = {symbol: 0.7 for symbol in high}
+    phase_2.update(trims)
+    sold = set(severe) | set(high)
+    return {
+        'hold': {'sells': []},
+        'exit_worst_3': {'sells': [(0, {symbol: 1.0 for symbol in worst_3})]},
+        'partial_exit_severe': {'sells': [(0, {symbol: 0.5 for symbol in severe})]},
+        'phased': {
+            'sells': [(0, {symbol: 1.0 for symbol in severe}), (1, phase_2)],
+            'stop_loss_pct': stop_loss_pct,
+            'stop_symbols': [s for s in positions['Symbol'] if s not in sold],
+        },
+    }
+
+
+def simulate_recovery(positions: pd.DataFrame, model: dict, plans: dict = None,
+                      n_paths: int = 20000, horizon: int = DEFAULT_HORIZON_MONTHS,
+                      report_months: tuple = REPORT_MONTHS, cash_return: float = 0.0,
+                      chunk_size: int = 5000, seed: int = None) -> dict:
+    """
+    Value every exit plan on the same correlated return paths.
+
+    Args:
+        positions: portfolio_engine.compute_positions() output
+        model: estimate_return_model() / assumed_return_model() output
+        plans: {name: plan} (default: default_exit_plans)
+        cash_return: annual return earned on sale proceeds
+
+    Returns:
+        Dictionary with per-plan 'values' (paths x report months),
+        'breakeven' (months per path), the 'summary' table and the inputs
+    """
+    plans = plans or default_exit_plans(positions)
+    symbols = model['symbols']
+    positions = positions.set_index('Symbol').reindex(symbols)
+    current_value = positions['Current_Value'].to_numpy(dtype=np.float64)
+    target = float(positions['Investment_Value'].sum())
+    cost_frac = sell_costs(current_value, positions['Quantity'].to_numpy())['total'] / current_value
+    report_months = [m for m in report_months if m <= horizon]
+
+    schedules = {name: plan_schedule(plan, symbols, horizon) for name, plan in plans.items()}
+    stop_masks = {name: np.isin(symbols, plan.get('stop_symbols', symbols))
+                  for name, plan in plans.items()}
+    values = {name: [] for name in plans}
+    breakeven = {name: [] for name in plans}
+
+    rng = np.random.default_rng(seed)
+    for start in range(0, n_paths, chunk_size):
+        growth = simulate_growth(model, min(chunk_size, n_paths - start), horizon, rng)
+        for name, plan in plans.items():
+            sells = schedules[name]
+            if plan.get('stop_loss_pct'):
+                sells = apply_stop_loss(sells, growth, plan['stop_loss_pct'], stop_masks[name])
+            path_values = plan_values(growth, current_value, sells, cost_frac, cash_return)
+            values[name].append(path_values[:, report_months])
+            breakeven[name].append(months_to_breakeven(path_values, target))
+
+    values = {name: np.vstack(chunks) for name, chunks in values.items()}
+    breakeven = {name: np.concatenate(chunks) for name, chunks in breakeven.items()}
+    return {
+        'values': values,
+        'breakeven': breakeven,
+        'summary': recovery_summary(values, breakeven, report_months, target, horizon),
+        'report_months': report_months,
+        'target': target,
+        'current_value': float(current_value.sum()),
+        'n_paths': n_paths,
+        'horizon': horizon,
+    }
+
+
+def recovery_summary(values: dict, breakeven: dict, report_months: list, target: float,
+                     horizon: int, percentiles: tuple = DEFAULT_PERCENTILES) -> pd.DataFrame:
+    """One row per plan: value percentiles at each report month and breakeven odds"""
+    rows = []
+    for name in values:
+        row = {'plan': name}
+        for i, month in enumerate(report_months):
+            for p, v in zip(percentiles, np.percentile(values[name][:, i], percentiles)):
+                row[f'value_{month}m_p{p}'] = v
+            row[f'breakeven_by_{month}m_pct'] = float((breakeven[name] <= month).mean() * 100)
+        # Censored at the horizon, so use an order statistic instead of interpolating
+        median = np.quantile(breakeven[name], 0.5, method='inverted_cdf')
+        row['median_months_to_breakeven'] = float(median) if np.isfinite(median) else np.nan
+        row['breakeven_by_horizon_pct'] = float(np.isfinite(breakeven[name]).mean() * 100)
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def display_recovery(sim: dict):
+    """Print the median / 5th / 95th percentile values and breakeven odds per plan"""
+    print(f"MONTE CARLO RECOVERY ({sim['n_paths']:,} paths, {sim['horizon']} months)")
+    print(f"Current value ₹{sim['current_value']:,.0f} - breakeven at ₹{sim['target']:,.0f} invested")
+    for _, row in sim['summary'].iterrows():
+        print(f"\n{row['plan']}:")
+        for month in sim['report_months']:
+            print(f"   {month:>2} months: median ₹{row[f'value_{month}m_p50']:,.0f} "
+                  f"(5%: ₹{row[f'value_{month}m_p5']:,.0f}, 95%: ₹{row[f'value_{month}m_p95']:,.0f}) - "
+                  f"breakeven odds {row[f'breakeven_by_{month}m_pct']:.1f}%")
+        median = row['median_months_to_breakeven']
+        median_text = f"{median:.0f} months" if np.isfinite(median) else f"beyond {sim['horizon']} months"
+        print(f"   Median time to breakeven: {median_text}")
+
+
+def load_return_model(symbols: list) -> dict:
+    """Model from the local price cache, or the assumed model when there is no cache"""
+    from price_matrix import load_price_cache, forward_filled
+    try:
+        matrices = load_price_cache(symbols)
+    except FileNotFoundError:
+        return assumed_return_model(symbols)
+    if not matrices['symbols']:
+        return assumed_return_model(symbols)
+    return estimate_return_model(forward_filled(matrices['close']), matrices['symbols'], symbols)
+
+
+def describe_return_model(model: dict) -> str:
+    """One line saying how much of the model is estimated and how much is assumed"""
+    estimated = int(model['estimated'].sum())
+    if estimated == 0:
+        return (f"No cached price history - assumed model for all {len(model['symbols'])} holdings "
+                f"({ASSUMED_ANNUAL_RETURN:.0%} return, {ASSUMED_ANNUAL_VOL:.0%} volatility, "
+                f"{ASSUMED_CORRELATION:.1f} correlation). Run price_matrix.py to estimate it.")
+    return (f"Return history for {estimated} of {len(model['symbols'])} holdings "
+            f"(assumed {ASSUMED_ANNUAL_VOL:.0%} volatility for the rest)")
+
+
+def main():
+    """Simulate the default exit plans for holdings.csv"""
+    import time
+    from portfolio_engine import analyze_portfolio
+
+    print(f"Recovery Simulator - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+    positions = analyze_portfolio()['positions']
+    model = load_return_model(positions['Symbol'].tolist())
+    print(describe_return_model(model))
+
+    start = time.perf_counter()
+    sim = simulate_recovery(positions, model, n_paths=20000, seed=42)
+    print(f"Simulated in {time.perf_counter() - start:.2f}s")
+    print()
+    display_recovery(sim)
+
+
+if __name__ == "__main__":
+    main()
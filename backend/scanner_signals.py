@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+"""
+Scanner Signals - optimized_rsi_scanner Rules as Reusable Signal Matrices
+=========================================================================
+
+The entry rules of optimized_rsi_scanner.analyze_single_stock and the tiers of
+generate_trading_recommendations, computed for every date and symbol at once:
+
+- entry:       RSI 40-55, volume > 1.1x its 20-day average, positive momentum,
+               close above both the 50 DMA and the 220 DMA
+- buy:         entry with momentum score >= 5 and volume > 1.2x
+- strong_buy:  buy with momentum score >= 6
+
+The live scanner reads the last row of these matrices for one symbol; the
+universe backtest feeds the whole matrices to portfolio_backtest with a
+configurable exit (RSI target, holding period, stop-loss, take-profit).
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+from price_matrix import rolling_mean, ewm_mean
+
+TIERS = ['entry', 'buy', 'strong_buy']
+RSI_TARGET = 70
+
+
+def rsi_matrix(close: np.ndarray, period: int = 14) -> np.ndarray:
+    """Column-wise RSI with the scanner's rolling-mean smoothing"""
+    delta = pd.DataFrame(close).diff()
+    gain = delta.where(delta > 0, 0).rolling(window=period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
+    return (100 - 100 / (1 + gain / loss)).to_numpy()
+
+
+def pct_change(close: np.ndarray, periods: int) -> np.ndarray:
+    """Percent change over `periods` rows, NaN where there is no history"""
+    change = np.full_like(close, np.nan)
+    change[periods:] = (close[periods:] - close[:-periods]) / close[:-periods] * 100
+    return change
+
+
+def scanner_indicators(close: np.ndarray, volume: np.ndarray) -> dict:
+    """Every indicator the scanner looks at, as dates x symbols matrices"""
+    close = np.asarray(close, dtype=np.float64)
+    volume = np.asarray(volume, dtype=np.float64)
+    macd = ewm_mean(close, 12) - ewm_mean(close, 26)
+    return {
+        'close': close,
+        'rsi': rsi_matrix(close),
+        'volume_ratio': volume / rolling_mean(volume, 20),
+        'price_change_5d': pct_change(close, 5),
+        'price_change_10d': pct_change(close, 10),
+        'macd': macd,
+        'macd_signal': ewm_mean(macd, 9),
+        'sma_10': rolling_mean(close, 10),
+        'sma_20': rolling_mean(close, 20),
+        'sma_50': rolling_mean(close, 50),
+        'sma_220': rolling_mean(close, 220),
+    }
+
+
+def momentum_scores(ind: dict) -> np.ndarray:
+    """The scanner's 0-8 momentum score (NaN comparisons count as not met)"""
+    close = ind['close']
+    with np.errstate(invalid='ignore'):
+        return ((ind['volume_ratio'] > 1.3).astype(np.int8)
+                + (ind['price_change_5d'] > 1)
+                + (ind['macd'] > ind['macd_signal'])
+                + (close > ind['sma_10'])
+                + (close > ind['sma_20'])
+                + (close > ind['sma_50'])
+                + (close > ind['sma_220'])
+                + (ind['price_change_10d'] > 0))
+
+
+def entry_signals(ind: dict) -> np.ndarray:
+    """analyze_single_stock's entry condition for every date and symbol"""
+    close = ind['close']
+    rsi, volume_ratio = ind['rsi'], ind['volume_ratio']
+    with np.errstate(invalid='ignore'):
+        rsi_in_range = (rsi >= 40) & (rsi <= 55)
+        volume_good = volume_ratio > 1.1
+        dma_criteria = (close > ind['sma_50']) & (close > ind['sma_220'])
+        momentum_positive = ((ind['price_change_5d'] > -2)
+                             | (ind['macd'] > ind['macd_signal'])
+                             | (close > ind['sma_10']))
+    return rsi_in_range & volume_good & momentum_positive & dma_criteria
+
+
+def tier_signals(ind: dict, tier: str = 'entry', scores: np.ndarray = None) -> np.ndarray:
+    """Entry matrix for one recommendation tier (see TIERS)"""
+    if tier not in TIERS:
+        raise ValueError(f"tier must be one of {TIERS}")
+    signals = entry_signals(ind)
+    if tier == 'entry':
+        return signals
+    scores = momentum_scores(ind) if scores is None else scores
+    with np.errstate(invalid='ignore'):
+        signals &= (scores >= 5) & (ind['volume_ratio'] > 1.2)
+    if tier == 'strong_buy':
+        signals &= scores >= 6
+    return signals
+
+
+def recommendation(momentum_score: int, volume_ratio: float) -> str:
+    """generate_trading_recommendations' label for one scanner hit"""
+    if momentum_score >= 5 and volume_ratio > 1.2:
+        return "STRONG BUY" if momentum_score >= 6 else "BUY"
+    return "WATCH"
+
+
+def scanner_rank_scores(matrices: dict, ind: dict = None) -> np.ndarray:
+    """
+    Momentum score (0-8) for every date and symbol, with lower RSI breaking
+    ties like the scanner's sort order.
+    """
+    ind = scanner_indicators(matrices['close'], matrices['volume']) if ind is None else ind
+    return momentum_scores(ind) - np.nan_to_num(ind['rsi'], nan=100.0) / 1000
+
+
+def rsi_target_exits(ind: dict, rsi_target: float = RSI_TARGET) -> np.ndarray:
+    """Exit once RSI reaches the scanner's target"""
+    with np.errstate(invalid='ignore'):
+        return ind['rsi'] >= rsi_target
+
+
+def signal_hit_rates(close: np.ndarray, entries: np.ndarray, horizons: tuple = (5, 10, 20)) -> pd.DataFrame:
+    """
+    Forward close-to-close return after every signal, summarized per horizon.
+
+    A hit is a signal whose close `horizon` bars later is above the signal close.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    rows, cols = np.nonzero(entries)
+    summary = []
+    for horizon in horizons:
+        valid = rows + horizon < close.shape[0]
+        r, c = rows[valid], cols[valid]
+        forward = close[r + horizon, c] / close[r, c] - 1
+        forward = forward[np.isfinite(forward)] * 100
+        summary.append({
+            'horizon': horizon,
+            'signals': len(forward),
+            'hit_rate_pct': (forward > 0).mean() * 100 if len(forward) else np.nan,
+            'avg_return_pct': forward.mean() if len(forward) else np.nan,
+            'median_return_pct': np.median(forward) if len(forward) else np.nan,
+        })
+    return pd.DataFrame(summary)
+
+
+def run_scanner_backtest(matrices: dict, tier: str = 'entry', rsi_target: float = RSI_TARGET,
+                         max_hold_bars: int = 20, stop_loss_pct: float = None,
+                         take_profit_pct: float = None, **kwargs) -> dict:
+    """
+    Universe backtest of the scanner's entries with a shared cash pool.
+
+    Entries are the chosen tier, ranked by momentum score (lower RSI first on
+    ties). A position is closed at the next open after the first of: RSI
+    reaching rsi_target (None to disable), max_hold_bars, stop-loss or
+    take-profit. Remaining kwargs go to portfolio_backtest.run_portfolio_backtest.
+    """
+    from portfolio_backtest import run_portfolio_backtest
+
+    ind = scanner_indicators(matrices['close'], matrices['volume'])
+    scores = momentum_scores(ind)
+    entries = tier_signals(ind, tier, scores)
+    exits = rsi_target_exits(ind, rsi_target) if rsi_target is not None else None
+    result = run_portfolio_backtest(
+        matrices, entries, exits, scores=scores - np.nan_to_num(ind['rsi'], nan=100.0) / 1000,
+        max_hold_bars=max_hold_bars, stop_loss_pct=stop_loss_pct,
+        take_profit_pct=take_profit_pct, **kwargs)
+    result['tier'] = tier
+    result['signals'] = int(entries.sum())
+    return result
+
+
+def main():
+    """Hit rates and universe backtests for each scanner tier on the cached NIFTY 500 history"""
+    import time
+    from price_matrix import load_price_cache
+
+    print(f"Scanner Signal Backtest - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+
+    try:
+        matrices = load_price_cache()
+    except FileNotFoundError as e:
+        print(f"{e}. Run price_matrix.py first to build the cache.")
+        return
+
+    print(f"Universe: {len(matrices['symbols'])} symbols x {len(matrices['dates'])} dates")
+    ind = scanner_indicators(matrices['close'], matrices['volume'])
+    scores = momentum_scores(ind)
+
+    for tier in TIERS:
+        print(f"\n{tier.upper().replace('_', ' ')} SIGNALS - forward returns")
+        print("-" * 60)
+        hits = signal_hit_rates(matrices['close'], tier_signals(ind, tier, scores))
+        print(hits.to_string(index=False, float_format='%.2f'))
+
+    print(f"\n{'Tier':<12} {'Signals':>8} {'Trades':>7} {'Win %':>7} {'Final Value':>14} {'Max DD %':>9}")
+    print("-" * 62)
+    for tier in TIERS:
+        start = time.perf_counter()
+        result = run_scanner_backtest(matrices, tier, max_hold_bars=20, stop_loss_pct=8)
+        ta = result['stats']['ta']
+        closed = ta['total']['closed']
+        win_rate = ta['won']['total'] / closed * 100 if closed else 0.0
+        print(f"{tier:<12} {result['signals']:>8} {closed:>7} {win_rate:>7.1f} "
+              f"{result['final_value']:>14,.2f} {result['stats']['dd']['max']['drawdown']:>9.2f}"
+              f"  ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,21 +1,13 @@
 import pandas as pd
 
-# Sector classification for the portfolio stocks
-sector_mapping = {
-    'CDSL': 'Financial Services',
-    'CHENNPETRO': 'Oil & Gas',
-    'COCHINSHIP': 'Capital Goods',
-    'ENGINERSIN': 'Capital Goods',
-    'FACT': 'Chemicals',
-    'GSFC': 'Chemicals',
-    'KALYANKJIL': 'Consumer Discretionary',
-    'MOIL': 'Metals & Mining',
-    'NETWEB': 'Technology',
-    'NOVAAGRI': 'Agriculture',
-    'PROTEAN': 'Technology/Services',
-    'RITES': 'Capital Goods',
-    'SCILAL': 'Pharmaceuticals'
-}
+from portfolio_engine import analyze_portfolio, load_holdings
+from transaction_costs import sell_costs
+from exposure_cube import ExposureCube
+from stop_monitor import StopMonitor
+from price_matrix import load_price_cache
+from sector_attribution import sector_attribution, display_attribution
+from recovery_simulator import (simulate_recovery, default_exit_plans, load_return_model,
+                                describe_return_model, display_recovery)
 
 # Business analysis for each stock
 business_analysis = {
@@ -104,34 +96,29 @@ print("SECTOR-WISE ANALYSIS & RECOVERY STRATEGY")
 print("=" * 80)
 print()
 
-# Calculate sector exposure
-portfolio_data = {
-    'Symbol': ['CDSL', 'CHENNPETRO', 'COCHINSHIP', 'ENGINERSIN', 'FACT', 'GSFC',
-               'KALYANKJIL', 'MOIL', 'NETWEB', 'NOVAAGRI', 'PROTEAN', 'RITES', 'SCILAL'],
-    'Investment_Value': [497947, 377513.76, 102580, 24849, 986957.4, 105600, 98884.8, 530500, 407370.6, 101812.04, 23980, 100584, 311100],
-    'Current_Value': [410351.1, 257571.6, 71249.4, 17449.2, 745001.4, 66604.8, 62426.7, 340400, 382941, 40684.82, 7819.9, 59835.6, 139320],
-    'Loss_Pct': [-17.59, -31.77, -30.54, -29.78, -24.52, -36.93, -36.87, -35.83, -6.00, -60.04, -67.39, -40.51, -55.22]
-}
-
-df = pd.DataFrame(portfolio_data)
-df['Sector'] = df['Symbol'].map(sector_mapping)
+# Calculate sector exposure (holdings.csv carries each stock's sector)
+analysis = analyze_portfolio(load_holdings())
+df = analysis['positions']
 df['Loss_Amount'] = df['Investment_Value'] - df['Current_Value']
 
 # Sector-wise aggregation
-sector_analysis = df.groupby('Sector').agg({
-    'Investment_Value': 'sum',
-    'Current_Value': 'sum',
-    'Loss_Amount': 'sum',
-    'Symbol': 'count'
-}).reset_index()
-sector_analysis.columns = ['Sector', 'Investment', 'Current_Value', 'Loss_Amount', 'Stocks_Count']
-sector_analysis['Loss_Pct'] = (sector_analysis['Loss_Amount'] / sector_analysis['Investment']) * 100
-sector_analysis['Portfolio_Weight'] = (sector_analysis['Investment'] / sector_analysis['Investment'].sum()) * 100
+sector_analysis = analysis['sectors'].sort_values('Sector').reset_index(drop=True)
+sector_analysis = sector_analysis.rename(columns={'Stock_Count': 'Stocks_Count'})
 
 print("SECTOR EXPOSURE & PERFORMANCE:")
 print(sector_analysis[['Sector', 'Stocks_Count', 'Portfolio_Weight', 'Loss_Pct', 'Loss_Amount']].to_string(index=False, float_format='%.2f'))
 print()
 
+# Wrong sectors or wrong stocks: Brinson attribution over the last 12 months of cached prices
+try:
+    price_data = load_price_cache()
+    period_end = price_data['dates'][-1]
+    print(f"SECTOR ATTRIBUTION vs BENCHMARK ({(period_end - pd.DateOffset(years=1)).date()} to {period_end.date()}):")
+    display_attribution(sector_attribution(df, price_data, period_end - pd.DateOffset(years=1), period_end))
+except FileNotFoundError as e:
+    print(f"Sector attribution skipped: {e}")
+print()
+
 # Identify problematic sectors
 print("SECTOR-WISE CONCERNS:")
 print()
@@ -154,6 +141,7 @@ print("=" * 80)
 print()
 
 # Phase-wise exit plan
+total_investment_all = df['Investment_Value'].sum()
 print("PHASE 1 - IMMEDIATE EXITS (This Week):")
 immediate_exits = ['PROTEAN', 'NOVAAGRI', 'SCILAL']
 immediate_exit_data = df[df['Symbol'].isin(immediate_exits)]
@@ -162,6 +150,9 @@ total_immediate_recovery = immediate_exit_data['Current_Value'].sum()
 
 print(f"Exit {len(immediate_exits)} stocks with combined loss of ₹{total_immediate_loss:,.0f}")
 print(f"Recover ₹{total_immediate_recovery:,.0f} in cash")
+immediate_exit_costs = sell_costs(immediate_exit_data['Current_Value'].to_numpy())
+print(f"Exit costs (STT, charges, slippage): ₹{immediate_exit_costs['total'].sum():,.0f} - "
+      f"net cash ₹{immediate_exit_costs['net_proceeds'].sum():,.0f}")
 for stock in immediate_exits:
     analysis = business_analysis[stock]
     print(f"• {stock}: {analysis['action']} - {analysis['recovery_potential']}")
@@ -170,21 +161,30 @@ print()
 print("PHASE 2 - PARTIAL EXITS (Next Month):")
 partial_exits = ['GSFC', 'MOIL', 'FACT']  # FACT to reduce position size
 print("Reduce exposure by 50-70% in these positions:")
+partial_exit_value = 0
 for stock in partial_exits:
     analysis = business_analysis[stock]
     stock_data = df[df['Symbol'] == stock].iloc[0]
     if stock == 'FACT':
+        # Sell enough to bring the position from ~27% down to 10% of invested capital
+        partial_exit_value += stock_data['Current_Value'] * (1 - 10 / stock_data['Investment_Value'] * total_investment_all / 100)
         print(f"• {stock}: Reduce from 27% to 10% portfolio weight - Overconcentration risk")
     else:
+        partial_exit_value += stock_data['Current_Value'] * 0.7
         print(f"• {stock}: Exit 70% - {analysis['concern']}")
+partial_exit_costs = sell_costs(partial_exit_value)
+print(f"Sale value ₹{partial_exit_value:,.0f}, exit costs ₹{partial_exit_costs['total']:,.0f}")
 print()
 
 print("PHASE 3 - MONITOR & DECIDE (3-6 months):")
 monitor_stocks = ['RITES', 'KALYANKJIL', 'COCHINSHIP', 'CHENNPETRO', 'ENGINERSIN']
 print("Set stop-loss at additional 15% decline:")
+stops = StopMonitor.from_positions(df[df['Symbol'].isin(monitor_stocks)], stop_pct=15, target=None)
 for stock in monitor_stocks:
     analysis = business_analysis[stock]
-    print(f"• {stock}: {analysis['recovery_potential']} - Monitor quarterly results")
+    stop_level = stops.levels_for(stock)['STOP']
+    stop_text = f" (stop ₹{stop_level[0]:,.2f})" if len(stop_level) else ""
+    print(f"• {stock}: {analysis['recovery_potential']} - Monitor quarterly results{stop_text}")
 print()
 
 print("PHASE 4 - HOLD & BUILD (Long-term):")
@@ -209,15 +209,24 @@ phase1_recovery = immediate_exit_data['Current_Value'].sum()
 remaining_after_phase1 = total_current - phase1_recovery
 
 print("SCENARIO 1 - Follow Phased Exit Plan:")
-print(f"Phase 1 cash recovery: ₹{phase1_recovery:,.0f}")
+print(f"Phase 1 cash recovery: ₹{phase1_recovery:,.0f} (₹{immediate_exit_costs['net_proceeds'].sum():,.0f} after exit costs)")
 print(f"Remaining portfolio value: ₹{remaining_after_phase1:,.0f}")
 print(f"If remaining portfolio recovers 30% over 12 months:")
 print(f"Total portfolio value: ₹{phase1_recovery + (remaining_after_phase1 * 1.3):,.0f}")
 print(f"Recovery from current: {((phase1_recovery + (remaining_after_phase1 * 1.3) - total_current)/total_current)*100:.1f}%")
 print()
 
+# Phased plan vs holding on simulated correlated returns instead of a fixed 30% recovery
+exit_plans = default_exit_plans(df)
+return_model = load_return_model(df['Symbol'].tolist())
+print(describe_return_model(return_model))
+recovery = simulate_recovery(df, return_model,
+                             {name: exit_plans[name] for name in ['hold', 'phased']}, n_paths=10000, seed=42)
+display_recovery(recovery)
+print()
+
 # Tax loss harvesting calculation
-ltcg_losses = df[df['Symbol'].isin(['PROTEAN', 'NOVAAGRI', 'SCILAL', 'GSFC', 'MOIL'])]['Loss_Amount'].sum()
+ltcg_losses = ExposureCube(df).totals({'Capital_Gain_Type': 'LTCG'})['Gross_Loss']
 print("TAX LOSS HARVESTING BENEFIT:")
 print(f"LTCG losses available for offset: ₹{ltcg_losses:,.0f}")
 print(f"Tax savings on future LTCG (10%): ₹{ltcg_losses * 0.10:,.0f}")
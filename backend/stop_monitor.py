@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""
+Stop-Loss and Target Monitor - Triggered Levels per Price Update
+================================================================
+
+Checks the rules the reports only print ("exit if additional 10% loss",
+"set 15% additional stop-loss on remaining positions") against every price
+update, for every position in every account:
+
+- each position gets a stop level below the price it was armed at and a
+  target level (breakeven by default) above it
+- levels live in two arrays sorted by (symbol, level), with per-symbol
+  offsets into them; the armed stops of a symbol are a prefix of its slice
+  and the armed targets a suffix
+- a price update is one binary search per kind in that symbol's slice:
+  stops at or above the price and targets at or below it are exactly the
+  levels between the search result and the armed boundary, so finding them
+  is O(log n) plus the number triggered, and they are disarmed by moving the
+  boundary
+
+Alerts are returned (and passed to an optional callback) as dicts. replay()
+feeds the monitor from the local price cache for testing.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import threading
+import warnings
+warnings.filterwarnings('ignore')
+
+DEFAULT_STOP_PCT = 10.0    # "exit if additional 10% loss" (portfolio_analysis.py)
+DEFAULT_TARGET = 'breakeven'
+DEFAULT_ACCOUNT = 'default'
+KINDS = ['STOP', 'TARGET']
+
+
+def position_levels(positions: pd.DataFrame, stop_pct: float = DEFAULT_STOP_PCT,
+                    target=DEFAULT_TARGET) -> pd.DataFrame:
+    """
+    Stop and target rows for portfolio_engine-style positions.
+
+    Args:
+        positions: Symbol, Quantity, Avg_Cost, Current_Price (and Account)
+        stop_pct: stop this far (%) below the current price
+        target: 'breakeven' (Avg_Cost), a % above the current price, or None;
+                positions already at or above breakeven get no breakeven target
+
+    Returns:
+        DataFrame with account, symbol, kind, level, quantity, armed_price
+    """
+    account = positions['Account'].astype(str).to_numpy() if 'Account' in positions.columns \
+        else np.full(len(positions), DEFAULT_ACCOUNT, dtype=object)
+    symbol = positions['Symbol'].astype(str).str.upper().to_numpy()
+    qty = positions['Quantity'].to_numpy(dtype=np.float64)
+    price = positions['Current_Price'].to_numpy(dtype=np.float64)
+    frames = [pd.DataFrame({'account': account, 'symbol': symbol, 'kind': 'STOP',
+                            'level': price * (1 - stop_pct / 100), 'quantity': qty, 'armed_price': price})]
+    if target is not None:
+        level = positions['Avg_Cost'].to_numpy(dtype=np.float64) if target == 'breakeven' \
+            else price * (1 + float(target) / 100)
+        above = level > price
+        frames.append(pd.DataFrame({'account': account[above], 'symbol': symbol[above], 'kind': 'TARGET',
+                                    'level': level[above], 'quantity': qty[above], 'armed_price': price[above]}))
+    return pd.concat(frames, ignore_index=True)
+
+
+class StopMonitor:
+    """Stop and target levels for many positions, checked per price update"""
+
+    def __init__(self, levels: pd.DataFrame, on_alert=None):
+        """levels: position_levels() output (kind STOP triggers at or below, TARGET at or above)"""
+        self._lock = threading.Lock()
+        self.on_alert = on_alert
+        levels = levels.copy()
+        levels['symbol'] = levels['symbol'].astype(str).str.upper()
+        codes, symbols = pd.factorize(levels['symbol'], sort=True)
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        n = len(self.symbols)
+
+        self.books = {}
+        for kind in KINDS:
+            mask = (levels['kind'] == kind).to_numpy()
+            code = codes[mask]
+            level = levels.loc[mask, 'level'].to_numpy(dtype=np.float64)
+            order = np.lexsort((level, code))
+            offsets = np.zeros(n + 1, dtype=np.int64)
+            np.cumsum(np.bincount(code, minlength=n), out=offsets[1:])
+            rows = levels[mask].iloc[order]
+            self.books[kind] = {
+                'level': level[order],
+                'account': rows['account'].to_numpy(dtype=object),
+                'quantity': rows['quantity'].to_numpy(dtype=np.float64),
+                'offsets': offsets,
+                # Armed stops are [start, boundary), armed targets [boundary, end)
+                'boundary': offsets[1:].copy() if kind == 'STOP' else offsets[:-1].copy(),
+            }
+        self.updates = 0
+        self.alerts = 0
+
+    @classmethod
+    def from_positions(cls, positions: pd.DataFrame, stop_pct: float = DEFAULT_STOP_PCT,
+                       target=DEFAULT_TARGET, on_alert=None) -> 'StopMonitor':
+        return cls(position_levels(positions, stop_pct, target), on_alert)
+
+    def armed(self) -> dict:
+        """Number of levels still armed per kind"""
+        stops, targets = self.books['STOP'], self.books['TARGET']
+        return {
+            'STOP': int((stops['boundary'] - stops['offsets'][:-1]).sum()),
+            'TARGET': int((targets['offsets'][1:] - targets['boundary']).sum()),
+        }
+
+    def levels_for(self, symbol: str) -> dict:
+        """Armed stop and target levels of one symbol"""
+        i = self.index.get(str(symbol).upper())
+        if i is None:
+            return {'STOP': np.zeros(0), 'TARGET': np.zeros(0)}
+        stops, targets = self.books['STOP'], self.books['TARGET']
+        return {
+            'STOP': stops['level'][stops['offsets'][i]:stops['boundary'][i]],
+            'TARGET': targets['level'][targets['boundary'][i]:targets['offsets'][i + 1]],
+        }
+
+    def on_price(self, symbol: str, price: float, timestamp=None) -> list:
+        """Disarm and return the levels this price triggers for one symbol"""
+        i = self.index.get(symbol)
+        if i is None:
+            return []
+        timestamp = timestamp or datetime.now()
+        alerts = []
+        with self._lock:
+            stops = self.books['STOP']
+            start, boundary = stops['offsets'][i], stops['boundary'][i]
+            # Armed stops are sorted: those >= price form the tail of the armed prefix
+            cut = start + np.searchsorted(stops['level'][start:boundary], price, side='left')
+            hit = range(cut, boundary)
+            stops['boundary'][i] = cut
+            alerts += [self._alert('STOP', stops, j, symbol, price, timestamp) for j in hit]
+
+            targets = self.books['TARGET']
+            boundary, end = targets['boundary'][i], targets['offsets'][i + 1]
+            # Armed targets <= price form the head of the armed suffix
+            cut = boundary + np.searchsorted(targets['level'][boundary:end], price, side='right')
+            hit = range(boundary, cut)
+            targets['boundary'][i] = cut
+            alerts += [self._alert('TARGET', targets, j, symbol, price, timestamp) for j in hit]
+
+            self.updates += 1
+            self.alerts += len(alerts)
+        if self.on_alert is not None:
+            for alert in alerts:
+                self.on_alert(alert)
+        return alerts
+
+    def on_tick(self, prices: dict, timestamp=None) -> list:
+        """Check a tick {symbol: price}; symbols without levels are ignored"""
+        alerts = []
+        for symbol, price in prices.items():
+            alerts += self.on_price(str(symbol).upper(), float(price), timestamp)
+        return alerts
+
+    @staticmethod
+    def _alert(kind: str, book: dict, j: int, symbol: str, price: float, timestamp) -> dict:
+        return {
+            'timestamp': timestamp,
+            'account': book['account'][j],
+            'symbol': symbol,
+            'kind': kind,
+            'level': float(book['level'][j]),
+            'price': float(price),
+            'quantity': float(book['quantity'][j]),
+            'value': float(book['quantity'][j] * price),
+        }
+
+    def replay(self, price_data: dict, start=None) -> pd.DataFrame:
+        """
+        Feed cached daily closes (price_matrix.load_price_cache output) as ticks.
+
+        Returns:
+            All alerts as a DataFrame, in the order they fired
+        """
+        dates = price_data['dates']
+        close = price_data['close']
+        columns = [(col, symbol) for col, symbol in enumerate(price_data['symbols']) if symbol in self.index]
+        first = 0 if start is None else int(np.searchsorted(dates.values, np.datetime64(pd.Timestamp(start))))
+        alerts = []
+        for row in range(first, len(dates)):
+            for col, symbol in columns:
+                price = close[row, col]
+                if not np.isnan(price):
+                    alerts += self.on_price(symbol, price, dates[row])
+        return pd.DataFrame(alerts, columns=['timestamp', 'account', 'symbol', 'kind', 'level',
+                                             'price', 'quantity', 'value'])
+
+
+def main():
+    """Arm holdings.csv, replay the price cache through it, then time a large book"""
+    import time
+    from portfolio_engine import load_holdings
+    from price_matrix import load_price_cache
+
+    print(f"Stop-Loss Monitor - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+    holdings = load_holdings()
+    try:
+        prices = load_price_cache(holdings['Symbol'].tolist())
+        # Arm at the price one year before the end of the cache and replay the year
+        arm_row = max(len(prices['dates']) - 252, 0)
+        armed = holdings.copy()
+        armed['Current_Price'] = armed['Symbol'].map(dict(zip(prices['symbols'], prices['close'][arm_row])))
+        armed = armed.dropna(subset=['Current_Price'])
+        monitor = StopMonitor.from_positions(armed)
+        print(f"Armed {monitor.armed()} levels on {prices['dates'][arm_row].date()}")
+        alerts = monitor.replay(prices, start=prices['dates'][arm_row])
+        print(alerts.to_string(index=False, float_format='%.2f') if len(alerts) else "No levels triggered")
+        print(f"Still armed: {monitor.armed()}")
+    except FileNotFoundError as e:
+        print(f"{e}. Run price_matrix.py first to build the cache.")
+    print()
+
+    # Scale check: 100k accounts x 10 positions over 500 symbols, 100k ticks
+    rng = np.random.default_rng(0)
+    n = 1000000
+    universe = np.array([f"SYM{i:03d}" for i in range(500)])
+    price = rng.uniform(50, 3000, len(universe))
+    held = rng.integers(0, len(universe), n)
+    positions = pd.DataFrame({
+        'Account': rng.integers(0, 100000, n).astype(str),
+        'Symbol': universe[held],
+        'Quantity': rng.integers(1, 500, n).astype(np.float64),
+        'Current_Price': price[held] * rng.uniform(0.8, 1.2, n),
+    })
+    positions['Avg_Cost'] = positions['Current_Price'] * rng.uniform(0.9, 2.0, n)
+    start = time.perf_counter()
+    monitor = StopMonitor.from_positions(positions, stop_pct=15)
+    built = time.perf_counter() - start
+    n_levels = sum(monitor.armed().values())
+    ticks = rng.integers(0, len(universe), 100000)
+    moves = price[ticks] * rng.normal(1, 0.05, len(ticks))
+    start = time.perf_counter()
+    fired = sum(len(monitor.on_price(universe[t], p)) for t, p in zip(ticks, moves))
+    elapsed = time.perf_counter() - start
+    print(f"{n_levels:,} levels built in {built:.2f}s; {len(ticks):,} ticks in {elapsed:.2f}s "
+          f"({elapsed / len(ticks) * 1e6:.1f} µs per tick), {fired:,} alerts")
+
+
+if __name__ == "__main__":
+    main()
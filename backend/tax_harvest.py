@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Tax-Loss Harvesting - Choose Which Lots to Sell Against Realized Gains
+======================================================================
+
+Given open lots from tax_lots.py and the gains already realized this
+financial year, picks the loss-making lots whose sale cuts the most tax:
+
+- realized gains set how much loss is worth booking: taxable STCG (15%) and
+  taxable LTCG above the exemption (10%), per tax_lots.estimate_tax
+- short-term losses offset STCG first and then LTCG; long-term losses offset
+  only LTCG
+- every (lot, bucket) pair is ranked by tax saved per rupee sold, net of
+  exit costs from transaction_costs.sell_costs, and filled greedily under the
+  turnover limit and the remaining STCG / LTCG capacity
+
+Lots can be excluded by symbol or by minimum holding period, and are sold in
+whole shares. The result is re-taxed with estimate_tax, so the reported
+saving follows the same set-off rules as the tax estimate.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+from tax_lots import (DEFAULT_ACCOUNT, LTCG_RATE, STCG_RATE, LTCG_EXEMPTION,
+                      gains_by_bucket, estimate_tax)
+from transaction_costs import sell_costs
+
+
+def realized_ytd(realized: pd.DataFrame, financial_year_label: str = None) -> dict:
+    """Net realized {'STCG': x, 'LTCG': y} for one financial year of tax_lots realized pieces"""
+    buckets = gains_by_bucket(realized, financial_year_label=financial_year_label)
+    net = buckets.groupby('term')['net_realized'].sum()
+    return {'STCG': float(net.get('STCG', 0.0)), 'LTCG': float(net.get('LTCG', 0.0))}
+
+
+def tax_on(stcg: float, ltcg: float, ltcg_rate: float = LTCG_RATE, stcg_rate: float = STCG_RATE,
+           exemption: float = LTCG_EXEMPTION) -> dict:
+    """estimate_tax() for a single account's net STCG / LTCG"""
+    buckets = pd.DataFrame({'account': DEFAULT_ACCOUNT, 'term': ['STCG', 'LTCG'],
+                            'net_realized': [stcg, ltcg]})
+    return estimate_tax(buckets, ltcg_rate, stcg_rate, exemption).iloc[0].to_dict()
+
+
+def harvest_candidates(lots: pd.DataFrame, exclude_symbols=None, min_holding_days: int = 0) -> pd.DataFrame:
+    """Priced, loss-making lots that may be sold (exclude_symbols: a symbol or a list of them)"""
+    eligible = (lots['gain'] < 0) & lots['market_value'].gt(0) & (lots['holding_days'] >= min_holding_days)
+    if isinstance(exclude_symbols, str):
+        exclude_symbols = [exclude_symbols]
+    if exclude_symbols:
+        eligible &= ~lots['symbol'].isin([str(s).upper() for s in exclude_symbols])
+    return lots[eligible].reset_index(drop=True)
+
+
+def harvest_losses(lots: pd.DataFrame, realized: dict, max_turnover: float = None,
+                   exclude_symbols=None, min_holding_days: int = 0, include_costs: bool = True,
+                   ltcg_rate: float = LTCG_RATE, stcg_rate: float = STCG_RATE,
+                   exemption: float = LTCG_EXEMPTION) -> dict:
+    """
+    Select lots to sell so that booked losses save the most tax this year.
+
+    Args:
+        lots: tax_lots.unrealized_gains() output for one account
+        realized: net realized gains so far, {'STCG': x, 'LTCG': y} (see realized_ytd)
+        max_turnover: cap on the market value sold (₹), None for no cap
+        exclude_symbols: symbols that must not be sold
+        min_holding_days: skip lots bought more recently than this
+        include_costs: rank and stop on tax saved net of exit costs
+
+    Returns:
+        Dictionary with 'selected' (one row per lot to sell; offsets_stcg /
+        offsets_ltcg split its booked loss between the gain buckets) and 'summary'
+    """
+    stcg, ltcg = float(realized.get('STCG', 0.0)), float(realized.get('LTCG', 0.0))
+    before = tax_on(stcg, ltcg, ltcg_rate, stcg_rate, exemption)
+    cand = harvest_candidates(lots, exclude_symbols, min_holding_days)
+
+    value = cand['market_value'].to_numpy(dtype=np.float64)
+    loss = -cand['gain'].to_numpy(dtype=np.float64)
+    qty = cand['qty'].to_numpy(dtype=np.float64)
+    short_term = (cand['term'] == 'STCG').to_numpy()
+    loss_per_rupee = loss / value if len(cand) else loss
+    cost_frac = sell_costs(value, qty)['total'] / value if include_costs and len(cand) else np.zeros(len(cand))
+
+    # (lot, bucket) pairs: STCG capacity takes short-term losses only, LTCG capacity takes both
+    lot = np.concatenate([np.flatnonzero(short_term), np.arange(len(cand))])
+    bucket = np.concatenate([np.zeros(short_term.sum(), dtype=np.int64), np.ones(len(cand), dtype=np.int64)])
+    rate = np.array([stcg_rate, ltcg_rate]) / 100
+    score = rate[bucket] * loss_per_rupee[lot] - cost_frac[lot]
+    order = np.argsort(-score, kind='stable')
+    order = order[score[order] > 0]
+
+    capacity = np.array([before['taxable_stcg'], before['taxable_ltcg']], dtype=np.float64)
+    turnover_left = np.inf if max_turnover is None else float(max_turnover)
+    loss_left = loss.copy()
+    booked = np.zeros((len(cand), 2))
+    for i, b in zip(lot[order], bucket[order]):
+        if turnover_left <= 0 or not capacity.any():
+            break
+        take = min(loss_left[i], capacity[b], turnover_left * loss_per_rupee[i])
+        if take <= 0:
+            continue
+        booked[i, b] += take
+        loss_left[i] -= take
+        capacity[b] -= take
+        turnover_left -= take / loss_per_rupee[i]
+
+    # Whole shares, rounded down so the turnover and capacity limits still hold
+    fraction = np.where(loss > 0, booked.sum(axis=1) / np.where(loss > 0, loss, 1.0), 0.0)
+    shares = np.floor(fraction * qty + 1e-9)
+    sell = shares > 0
+    sold_fraction = shares[sell] / qty[sell]
+    selected = cand.loc[sell, ['symbol', 'buy_date', 'term', 'holding_days', 'qty', 'current_price']].copy()
+    selected['sell_qty'] = shares[sell]
+    selected['sell_value'] = value[sell] * sold_fraction
+    selected['loss_booked'] = loss[sell] * sold_fraction
+    selected['exit_costs'] = sell_costs(selected['sell_value'].to_numpy(), shares[sell])['total'] \
+        if sell.any() else np.zeros(0)
+    # Loss set off against each gain bucket, scaled like loss_booked to the whole shares sold
+    split = booked[sell] / np.maximum(booked[sell].sum(axis=1, keepdims=True), 1e-12)
+    selected['offsets_stcg'] = selected['loss_booked'].to_numpy() * split[:, 0]
+    selected['offsets_ltcg'] = selected['loss_booked'].to_numpy() * split[:, 1]
+    selected['offsets'] = np.select([(split[:, 0] > 0) & (split[:, 1] > 0), split[:, 0] > 0],
+                                    ['STCG+LTCG', 'STCG'], 'LTCG')
+    selected = selected.sort_values('loss_booked', ascending=False).reset_index(drop=True)
+
+    st_loss = selected.loc[selected['term'] == 'STCG', 'loss_booked'].sum()
+    lt_loss = selected.loc[selected['term'] == 'LTCG', 'loss_booked'].sum()
+    after = tax_on(stcg - st_loss, ltcg - lt_loss, ltcg_rate, stcg_rate, exemption)
+    tax_saved = before['total_tax'] - after['total_tax']
+    exit_costs = float(selected['exit_costs'].sum())
+    summary = {
+        'realized_stcg': stcg,
+        'realized_ltcg': ltcg,
+        'candidate_lots': int(len(cand)),
+        'lots_sold': int(len(selected)),
+        'turnover': float(selected['sell_value'].sum()),
+        'stcl_booked': float(st_loss),
+        'ltcl_booked': float(lt_loss),
+        'tax_before': float(before['total_tax']),
+        'tax_after': float(after['total_tax']),
+        'tax_saved': float(tax_saved),
+        'exit_costs': exit_costs,
+        'net_benefit': float(tax_saved - exit_costs),
+        'loss_carry_forward': float(after['loss_carry_forward']),
+    }
+    return {'selected': selected, 'summary': summary}
+
+
+def display_harvest(result: dict):
+    summary = result['summary']
+    print(f"Realized this year: STCG ₹{summary['realized_stcg']:,.0f}  LTCG ₹{summary['realized_ltcg']:,.0f}")
+    print(f"Tax before: ₹{summary['tax_before']:,.0f}  after: ₹{summary['tax_after']:,.0f}  "
+          f"saved: ₹{summary['tax_saved']:,.0f}")
+    print(f"Sell {summary['lots_sold']} of {summary['candidate_lots']} loss lots, "
+          f"turnover ₹{summary['turnover']:,.0f}, exit costs ₹{summary['exit_costs']:,.0f}, "
+          f"net benefit ₹{summary['net_benefit']:,.0f}")
+    print()
+    if len(result['selected']):
+        print(result['selected'][['symbol', 'buy_date', 'term', 'sell_qty', 'sell_value', 'loss_booked',
+                                  'exit_costs', 'offsets_stcg', 'offsets_ltcg']].to_string(index=False, float_format='%.2f'))
+
+
+def main():
+    """Harvest against example gains: python tax_harvest.py [stcg_ytd ltcg_ytd max_turnover]"""
+    import sys
+    import time
+    from portfolio_engine import load_holdings
+    from tax_lots import build_tax_lots, transactions_from_holdings, unrealized_gains
+
+    args = [float(a) for a in sys.argv[1:4]]
+    stcg, ltcg = args[:2] if len(args) >= 2 else (200000.0, 300000.0)
+    max_turnover = args[2] if len(args) > 2 else None
+
+    print(f"Tax-Loss Harvesting - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+    holdings = load_holdings()
+    lots = unrealized_gains(build_tax_lots(transactions_from_holdings(holdings))['open_lots'],
+                            holdings.set_index('Symbol')['Current_Price'])
+    display_harvest(harvest_losses(lots, {'STCG': stcg, 'LTCG': ltcg}, max_turnover))
+    print()
+
+    # Scale check: thousands of synthetic lots
+    rng = np.random.default_rng(0)
+    n = 20000
+    cost = rng.uniform(50, 2000, n)
+    synthetic = pd.DataFrame({
+        'symbol': rng.choice(holdings['Symbol'].to_numpy(), n),
+        'buy_date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 700, n), unit='D'),
+        'qty': rng.integers(1, 500, n).astype(np.float64),
+        'current_price': cost * rng.uniform(0.4, 1.3, n),
+        'holding_days': rng.integers(1, 900, n),
+    })
+    synthetic['market_value'] = synthetic['qty'] * synthetic['current_price']
+    synthetic['gain'] = synthetic['market_value'] - synthetic['qty'] * cost
+    synthetic['term'] = np.where(synthetic['holding_days'] > 365, 'LTCG', 'STCG')
+    start = time.perf_counter()
+    result = harvest_losses(synthetic, {'STCG': 5e6, 'LTCG': 2e7}, max_turnover=3e7)
+    print(f"{n:,} lots optimized in {(time.perf_counter() - start) * 1000:.0f} ms: "
+          f"{result['summary']['lots_sold']:,} sold, tax saved ₹{result['summary']['tax_saved']:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
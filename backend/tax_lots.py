@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Tax Lots - FIFO Lot Matching with LTCG/STCG Classification
+==========================================================
+
+Replaces the hand-typed Capital_Gain_Type column and the single Buy_Date per
+symbol with lots built from buy/sell transactions:
+
+- every (account, symbol) gets its own segment of one shared quantity axis;
+  buys and sells become intervals on that axis ordered by date
+- FIFO matching is the overlap of buy and sell intervals, found for all
+  accounts and symbols at once with one sort and two searchsorted calls
+- holding periods are datetime64 differences; lots held more than 365 days
+  are long-term (LTCG), the rest short-term (STCG)
+
+Realized gains come from the matched pieces, unrealized gains from the
+remaining open lots valued at current prices, both summarized per tax bucket.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+LTCG_HOLDING_DAYS = 365
+LTCG_RATE = 10.0          # % on long-term gains above the exemption (as in portfolio_analysis.py)
+STCG_RATE = 15.0          # % on short-term gains
+LTCG_EXEMPTION = 100000.0  # ₹ of long-term gains exempt per financial year
+DEFAULT_ACCOUNT = 'default'
+
+TRANSACTION_COLUMNS = {
+    'account': ['account', 'Account', 'account_id', 'Client'],
+    'symbol': ['symbol', 'Symbol', 'Ticker', 'Stock'],
+    'date': ['date', 'Date', 'Trade Date', 'trade_date', 'Buy_Date'],
+    'side': ['side', 'Side', 'Type', 'Trade Type', 'Action'],
+    'qty': ['qty', 'Qty', 'Quantity', 'quantity', 'Shares'],
+    'price': ['price', 'Price', 'Trade Price', 'Avg_Cost'],
+    'charges': ['charges', 'Charges', 'Fees', 'Brokerage'],
+}
+
+
+def normalize_transactions(transactions: pd.DataFrame) -> pd.DataFrame:
+    """Standard columns, upper-case symbols, BUY/SELL sides, datetime dates"""
+    df = transactions.copy()
+    renames = {}
+    for standard, variations in TRANSACTION_COLUMNS.items():
+        if standard not in df.columns:
+            match = next((col for col in df.columns if col in variations), None)
+            if match is not None:
+                renames[match] = standard
+    df = df.rename(columns=renames)
+    missing = [col for col in ['symbol', 'date', 'side', 'qty', 'price'] if col not in df.columns]
+    if missing:
+        raise ValueError(f"Transactions are missing columns: {missing}")
+
+    if 'account' not in df.columns:
+        df['account'] = DEFAULT_ACCOUNT
+    if 'charges' not in df.columns:
+        df['charges'] = 0.0
+    df['symbol'] = df['symbol'].astype(str).str.strip().str.upper()
+    df['side'] = df['side'].astype(str).str.strip().str.upper().str[0].map({'B': 'BUY', 'S': 'SELL'})
+    if df['side'].isna().any():
+        raise ValueError("side must be BUY or SELL")
+    df['date'] = pd.to_datetime(df['date'])
+    df['qty'] = df['qty'].astype(np.float64).abs()
+    df['price'] = df['price'].astype(np.float64)
+    df['charges'] = df['charges'].fillna(0).astype(np.float64)
+    return df
+
+
+def transactions_from_holdings(holdings: pd.DataFrame, account: str = DEFAULT_ACCOUNT) -> pd.DataFrame:
+    """One BUY per holding (Buy_Date, Quantity, Avg_Cost) - seeds lots from a holdings file"""
+    return pd.DataFrame({
+        'account': account,
+        'symbol': holdings['Symbol'].to_numpy(),
+        'date': pd.to_datetime(holdings['Buy_Date']).to_numpy(),
+        'side': 'BUY',
+        'qty': holdings['Quantity'].to_numpy(dtype=np.float64),
+        'price': holdings['Avg_Cost'].to_numpy(dtype=np.float64),
+    })
+
+
+def _cumsum_by_key(keys: np.ndarray, qty: np.ndarray) -> np.ndarray:
+    """Running total of qty that restarts at every new key (keys sorted)"""
+    total = np.cumsum(qty)
+    new_key = np.ones(len(keys), dtype=bool)
+    new_key[1:] = keys[1:] != keys[:-1]
+    before = np.where(new_key, total - qty, 0.0)
+    return total - np.maximum.accumulate(before) if len(keys) else total
+
+
+def holding_term(buy_dates, end_dates) -> tuple:
+    """Holding days and 'LTCG' / 'STCG' for arrays of dates"""
+    days = (np.asarray(end_dates, dtype='datetime64[D]')
+            - np.asarray(buy_dates, dtype='datetime64[D]')).astype(np.int64)
+    return days, np.where(days > LTCG_HOLDING_DAYS, 'LTCG', 'STCG')
+
+
+def financial_year(dates) -> np.ndarray:
+    """Indian financial year label (April-March), e.g. 'FY2024-25'"""
+    dates = pd.DatetimeIndex(dates)
+    start = pd.Series(dates.year - (dates.month < 4))
+    return ('FY' + start.astype(str) + '-' + ((start + 1) % 100).astype(str).str.zfill(2)).to_numpy()
+
+
+def build_tax_lots(transactions: pd.DataFrame) -> dict:
+    """
+    FIFO-match every sell against earlier buys of the same account and symbol.
+
+    Returns:
+        Dictionary with 'realized' (one row per matched piece), 'open_lots'
+        (remaining quantity of each buy) and 'unmatched_sells' (quantity sold
+        beyond what was bought)
+    """
+    tx = normalize_transactions(transactions)
+    tx = tx[tx['qty'] > 0].copy()
+    tx['key'] = tx.groupby(['account', 'symbol'], sort=True).ngroup().to_numpy()
+    tx = tx.sort_values(['key', 'date'], kind='stable').reset_index(drop=True)
+
+    is_buy = (tx['side'] == 'BUY').to_numpy()
+    row_key = tx['key'].to_numpy()
+    # Shares bought up to and including each row (same-day buys listed first count)
+    bought = _cumsum_by_key(row_key, np.where(is_buy, tx['qty'].to_numpy(), 0.0))
+
+    buys = tx[is_buy].reset_index(drop=True)
+    sells = tx[~is_buy].reset_index(drop=True)
+    b_key, s_key = buys['key'].to_numpy(), sells['key'].to_numpy()
+    b_qty, s_qty = buys['qty'].to_numpy(), sells['qty'].to_numpy()
+
+    # A sell can only consume shares already bought: cumulative filled sells
+    # E_j = min(E_j-1 + s_j, B_j) = S_j + min(0, running min of B_i - S_i)
+    requested = _cumsum_by_key(s_key, s_qty)
+    shortfall = pd.Series(bought[~is_buy] - requested).groupby(s_key).cummin().to_numpy()
+    filled_cum = requested + np.minimum(shortfall, 0.0)
+    new_key = np.ones(len(s_key), dtype=bool)
+    new_key[1:] = s_key[1:] != s_key[:-1]
+    prev_filled = np.where(new_key, 0.0, np.concatenate([[0.0], filled_cum[:-1]]))
+    filled = filled_cum - prev_filled
+    oversold = s_qty - filled
+
+    # Give every key a disjoint range of the quantity axis
+    n_keys = int(tx['key'].max()) + 1 if len(tx) else 0
+    span = np.bincount(b_key, b_qty, n_keys)
+    base = np.cumsum(span) - span
+    b_end = base[b_key] + _cumsum_by_key(b_key, b_qty)
+    s_end = base[s_key] + filled_cum
+    b_start, s_start = b_end - b_qty, s_end - filled
+
+    # Elementary segments between every interval boundary
+    points = np.unique(np.concatenate([b_start, b_end, s_start, s_end]))
+    left, right = points[:-1], points[1:]
+    length = right - left
+    b_idx = np.searchsorted(b_start, left, side='right') - 1
+    s_idx = np.searchsorted(s_start, left, side='right') - 1
+    in_buy = (b_idx >= 0) & (length > 0)
+    in_buy[in_buy] &= left[in_buy] < b_end[b_idx[in_buy]]
+    in_sell = (s_idx >= 0) & (length > 0)
+    in_sell[in_sell] &= left[in_sell] < s_end[s_idx[in_sell]]
+
+    # Matched pieces -> realized gains
+    matched = in_buy & in_sell
+    bi, si, qty = b_idx[matched], s_idx[matched], length[matched]
+    buy_price, sell_price = buys['price'].to_numpy()[bi], sells['price'].to_numpy()[si]
+    buy_charges = buys['charges'].to_numpy()[bi] * qty / b_qty[bi]
+    sell_charges = sells['charges'].to_numpy()[si] * qty / s_qty[si]
+    buy_date, sell_date = buys['date'].to_numpy()[bi], sells['date'].to_numpy()[si]
+    days, term = holding_term(buy_date, sell_date)
+    cost = qty * buy_price + buy_charges
+    proceeds = qty * sell_price - sell_charges
+    realized = pd.DataFrame({
+        'account': buys['account'].to_numpy()[bi],
+        'symbol': buys['symbol'].to_numpy()[bi],
+        'buy_date': buy_date,
+        'sell_date': sell_date,
+        'qty': qty,
+        'buy_price': buy_price,
+        'sell_price': sell_price,
+        'cost': cost,
+        'proceeds': proceeds,
+        'gain': proceeds - cost,
+        'holding_days': days,
+        'term': term,
+        'financial_year': financial_year(sell_date),
+    })
+
+    # Unsold remainder of each buy -> open lots
+    remaining = np.bincount(b_idx[in_buy & ~in_sell], length[in_buy & ~in_sell], len(buys))
+    open_mask = remaining > 1e-9
+    open_lots = pd.DataFrame({
+        'account': buys['account'].to_numpy()[open_mask],
+        'symbol': buys['symbol'].to_numpy()[open_mask],
+        'buy_date': buys['date'].to_numpy()[open_mask],
+        'qty': remaining[open_mask],
+        'buy_price': buys['price'].to_numpy()[open_mask],
+        'cost': remaining[open_mask] * buys['price'].to_numpy()[open_mask]
+                + buys['charges'].to_numpy()[open_mask] * remaining[open_mask] / b_qty[open_mask],
+    })
+
+    short_mask = oversold > 1e-9
+    unmatched = pd.DataFrame({
+        'account': sells['account'].to_numpy()[short_mask],
+        'symbol': sells['symbol'].to_numpy()[short_mask],
+        'sell_date': sells['date'].to_numpy()[short_mask],
+        'qty': oversold[short_mask],
+    })
+    return {'realized': realized, 'open_lots': open_lots, 'unmatched_sells': unmatched}
+
+
+def unrealized_gains(open_lots: pd.DataFrame, prices, as_of=None) -> pd.DataFrame:
+    """Value open lots at current prices and classify them as of `as_of` (default today)"""
+    lots = open_lots.copy()
+    as_of = np.datetime64(pd.Timestamp(as_of or datetime.now().date()).date())
+    price = lots['symbol'].map(pd.Series(prices, dtype=np.float64)).to_numpy()
+    lots['current_price'] = price
+    lots['market_value'] = lots['qty'].to_numpy() * price
+    lots['gain'] = lots['market_value'] - lots['cost']
+    lots['holding_days'], lots['term'] = holding_term(lots['buy_date'].to_numpy(), as_of)
+    # Days left until a short-term lot turns long-term
+    lots['days_to_ltcg'] = np.maximum(LTCG_HOLDING_DAYS + 1 - lots['holding_days'], 0)
+    return lots
+
+
+def gains_by_bucket(realized: pd.DataFrame, unrealized: pd.DataFrame = None,
+                    financial_year_label: str = None) -> pd.DataFrame:
+    """
+    Realized and unrealized gains and losses per account and tax bucket.
+
+    financial_year_label limits realized pieces to one year (e.g. 'FY2025-26').
+    """
+    if financial_year_label is not None:
+        realized = realized[realized['financial_year'] == financial_year_label]
+
+    def split(df, prefix):
+        gain = df['gain'].to_numpy()
+        return pd.DataFrame({
+            'account': df['account'].to_numpy(),
+            'term': df['term'].to_numpy(),
+            f'{prefix}_gain': np.where(gain > 0, gain, 0.0),
+            f'{prefix}_loss': np.where(gain < 0, -gain, 0.0),
+        }).groupby(['account', 'term']).sum()
+
+    parts = [split(realized, 'realized')]
+    if unrealized is not None:
+        parts.append(split(unrealized.dropna(subset=['gain']), 'unrealized'))
+    table = pd.concat(parts, axis=1).fillna(0.0)
+    table['net_realized'] = table['realized_gain'] - table['realized_loss']
+    if unrealized is not None:
+        table['net_unrealized'] = table['unrealized_gain'] - table['unrealized_loss']
+    return table.reset_index()
+
+
+def estimate_tax(buckets: pd.DataFrame, ltcg_rate: float = LTCG_RATE, stcg_rate: float = STCG_RATE,
+                 exemption: float = LTCG_EXEMPTION) -> pd.DataFrame:
+    """
+    Tax on realized gains per account with Indian set-off rules: short-term
+    losses offset short- then long-term gains, long-term losses only
+    long-term gains; the LTCG exemption applies after set-off.
+    """
+    wide = buckets.pivot_table(index='account', columns='term', values='net_realized',
+                               aggfunc='sum', fill_value=0.0).reindex(columns=['STCG', 'LTCG'], fill_value=0.0)
+    st, lt = wide['STCG'].to_numpy(), wide['LTCG'].to_numpy()
+    st_taxable = np.maximum(st, 0.0)
+    # A net short-term loss spills over to long-term gains; a long-term loss cannot offset STCG
+    lt_gain = np.maximum(lt, 0.0)
+    lt_taxable = np.maximum(lt_gain + np.minimum(st, 0.0), 0.0)
+    lt_after_exemption = np.maximum(lt_taxable - exemption, 0.0)
+    carry_forward = np.maximum(-st - lt_gain, 0.0) + np.maximum(-lt, 0.0)
+    return pd.DataFrame({
+        'account': wide.index,
+        'net_stcg': st,
+        'net_ltcg': lt,
+        'taxable_stcg': st_taxable,
+        'taxable_ltcg': lt_after_exemption,
+        'stcg_tax': st_taxable * stcg_rate / 100,
+        'ltcg_tax': lt_after_exemption * ltcg_rate / 100,
+        'total_tax': st_taxable * stcg_rate / 100 + lt_after_exemption * ltcg_rate / 100,
+        'loss_carry_forward': carry_forward,
+    })
+
+
+def lot_holdings(unrealized: pd.DataFrame) -> pd.DataFrame:
+    """Open lots in portfolio_engine's holdings layout (one row per lot)"""
+    return pd.DataFrame({
+        'Account': unrealized['account'].to_numpy(),
+        'Symbol': unrealized['symbol'].to_numpy(),
+        'Buy_Date': unrealized['buy_date'].to_numpy(),
+        'Quantity': unrealized['qty'].to_numpy(),
+        'Avg_Cost': unrealized['buy_price'].to_numpy(),
+        'Current_Price': unrealized['current_price'].to_numpy(),
+        'Capital_Gain_Type': unrealized['term'].to_numpy(),
+    })
+
+
+def main():
+    """Lots for a transactions file (default: one buy per row of holdings.csv)"""
+    import sys
+    from portfolio_engine import load_holdings
+
+    print(f"Tax Lots - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+
+    holdings = load_holdings()
+    transactions = pd.read_csv(sys.argv[1]) if len(sys.argv) > 1 else transactions_from_holdings(holdings)
+    lots = build_tax_lots(transactions)
+    prices = holdings.set_index('Symbol')['Current_Price']
+    unrealized = unrealized_gains(lots['open_lots'], prices)
+
+    print(f"Transactions: {len(transactions):,}  Open lots: {len(unrealized):,}  "
+          f"Realized pieces: {len(lots['realized']):,}")
+    if len(lots['unmatched_sells']):
+        print(f"WARNING: {len(lots['unmatched_sells'])} sells exceed the quantity bought")
+    print()
+    print(unrealized[['symbol', 'buy_date', 'qty', 'buy_price', 'current_price', 'gain',
+                      'holding_days', 'term']].to_string(index=False, float_format='%.2f'))
+    print()
+    buckets = gains_by_bucket(lots['realized'], unrealized)
+    print("GAINS BY TAX BUCKET:")
+    print(buckets.to_string(index=False, float_format='%.2f'))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Transaction Costs - Indian Equity Delivery Charges and Slippage
+===============================================================
+
+Prices every order in a trade list with array operations instead of the flat
+setcommission(0.0003) used by the notebook:
+
+- Brokerage: percentage of turnover, capped per order
+- STT: on both buy and sell turnover (delivery)
+- Exchange transaction charges and SEBI turnover fees
+- GST: on brokerage + exchange charges + SEBI fees
+- Stamp duty: buy side only
+- Slippage: half the bid-ask spread plus a square-root market impact that
+  grows with the order's share of the bar's traded volume
+
+The same functions price a backtest's trade list (apply_cost_model) and the
+exit plans in sector_analysis.py / portfolio_analysis.py (sell_costs).
+"""
+
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+from vectorized_backtest import trade_statistics, sharpe_ratio, drawdown_statistics
+
+# Rates in percent of turnover unless noted
+DEFAULT_COST_MODEL = {
+    'brokerage_pct': 0.03,
+    'brokerage_cap': 20.0,        # ₹ per order
+    'stt_pct': 0.1,               # delivery, buy and sell
+    'exchange_pct': 0.00297,      # NSE transaction charges
+    'sebi_pct': 0.0001,           # ₹10 per crore
+    'gst_pct': 18.0,              # on brokerage + exchange + SEBI
+    'stamp_duty_pct': 0.015,      # buy side only
+    'half_spread_bps': 5.0,
+    'impact_coef': 0.02,          # price impact at 100% of bar volume (fraction)
+}
+
+
+def _model(model: dict = None) -> dict:
+    return DEFAULT_COST_MODEL if model is None else {**DEFAULT_COST_MODEL, **model}
+
+
+def order_charges(turnover, is_buy, model: dict = None) -> dict:
+    """
+    Statutory and broker charges for every order.
+
+    Args:
+        turnover: order values (price x shares)
+        is_buy: boolean array (or scalar) - stamp duty applies to buys only
+
+    Returns:
+        Dictionary of arrays: brokerage, stt, exchange, sebi, gst, stamp_duty, total
+    """
+    m = _model(model)
+    turnover = np.abs(np.asarray(turnover, dtype=np.float64))
+    is_buy = np.broadcast_to(np.asarray(is_buy, dtype=bool), turnover.shape)
+
+    brokerage = np.minimum(turnover * m['brokerage_pct'] / 100, m['brokerage_cap'])
+    stt = turnover * m['stt_pct'] / 100
+    exchange = turnover * m['exchange_pct'] / 100
+    sebi = turnover * m['sebi_pct'] / 100
+    gst = (brokerage + exchange + sebi) * m['gst_pct'] / 100
+    stamp_duty = np.where(is_buy, turnover * m['stamp_duty_pct'] / 100, 0.0)
+    return {
+        'brokerage': brokerage,
+        'stt': stt,
+        'exchange': exchange,
+        'sebi': sebi,
+        'gst': gst,
+        'stamp_duty': stamp_duty,
+        'total': brokerage + stt + exchange + sebi + gst + stamp_duty,
+    }
+
+
+def slippage_fraction(shares, bar_volume=None, model: dict = None) -> np.ndarray:
+    """
+    Expected slippage as a fraction of price.
+
+    half spread + impact_coef * sqrt(shares / bar volume); without volume
+    (or on zero-volume bars) only the half spread is charged.
+    """
+    m = _model(model)
+    shares = np.abs(np.asarray(shares, dtype=np.float64))
+    spread = m['half_spread_bps'] / 10000
+    if bar_volume is None:
+        return np.full(shares.shape, spread)
+    bar_volume = np.asarray(bar_volume, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        participation = np.where(bar_volume > 0, shares / bar_volume, 0.0)
+    return spread + m['impact_coef'] * np.sqrt(np.nan_to_num(participation))
+
+
+def order_costs(price, shares, is_buy, bar_volume=None, model: dict = None) -> dict:
+    """Charges plus slippage for every order (all arrays, same shape)"""
+    turnover = np.abs(np.asarray(price, dtype=np.float64) * np.asarray(shares, dtype=np.float64))
+    charges = order_charges(turnover, is_buy, model)['total']
+    slippage = turnover * slippage_fraction(shares, bar_volume, model)
+    return {'charges': charges, 'slippage': slippage, 'total': charges + slippage}
+
+
+def sell_costs(value, quantity=None, bar_volume=None, model: dict = None) -> dict:
+    """
+    Cost of selling positions worth `value` (for pricing exit plans).
+
+    quantity and bar_volume enable the volume-dependent impact; without them
+    only charges and the half spread are applied.
+    """
+    value = np.asarray(value, dtype=np.float64)
+    charges = order_charges(value, False, model)['total']
+    shares = quantity if quantity is not None else np.zeros_like(value)
+    slippage = value * slippage_fraction(shares, bar_volume if quantity is not None else None, model)
+    total = charges + slippage
+    return {'charges': charges, 'slippage': slippage, 'total': total, 'net_proceeds': value - total}
+
+
+def _bar_volume(volume, bars, symbols=None):
+    """Volume of the fill bar for each trade (1-D series or dates x symbols matrix)"""
+    if volume is None:
+        return None
+    volume = np.asarray(volume, dtype=np.float64)
+    return volume[bars, symbols] if volume.ndim == 2 else volume[bars]
+
+
+def apply_cost_model(result: dict, volume=None, model: dict = None) -> dict:
+    """
+    Re-price a backtest result with the full cost model.
+
+    Works on vectorized_backtest.run_backtest results (volume = the symbol's
+    volume array) and portfolio_backtest results (volume = the dates x symbols
+    matrix). Position sizes are kept; the flat commission is swapped for the
+    modelled costs in the trade list and the equity curve, and the stats are
+    recomputed.
+    """
+    trades = result['trades']
+    is_open = np.asarray(trades['is_open'], dtype=bool)
+    size = np.asarray(trades['size'], dtype=np.float64)
+    entry_price = np.asarray(trades['entry_price'], dtype=np.float64)
+    exit_price = np.asarray(trades['exit_price'], dtype=np.float64)
+    entry_bar = np.asarray(trades['entry_bar'], dtype=np.int64)
+    exit_bar = np.asarray(trades['exit_bar'], dtype=np.int64)
+    symbols = np.asarray(trades['symbol'], dtype=np.int64) if 'symbol' in trades else None
+    old_commission = np.asarray(trades['commission'], dtype=np.float64)
+
+    entry = order_costs(entry_price, size, True, _bar_volume(volume, entry_bar, symbols), model)
+    exit_ = order_costs(exit_price, size, False, _bar_volume(volume, exit_bar, symbols), model)
+    for key in exit_:
+        exit_[key] = np.where(is_open, 0.0, exit_[key])
+
+    # The flat commission was split pro rata to turnover between entry and exit
+    entry_value, exit_value = size * entry_price, np.where(is_open, 0.0, size * exit_price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        old_entry = np.nan_to_num(old_commission * entry_value / (entry_value + exit_value))
+    old_exit = old_commission - old_entry
+
+    equity = np.asarray(result['equity'], dtype=np.float64)
+    adjustment = np.zeros(len(equity) + 1)
+    np.add.at(adjustment, entry_bar, old_entry - entry['total'])
+    np.add.at(adjustment, exit_bar[~is_open], (old_exit - exit_['total'])[~is_open])
+    equity = equity + np.cumsum(adjustment)[:-1]
+
+    costed = trades.copy()
+    costed['charges'] = entry['charges'] + exit_['charges']
+    costed['slippage'] = entry['slippage'] + exit_['slippage']
+    costed['commission'] = entry['total'] + exit_['total']
+    costed['pnlcomm'] = np.asarray(trades['pnl']) - costed['commission']
+
+    return {
+        **result,
+        'trades': costed,
+        'equity': equity,
+        'final_value': float(equity[-1]) if len(equity) else result['final_value'],
+        'stats': {
+            'ta': trade_statistics(costed),
+            'sharpe': {'sharperatio': sharpe_ratio(equity)},
+            'dd': drawdown_statistics(equity),
+        },
+        'cost_model': _model(model),
+    }
+
+
+def cost_breakdown(result: dict) -> dict:
+    """Totals of charges and slippage in a re-priced result"""
+    trades = result['trades']
+    charges = float(np.sum(trades['charges']))
+    slippage = float(np.sum(trades['slippage']))
+    return {'charges': charges, 'slippage': slippage, 'total': charges + slippage}
+
+
+def main():
+    """Flat commission vs the full cost model on a SmaCross backtest"""
+    import sys
+    import time
+    import yfinance as yf
+    from vectorized_backtest import run_backtest
+
+    symbol = sys.argv[1] if len(sys.argv) > 1 else 'RELIANCE.NS'
+    print(f"Transaction Cost Model - {symbol} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+
+    data = yf.Ticker(symbol).history(period='5y', interval='1d', auto_adjust=False, actions=False)
+    if data.empty:
+        print(f"No data found for {symbol}")
+        return
+
+    flat = run_backtest(data, 'sma_cross', percents=95)
+    start = time.perf_counter()
+    costed = apply_cost_model(flat, data['Volume'].to_numpy())
+    elapsed = (time.perf_counter() - start) * 1000
+
+    costs = cost_breakdown(costed)
+    print(f"Cost model applied in {elapsed:.2f} ms")
+    print(f"{'':<28} {'Flat 0.03%':>14} {'Full model':>14}")
+    print(f"{'Final Portfolio Value':<28} {flat['final_value']:>14,.2f} {costed['final_value']:>14,.2f}")
+    print(f"{'Total Costs':<28} {np.sum(flat['trades']['commission']):>14,.2f} {costs['total']:>14,.2f}")
+    print(f"{'  Charges (STT, fees, GST)':<28} {'':>14} {costs['charges']:>14,.2f}")
+    print(f"{'  Slippage':<28} {'':>14} {costs['slippage']:>14,.2f}")
+    print(f"{'Max Drawdown %':<28} {flat['stats']['dd']['max']['drawdown']:>14.2f} "
+          f"{costed['stats']['dd']['max']['drawdown']:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import pandas as pd
 import numpy as np
 
+from portfolio_engine import analyze_portfolio, load_holdings
+
 print("=" * 80)
 print("QUALITY VALUATION SCREENING ANALYSIS")
 print("Investment-Grade Stock Identification")
@@ -47,14 +49,15 @@ valuation_data = {
     'roe_current': [26.8, 8.7, 14.5, 12.2, 11.8, 6.9, 16.2, 7.8, 24.1, 3.8, 5.9, 13.8, 8.4],
     'roe_3y_avg': [28.5, 9.2, 16.8, 13.5, 12.3, 7.8, 15.2, 8.9, 22.4, 4.2, 6.8, 14.7, 9.5],
     'roe_5y_avg': [27.2, 8.8, 15.4, 12.8, 11.9, 7.2, 14.1, 8.1, 21.8, 4.0, 6.2, 13.9, 8.8],
-
-    # Portfolio Context
-    'current_loss_pct': [-17.59, -31.77, -30.54, -29.78, -24.52, -36.93, -36.87, -35.83, -6.00, -60.04, -67.39, -40.51, -55.22],
-    'portfolio_weight': [13.6, 10.3, 2.8, 0.7, 26.9, 2.9, 2.7, 14.5, 11.1, 2.8, 0.7, 2.7, 8.5]
 }
 
 df = pd.DataFrame(valuation_data)
 
+# Position weight and current loss from the holdings file
+holdings = analyze_portfolio(load_holdings())['positions'].set_index('Symbol')
+df['current_loss_pct'] = df['Symbol'].map(holdings['Unrealized_PL_Pct'])
+df['portfolio_weight'] = df['Symbol'].map(holdings['Position_Size_Pct'])
+
 # Apply quality/valuation criteria
 def apply_quality_screening(row):
     green_flags = 0
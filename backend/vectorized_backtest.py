@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Vectorized Backtest Engine - NumPy Port of the Notebook Crossover Strategies
+=============================================================================
+
+Evaluates SmaCross, EmaCross and SimpleTradeStrategy from the PyCon24 notebook
+on plain NumPy arrays instead of backtrader's Cerebro event loop. Signals are
+computed for the whole series at once, turned into entry/exit bars, filled at
+the next open (backtrader's default) or the signal close (cheat-on-close), and
+charged a percentage commission like cerebro.broker.setcommission(0.0003).
+
+The returned stats mirror the notebook analyzers (ta / sharpe / dd) so a run
+can be cross-checked against backtrader with summarize_backtrader_result().
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+import warnings
+warnings.filterwarnings('ignore')
+
+from price_matrix import forward_filled
+
+DEFAULT_CASH = 100000.0      # cerebro.broker.setcash(100000.0)
+DEFAULT_COMMISSION = 0.0003  # cerebro.broker.setcommission(0.0003)
+TRADING_DAYS = 252
+
+
+def ohlcv_arrays(data: pd.DataFrame) -> dict:
+    """Extract float64 OHLCV arrays from a yfinance/backtrader style DataFrame"""
+    columns = {col.lower(): col for col in data.columns}
+    arrays = {}
+    for field in ['open', 'high', 'low', 'close', 'volume']:
+        if field in columns:
+            arrays[field] = data[columns[field]].to_numpy(dtype=np.float64)
+    if 'close' not in arrays:
+        raise ValueError("Price data must contain a 'Close' column")
+    arrays.setdefault('open', arrays['close'])
+    arrays['index'] = data.index
+    return arrays
+
+
+def sma(values: np.ndarray, period: int) -> np.ndarray:
+    """Simple moving average (NaN until `period` bars are available)"""
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(len(values), np.nan)
+    if period <= 0 or len(values) < period:
+        return out
+    csum = np.cumsum(np.insert(values, 0, 0.0))
+    out[period - 1:] = (csum[period:] - csum[:-period]) / period
+    return out
+
+
+def ema(values: np.ndarray, period: int) -> np.ndarray:
+    """
+    Exponential moving average seeded with the first SMA, like bt.ind.EMA.
+
+    Works on a single series or a dates x symbols matrix; each column is
+    seeded from its own first `period` bars, so a symbol listed later starts
+    its EMA where bt.ind.EMA on that symbol alone would.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if period <= 0 or len(values) < period:
+        return out
+    matrix = values.reshape(len(values), -1)
+    valid = ~np.isnan(matrix)
+    first = np.argmax(valid, axis=0)
+    seed_row = first + period - 1
+    cols = np.flatnonzero(valid.any(axis=0) & (seed_row < len(matrix)))
+    csum = np.vstack([np.zeros((1, matrix.shape[1])), np.cumsum(np.nan_to_num(matrix), axis=0)])
+
+    # NaN before each column's seed row (and everywhere in columns too short to seed)
+    seeded = np.where(np.arange(len(matrix))[:, None] < seed_row[None, :], np.nan, matrix)
+    seeded[:, np.setdiff1d(np.arange(matrix.shape[1]), cols)] = np.nan
+    seeded[seed_row[cols], cols] = (csum[seed_row[cols] + 1, cols] - csum[first[cols], cols]) / period
+    smoothed = pd.DataFrame(seeded).ewm(alpha=2.0 / (period + 1), adjust=False).mean().to_numpy()
+    return smoothed.reshape(values.shape)
+
+
+def crossover(fast: np.ndarray, slow: np.ndarray) -> np.ndarray:
+    """
+    +1 where fast crosses above slow, -1 where it crosses below, else 0.
+
+    Uses the last non-zero difference as the "before" state, which is how
+    bt.ind.CrossOver treats bars where both lines are equal. Works on single
+    series or on dates x symbols matrices (bars along the first axis).
+    """
+    diff = np.asarray(fast, dtype=np.float64) - np.asarray(slow, dtype=np.float64)
+    nonzero = np.where(diff == 0, np.nan, diff)
+    before = np.empty_like(nonzero)
+    before[0] = np.nan
+    before[1:] = forward_filled(nonzero)[:-1]
+
+    cross = np.zeros(diff.shape, dtype=np.int8)
+    cross[(before < 0) & (diff > 0)] = 1
+    cross[(before > 0) & (diff < 0)] = -1
+    return cross
+
+
+def signals_to_trades(entries: np.ndarray, exits: np.ndarray) -> tuple:
+    """
+    Convert entry/exit signal arrays into paired signal bars for a long-only
+    strategy that enters when flat and exits when in the market.
+
+    Returns (entry_bars, exit_bars); exit_bars is -1 for a trade still open.
+    """
+    state = np.full(len(entries), np.nan)
+    state[np.asarray(exits, dtype=bool)] = 0.0
+    state[np.asarray(entries, dtype=bool)] = 1.0
+    state = np.nan_to_num(forward_filled(state), nan=0.0)
+
+    changes = np.diff(np.concatenate(([0.0], state)))
+    entry_bars = np.flatnonzero(changes > 0)
+    exit_bars = np.flatnonzero(changes < 0)
+    paired = np.full(len(entry_bars), -1, dtype=np.int64)
+    paired[:len(exit_bars)] = exit_bars
+    return entry_bars, paired
+
+
+def crossover_trades(fast: np.ndarray, slow: np.ndarray) -> tuple:
+    """Entry/exit signal bars for a fast/slow line crossover strategy"""
+    cross = crossover(fast, slow)
+    return signals_to_trades(cross > 0, cross < 0)
+
+
+def exit_after_bars(entries: np.ndarray, exitbars: int) -> tuple:
+    """
+    Entry/exit signal bars for a strategy that sells `exitbars` bars after the
+    buy was executed (SimpleTradeStrategy).
+
+    backtrader reports an order as executed on the bar after it was placed
+    with either fill (cheat-on-close only changes the price), so bar_executed
+    is signal + 1, the sell signal comes `exitbars` bars later and the next
+    buy can be placed on the bar after the sell signal.
+
+    The walk jumps from trade to trade with searchsorted, so the cost grows
+    with the number of trades rather than the number of bars.
+    """
+    candidates = np.flatnonzero(np.asarray(entries, dtype=bool))
+    n_bars = len(entries)
+    delay = 1
+
+    entry_bars, exit_bars = [], []
+    pos = 0
+    while pos < len(candidates):
+        signal_bar = candidates[pos]
+        executed_bar = signal_bar + delay
+        if executed_bar >= n_bars:
+            break
+        exit_signal = executed_bar + exitbars
+        entry_bars.append(signal_bar)
+        if exit_signal >= n_bars:
+            exit_bars.append(-1)
+            break
+        exit_bars.append(exit_signal)
+        # Flat again once the sell has filled
+        pos = np.searchsorted(candidates, exit_signal + delay, side='left')
+
+    return np.asarray(entry_bars, dtype=np.int64), np.asarray(exit_bars, dtype=np.int64)
+
+
+def sma_cross_trades(arrays: dict, pfast: int = 5, pslow: int = 10, **_) -> tuple:
+    """SmaCross: buy on fast SMA crossing above slow SMA, close on the reverse"""
+    close = arrays['close']
+    return crossover_trades(sma(close, pfast), sma(close, pslow))
+
+
+def ema_cross_trades(arrays: dict, pfast: int = 1, pslow: int = 10, **_) -> tuple:
+    """EmaCross: buy on fast EMA crossing above slow EMA, close on the reverse"""
+    close = arrays['close']
+    return crossover_trades(ema(close, pfast), ema(close, pslow))
+
+
+def falling_closes(close: np.ndarray) -> np.ndarray:
+    """True where price has been falling 3 sessions in a row"""
+    falling = np.zeros(len(close), dtype=bool)
+    falling[2:] = (close[2:] < close[1:-1]) & (close[1:-1] < close[:-2])
+    return falling
+
+
+def simple_trade_trades(arrays: dict, exitbars: int = 5, **_) -> tuple:
+    """SimpleTradeStrategy: buy after three falling closes, sell `exitbars` later"""
+    return exit_after_bars(falling_closes(arrays['close']), exitbars)
+
+
+STRATEGIES = {
+    'sma_cross': sma_cross_trades,
+    'ema_cross': ema_cross_trades,
+    'simple_trade': simple_trade_trades,
+}
+
+
+def _longest_run(flags: np.ndarray) -> int:
+    """Length of the longest run of True values"""
+    if len(flags) == 0 or not flags.any():
+        return 0
+    padded = np.concatenate(([0], flags.astype(np.int8), [0]))
+    edges = np.flatnonzero(np.diff(padded))
+    return int((edges[1::2] - edges[::2]).max())
+
+
+def trade_statistics(trades) -> dict:
+    """Trade stats laid out like bt.analyzers.TradeAnalyzer ('ta')"""
+    is_open = np.asarray(trades['is_open'], dtype=bool)
+    closed = ~is_open
+    pnl = np.asarray(trades['pnl'])[closed]
+    pnlcomm = np.asarray(trades['pnlcomm'])[closed]
+    barlen = np.asarray(trades['barlen'])[closed]
+    won = pnlcomm > 0
+    lost = ~won
+
+    return {
+        'total': {
+            'total': int(len(is_open)),
+            'open': int(is_open.sum()),
+            'closed': int(closed.sum()),
+        },
+        'won': {'total': int(won.sum()), 'pnl': {'total': float(pnlcomm[won].sum())}},
+        'lost': {'total': int(lost.sum()), 'pnl': {'total': float(pnlcomm[lost].sum())}},
+        'streak': {
+            'won': {'longest': _longest_run(won)},
+            'lost': {'longest': _longest_run(lost)},
+        },
+        'pnl': {
+            'gross': {'total': float(pnl.sum())},
+            'net': {'total': float(pnlcomm.sum())},
+        },
+        'len': {'average': float(barlen.mean()) if len(barlen) else 0.0},
+    }
+
+
+def sharpe_ratio(equity: np.ndarray, periods_per_year: int = TRADING_DAYS,
+                 riskfree_rate: float = 0.0) -> float:
+    """Annualized Sharpe ratio of per-bar equity returns"""
+    if len(equity) < 2:
+        return None
+    returns = np.diff(equity) / equity[:-1] - riskfree_rate / periods_per_year
+    std = returns.std(ddof=1)
+    if not np.isfinite(std) or std == 0:
+        return None
+    return float(returns.mean() / std * np.sqrt(periods_per_year))
+
+
+def drawdown_statistics(equity: np.ndarray) -> dict:
+    """Max drawdown (%) and longest drawdown length, like bt.analyzers.DrawDown"""
+    peak = np.maximum.accumulate(equity)
+    drawdown = (peak - equity) / peak * 100
+    return {
+        'max': {
+            'drawdown': float(drawdown.max()) if len(drawdown) else 0.0,
+            'len': _longest_run(drawdown > 0),
+        }
+    }
+
+
+def simulate_trades(arrays: dict, entry_bars: np.ndarray, exit_bars: np.ndarray,
+                    cash: float = DEFAULT_CASH, commission: float = DEFAULT_COMMISSION,
+                    stake: float = 1, percents: float = None, fill: str = 'open',
+                    as_frame: bool = True) -> dict:
+    """
+    Fill paired signal bars and build the trade list and equity curve.
+
+    fill='open' executes at the next bar's open (backtrader market orders),
+    fill='close' at the signal bar's close (cheat-on-close). Either way the
+    broker books the order on the next bar, so an order placed on the last
+    bar never fills and the trade it would open or close stays as it was.
+    stake is a fixed share count (bt.sizers.FixedSize); percents sizes each
+    entry from available cash like bt.sizers.PercentSizer.
+    as_frame=False keeps the trade list as a dict of arrays, which avoids the
+    DataFrame construction cost when running thousands of backtests.
+    """
+    close = arrays['close']
+    fill_prices = arrays['open'] if fill == 'open' else close
+    delay = 1 if fill == 'open' else 0
+    n_bars = len(close)
+
+    entry_bars = np.asarray(entry_bars, dtype=np.int64)
+    exit_bars = np.asarray(exit_bars, dtype=np.int64)
+    # Bar on which the broker executes the order; the price comes from the fill bar
+    entry_booked = entry_bars + 1
+    keep = entry_booked < n_bars
+    entry_bars, exit_bars, entry_booked = entry_bars[keep], exit_bars[keep], entry_booked[keep]
+    entry_fill = entry_bars + delay
+
+    exit_booked = np.where(exit_bars >= 0, exit_bars + 1, n_bars)
+    is_open = exit_booked >= n_bars
+    exit_booked = np.minimum(exit_booked, n_bars - 1)
+    exit_fill = np.where(is_open, n_bars - 1, np.where(exit_bars >= 0, exit_bars, 0) + delay)
+
+    entry_price = fill_prices[entry_fill]
+    exit_price = np.where(is_open, close[-1], fill_prices[exit_fill])
+
+    if percents is None:
+        size = np.full(len(entry_bars), float(stake))
+    else:
+        # Sizing depends on the cash left by earlier trades; one step per trade
+        size = np.empty(len(entry_bars))
+        available = cash
+        for i in range(len(entry_bars)):
+            size[i] = available * percents / 100 / close[entry_bars[i]]
+            if not is_open[i]:
+                available += size[i] * (exit_price[i] - entry_price[i]) \
+                    - commission * size[i] * (entry_price[i] + exit_price[i])
+
+    entry_comm = commission * size * entry_price
+    exit_comm = np.where(is_open, 0.0, commission * size * exit_price)
+    pnl = size * (exit_price - entry_price)
+    pnlcomm = np.where(is_open, pnl - entry_comm, pnl - entry_comm - exit_comm)
+
+    # Cash flows and holdings per bar, accumulated in one pass each
+    cash_flow = np.zeros(n_bars)
+    holdings = np.zeros(n_bars)
+    np.add.at(cash_flow, entry_booked, -(size * entry_price + entry_comm))
+    np.add.at(holdings, entry_booked, size)
+    closed_booked = exit_booked[~is_open]
+    np.add.at(cash_flow, closed_booked, size[~is_open] * exit_price[~is_open] - exit_comm[~is_open])
+    np.add.at(holdings, closed_booked, -size[~is_open])
+    equity = cash + np.cumsum(cash_flow) + np.cumsum(holdings) * close
+
+    trades = {
+        'entry_bar': entry_fill,
+        'exit_bar': np.where(is_open, -1, exit_fill),
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'size': size,
+        'pnl': pnl,
+        'pnlcomm': pnlcomm,
+        'commission': entry_comm + exit_comm,
+        'barlen': exit_booked - entry_booked,
+        'is_open': is_open,
+    }
+    if as_frame:
+        trades = pd.DataFrame(trades)
+        index = arrays.get('index')
+        if index is not None:
+            trades.insert(2, 'entry_date', index[entry_fill])
+            trades.insert(3, 'exit_date', index[exit_fill])
+
+    return {
+        'trades': trades,
+        'equity': equity,
+        'final_value': float(equity[-1]) if n_bars else cash,
+        'stats': {
+            'ta': trade_statistics(trades),
+            'sharpe': {'sharperatio': sharpe_ratio(equity)},
+            'dd': drawdown_statistics(equity),
+        },
+    }
+
+
+def run_backtest(data, strategy: str = 'sma_cross', cash: float = DEFAULT_CASH,
+                 commission: float = DEFAULT_COMMISSION, stake: float = 1,
+                 percents: float = None, fill: str = 'open', **params) -> dict:
+    """
+    Backtest one of the notebook strategies on a price DataFrame.
+
+    Args:
+        data: DataFrame with Open/High/Low/Close/Volume columns (or the
+              dict returned by ohlcv_arrays to skip the conversion)
+        strategy: 'sma_cross', 'ema_cross' or 'simple_trade'
+        params: strategy parameters (pfast, pslow, exitbars)
+
+    Returns:
+        Dictionary with 'trades', 'equity', 'final_value' and 'stats'
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Must be one of: {list(STRATEGIES)}")
+
+    arrays = data if isinstance(data, dict) else ohlcv_arrays(data)
+    entry_bars, exit_bars = STRATEGIES[strategy](arrays, fill=fill, **params)
+    result = simulate_trades(arrays, entry_bars, exit_bars, cash=cash, commission=commission,
+                             stake=stake, percents=percents, fill=fill)
+    result['strategy'] = strategy
+    result['params'] = params
+    return result
+
+
+def backtest_summary(result: dict) -> dict:
+    """Flat summary of a vectorized backtest for side-by-side comparison"""
+    ta = result['stats']['ta']
+    return {
+        'total_open': ta['total']['open'],
+        'total_closed': ta['total']['closed'],
+        'total_won': ta['won']['total'],
+        'total_lost': ta['lost']['total'],
+        'win_streak': ta['streak']['won']['longest'],
+        'loss_streak': ta['streak']['lost']['longest'],
+        'pnl_net': round(ta['pnl']['net']['total'], 2),
+        'max_drawdown': round(result['stats']['dd']['max']['drawdown'], 2),
+    }
+
+
+def summarize_backtrader_result(result) -> dict:
+    """Same flat summary from a cerebro.run() result with ta/dd analyzers attached"""
+    strat = result[0]
+    ta = strat.analyzers.ta.get_analysis()
+    dd = strat.analyzers.dd.get_analysis()
+    total_closed = ta.total.get('closed', 0)
+    return {
+        'total_open': ta.total.get('open', 0),
+        'total_closed': total_closed,
+        'total_won': ta.won.total if total_closed else 0,
+        'total_lost': ta.lost.total if total_closed else 0,
+        'win_streak': ta.streak.won.longest if total_closed else 0,
+        'loss_streak': ta.streak.lost.longest if total_closed else 0,
+        'pnl_net': round(ta.pnl.net.total, 2) if total_closed else 0.0,
+        'max_drawdown': round(dd['max']['drawdown'], 2),
+    }
+
+
+def display_backtest_results(result: dict):
+    """Print a backtest in the same layout as the notebook's display_enhanced_analysis"""
+    summary = backtest_summary(result)
+    strike_rate = round(summary['total_won'] / summary['total_closed'] * 100, 2) \
+        if summary['total_closed'] > 0 else 0
+
+    print("\nTrade Analysis Results:")
+    print("-" * 100)
+    row_format = "{:<20}" * 5
+    print(row_format.format("", "Total Open", "Total Closed", "Total Won", "Total Lost"))
+    print(row_format.format("", summary['total_open'], summary['total_closed'],
+                            summary['total_won'], summary['total_lost']))
+    print(row_format.format("", "Strike Rate(%)", "Win Streak", "Loss Streak", "Net PnL"))
+    print(row_format.format("", strike_rate, summary['win_streak'],
+                            summary['loss_streak'], summary['pnl_net']))
+    print("-" * 100)
+
+    sharpe = result['stats']['sharpe']['sharperatio']
+    if sharpe is not None:
+        print(f"\nSharpe Ratio: {sharpe:.4f}")
+    print(f"Max Drawdown: {result['stats']['dd']['max']['drawdown']:.2f}%")
+    print(f"Max Drawdown Duration: {result['stats']['dd']['max']['len']} periods")
+
+
+def main():
+    """Run the notebook strategies on one symbol and time the vectorized engine"""
+    import sys
+    import time
+    import yfinance as yf
+
+    symbol = sys.argv[1] if len(sys.argv) > 1 else 'RELIANCE.NS'
+    print(f"Vectorized Backtest - {symbol} - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+
+    data = yf.Ticker(symbol).history(period='5y', interval='1d', auto_adjust=False, actions=False)
+    if data.empty:
+        print(f"No data found for {symbol}")
+        return
+
+    arrays = ohlcv_arrays(data)
+    runs = [
+        ('sma_cross', {'pfast': 5, 'pslow': 10}),
+        ('ema_cross', {'pfast': 1, 'pslow': 10}),
+        ('simple_trade', {'exitbars': 5}),
+    ]
+    for strategy, params in runs:
+        start = time.perf_counter()
+        result = run_backtest(arrays, strategy, **params)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"\n{strategy.upper()} {params} - {len(data)} bars in {elapsed:.2f} ms")
+        print(f"Final Portfolio Value: {result['final_value']:.2f}")
+        display_backtest_results(result)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Walk-Forward Optimization - Out-of-Sample Evaluation of Crossover Parameters
+============================================================================
+
+Splits each symbol's history into rolling train/test windows, picks the best
+parameters on every train window with the parameter sweep, and scores those
+parameters on the test window that follows. Indicators are computed once on
+the full history (SMA/EMA only look backwards) and every window works on
+slices of the same arrays, so no indicator is recomputed per window. Each
+parameter set is backtested once over the full history and every train
+window is scored from that one equity curve. The in-sample columns report
+those same selection scores; only the winning parameters get a fresh
+backtest, on their test window.
+"""
+
+import pandas as pd
+import numpy as np
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+import os
+import warnings
+warnings.filterwarnings('ignore')
+
+from vectorized_backtest import (
+    DEFAULT_CASH, DEFAULT_COMMISSION, TRADING_DAYS, ohlcv_arrays, simulate_trades,
+)
+from parameter_sweep import (
+    PARAMETER_SPACES, IndicatorCache, parameter_grid, strategy_trades, evaluate_params,
+)
+
+_SHARED_DATA = {}
+
+
+class WindowCache:
+    """View of an IndicatorCache restricted to one [start, stop) bar window"""
+
+    def __init__(self, cache: IndicatorCache, start: int, stop: int):
+        self.cache = cache
+        self.start = start
+        self.stop = stop
+
+    def get(self, indicator: str, period: int = None) -> np.ndarray:
+        return self.cache.get(indicator, period)[self.start:self.stop]
+
+
+def slice_arrays(arrays: dict, start: int, stop: int) -> dict:
+    """Slice every OHLCV array (and the index) to one window without copying"""
+    return {key: values[start:stop] for key, values in arrays.items()}
+
+
+def rolling_windows(n_bars: int, train_bars: int, test_bars: int, step: int = None) -> list:
+    """(train_start, train_stop, test_stop) bar offsets for each walk-forward step"""
+    step = step or test_bars
+    windows = []
+    start = 0
+    while start + train_bars + test_bars <= n_bars:
+        windows.append((start, start + train_bars, start + train_bars + test_bars))
+        start += step
+    return windows
+
+
+def _init_worker(price_arrays: dict):
+    """Pool initializer: keep the price arrays for every task in this process"""
+    global _SHARED_DATA
+    _SHARED_DATA = price_arrays
+
+
+def window_scores(equity: np.ndarray, windows: list, objective: str = 'sharpe',
+                  periods_per_year: int = TRADING_DAYS) -> np.ndarray:
+    """
+    Score each train window from one full-history equity curve.
+
+    Sharpe and P&L come from prefix sums of the per-bar returns, so every
+    window costs O(1) once the curve exists; drawdown needs a scan of the
+    window slice.
+    """
+    returns = np.diff(equity) / equity[:-1]
+    csum = np.concatenate(([0.0], np.cumsum(returns)))
+    csq = np.concatenate(([0.0], np.cumsum(returns ** 2)))
+    scores = np.full(len(windows), np.nan)
+
+    for i, (start, stop, _) in enumerate(windows):
+        if objective == 'pnl_net':
+            scores[i] = equity[stop - 1] - equity[start]
+        elif objective == 'max_drawdown':
+            window = equity[start:stop]
+            peak = np.maximum.accumulate(window)
+            scores[i] = -((peak - window) / peak).max() * 100
+        else:
+            # Returns r[start..stop-2] fall inside the window
+            n = stop - 1 - start
+            total = csum[stop - 1] - csum[start]
+            mean = total / n
+            var = (csq[stop - 1] - csq[start] - n * mean ** 2) / (n - 1)
+            if var > 1e-18:
+                scores[i] = mean / np.sqrt(var) * np.sqrt(periods_per_year)
+    return scores
+
+
+def _walk_forward_symbol(symbol: str, strategy: str, param_sets: list, train_bars: int,
+                         test_bars: int, step: int, objective: str,
+                         cash: float, commission: float, fill: str) -> list:
+    """Optimize and test every window of one symbol with a shared indicator cache"""
+    arrays = _SHARED_DATA[symbol]
+    cache = IndicatorCache(arrays)
+    windows = rolling_windows(len(arrays['close']), train_bars, test_bars, step)
+    if not windows:
+        return []
+
+    # One full-history run per parameter set, scored on every train window; Sharpe and P&L
+    # are kept alongside the objective so the in-sample report is the score selection used
+    metrics = {'sharpe', 'pnl_net', objective}
+    scores = {metric: np.empty((len(param_sets), len(windows))) for metric in metrics}
+    for i, params in enumerate(param_sets):
+        entry_bars, exit_bars = strategy_trades(cache, strategy, params)
+        equity = simulate_trades(arrays, entry_bars, exit_bars, cash=cash, commission=commission,
+                                 fill=fill, as_frame=False)['equity']
+        for metric in metrics:
+            scores[metric][i] = window_scores(equity, windows, metric)
+
+    rows = []
+    index = arrays['index']
+    for number, (train_start, train_stop, test_stop) in enumerate(windows, 1):
+        column = scores[objective][:, number - 1]
+        if np.isnan(column).all():
+            continue
+        best = int(np.nanargmax(column))
+        best_params = param_sets[best]
+
+        test = evaluate_params(slice_arrays(arrays, train_stop, test_stop),
+                               WindowCache(cache, train_stop, test_stop),
+                               strategy, best_params, cash, commission, fill)
+
+        rows.append({
+            'symbol': symbol,
+            'window': number,
+            'train_start': index[train_start],
+            'train_end': index[train_stop - 1],
+            'test_start': index[train_stop],
+            'test_end': index[test_stop - 1],
+            **best_params,
+            'train_score': column[best],
+            'train_sharpe': scores['sharpe'][best, number - 1],
+            'train_pnl': scores['pnl_net'][best, number - 1],
+            'test_sharpe': test['sharpe'],
+            'test_pnl': test['pnl_net'],
+            'test_drawdown': test['max_drawdown'],
+            'test_trades': test['trades'],
+            'test_return_pct': (test['final_value'] - cash) / cash * 100,
+        })
+
+    return rows
+
+
+def run_walk_forward(price_data: dict, strategy: str = 'sma_cross', param_sets: list = None,
+                     train_bars: int = 504, test_bars: int = 126, step: int = None,
+                     objective: str = 'sharpe', workers: int = None, cash: float = DEFAULT_CASH,
+                     commission: float = DEFAULT_COMMISSION, fill: str = 'open') -> pd.DataFrame:
+    """
+    Walk-forward optimize a strategy across symbols.
+
+    Args:
+        price_data: {symbol: OHLCV DataFrame}
+        train_bars / test_bars: window lengths (default 2 years train, 6 months test)
+        step: bars to roll forward each time (defaults to test_bars)
+        objective: train-window metric to maximize ('sharpe', 'pnl_net') or
+                   'max_drawdown' to minimize, measured on the slice of the
+                   full-history equity curve
+
+    Returns:
+        DataFrame with one row per (symbol, window) holding the chosen
+        parameters, their in-sample metrics (train_score is the objective
+        they were selected on, train_sharpe / train_pnl from the same
+        full-history curve) and their out-of-sample metrics
+    """
+    if strategy not in PARAMETER_SPACES:
+        raise ValueError(f"Unknown strategy '{strategy}'. Must be one of: {list(PARAMETER_SPACES)}")
+
+    param_sets = param_sets or parameter_grid(PARAMETER_SPACES[strategy])
+    price_arrays = {symbol: ohlcv_arrays(data) if isinstance(data, pd.DataFrame) else data
+                    for symbol, data in price_data.items()}
+    symbols = list(price_arrays)
+    workers = workers or min(len(symbols), os.cpu_count() or 1)
+    args = (strategy, param_sets, train_bars, test_bars, step, objective, cash, commission, fill)
+
+    rows = []
+    if workers <= 1:
+        _init_worker(price_arrays)
+        for symbol in symbols:
+            rows.extend(_walk_forward_symbol(symbol, *args))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(price_arrays,)) as pool:
+            futures = [pool.submit(_walk_forward_symbol, symbol, *args) for symbol in symbols]
+            for future in futures:
+                rows.extend(future.result())
+
+    return pd.DataFrame(rows)
+
+
+def walk_forward_summary(results: pd.DataFrame) -> pd.DataFrame:
+    """Per-symbol out-of-sample totals and walk-forward efficiency"""
+    if results.empty:
+        return results
+    summary = results.groupby('symbol').agg(
+        windows=('window', 'count'),
+        train_sharpe=('train_sharpe', 'mean'),
+        test_sharpe=('test_sharpe', 'mean'),
+        test_pnl=('test_pnl', 'sum'),
+        test_trades=('test_trades', 'sum'),
+        worst_test_drawdown=('test_drawdown', 'max'),
+        profitable_windows=('test_pnl', lambda pnl: (pnl > 0).sum()),
+    ).reset_index()
+    # Share of the in-sample Sharpe that survives out of sample
+    summary['efficiency'] = np.where(summary['train_sharpe'] > 0,
+                                     summary['test_sharpe'] / summary['train_sharpe'], np.nan)
+    return summary.sort_values('test_pnl', ascending=False).reset_index(drop=True)
+
+
+def main():
+    """Walk-forward SmaCross over a handful of NIFTY 50 names"""
+    import time
+    import yfinance as yf
+
+    symbols = ['RELIANCE.NS', 'TCS.NS', 'HDFCBANK.NS', 'INFY.NS', 'ICICIBANK.NS']
+    print(f"Walk-Forward Optimization - {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print("=" * 80)
+
+    price_data = {}
+    for symbol in symbols:
+        data = yf.Ticker(symbol).history(period='10y', interval='1d', auto_adjust=False, actions=False)
+        if not data.empty:
+            price_data[symbol] = data
+
+    if not price_data:
+        print("No price data available")
+        return
+
+    start = time.perf_counter()
+    results = run_walk_forward(price_data, 'sma_cross')
+    elapsed = time.perf_counter() - start
+    print(f"{len(results)} walk-forward windows in {elapsed:.2f}s\n")
+    print(walk_forward_summary(results).to_string(index=False, float_format='%.2f'))
+
+
+if __name__ == "__main__":
+    main()